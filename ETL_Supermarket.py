@@ -4,6 +4,7 @@ import pyodbc
 from sqlalchemy import create_engine
 import glob
 import os
+from scraper_cantidades import parsear_formatos, parsear_precios_unidad
 
 def read_csv_fix_cp1252(path, **kwargs):
     # 1) Lectura “lossless” con latin1
@@ -38,6 +39,12 @@ def concat_csv(carpeta_csv,patron):
     df_final = pd.concat(dataframes, ignore_index=True)
 
     return df_final
+def quitar_origen(df, columnas):
+    # Las ejecuciones incrementales añaden la columna 'origen' (rastreado/arrastrado)
+    if 'origen' in df.columns:
+        df = df.drop(columns=['origen'])
+    return df.iloc[:, :len(columnas)].copy()
+
 headers=["Product","Weight","Price","Unit_Price","Availability","Category","Extraction_Date"]
 headers_mercadona=["Product","Weight","Price","Unit_Price","Category","Extraction_Date"]
 headers_carrefour=["Product","Price","Unit_Price","Category","Offer","Availability","Extraction_Date"]
@@ -72,158 +79,19 @@ def extraer_peso_final(producto):
     else:
         print(producto)
         return pd.Series([producto, None])
-def es_float(valor):
-    try:
-        float(valor)
-        return True
-    except (ValueError, TypeError):
-        return False
-
 def limpiar_precio(p):
     print(p)
     p = p.replace('€', '').replace(',', '.').replace('Precio no disponible','nan')
     p = re.sub(r'[^\d\.\-]', '', p)  # Elimina todo excepto dígitos, punto y -
     return float(p) if p != '' else float('nan')
 
-def limpiar_precio_unitario(p):
-    print(p)
-    return p.replace('€ por kilogramo', '€/kg').replace('€ por unidad', '€/ud').replace('€ por litro', '€/l').replace('€ Unidad', '€/ud').replace('€ por metro', '€/m').replace('€ por 100ml', '€/100ml').replace('€ por 100g', '€/100g').replace('€ por gramo', '€/g').replace('€ por ml', '€/ml').replace(',', '.')
-
-def limpiar_peso(p):
-    if p is not None:
-        if '(' in p or ')' in p:
-            x=p.index('(')
-            y=p.index(')')
-            p=p[x+1:y]
-        if ' x ' in p:
-            p=p[p.index('x')+1:]
-        if p=='.':
-            p='0'
-        p=p.replace('Botella','').replace('Botellín','').replace('Lata','').replace('por envase','').replace('Garrafa','').replace('Spray','').replace('Bote','').replace('Paquete','').replace('Sobre','').replace('Tarro','').replace('Tarrina','').replace('Brick','').replace('escurrido','').replace('Caja','').replace('Bandeja','').replace('Vaso','').replace('Tableta','').replace('Tarrito','').replace('Tubo','').replace('Benjamín','').replace('Pieza','').replace('Bol','').replace('Frasco','').replace('Pastilla','').replace('pastillas','').replace('Malla','').replace('Saco','').replace('recambios','').replace('hojas','').replace('servicios','').replace('cajas','').replace('Manojo','').replace('monodosis','').replace('velas','').replace('tiras','').replace('rollos','').replace('bandas','').replace('sobres','').replace('aprox.','').replace('bolsas','').replace('rollo','').replace('Granel','').replace('ud.','').replace('1/2','').replace(',','.')
-        if p.endswith(' '):
-            p=p[:-1]
-        p=p.strip()
-        return p
-    else:
-        return None
-
-def normalizar_precio_unitario(valor):
-    """
-    It converts prices to €/kg o €/l unit based.
-    """
-    try:
-        if pd.isna(valor):
-            return None
-
-        valor = valor.replace(" ", "").lower()
-
-        if "/100ml" in valor:
-            precio = float(valor.replace("€/100ml", ""))
-            return precio * 10
-
-        elif "/ml" in valor:
-            precio = float(valor.replace("€/ml", ""))
-            return precio * 1000
-
-        elif "/l" in valor:
-            return float(valor.replace("€/l", ""))
-
-        elif "/kg" in valor:
-            return float(valor.replace("€/kg", ""))
-
-        elif "/100g" in valor:
-            precio = float(valor.replace("€/100g", ""))
-            return precio * 10
-
-        elif "/g" in valor:
-            precio = float(valor.replace("€/g", ""))
-            return precio * 1000
-
-        elif "/m" in valor:
-            return float(valor.replace("€/m", ""))
-        
-        elif "/ud" in valor:
-            return float(valor.replace("€/ud", ""))
-
-        elif es_float(valor):
-            return valor
-        else:
-            return None  # Unknown unit
+# Código de la columna Unit según la unidad base de la cantidad
+CODIGO_UNIDAD = {'kg': 1, 'l': 2, 'm': 3, 'ud': 0}
 
-    except Exception as e:
-        return None
-
-def multiplicar_si_hay_x(peso_str):
-    if not isinstance(peso_str, str):
-        return None
-
-    
-    peso_str = peso_str.lower().replace(" ", "")
-
-    # It searches for 3x80, 2x125, etc.
-    match = re.match(r'(\d+(?:[\.,]?\d*)?)x(\d+(?:[\.,]?\d*)?)', peso_str)
-    if match:
-        a = float(match.group(1).replace(',', '.'))
-        b = float(match.group(2).replace(',', '.'))
-        return str(a * b)
-
-    return peso_str
-
-def normalizar_peso(valor):
-    
-    if valor is None:
-        return None
-    else:
-        if valor.endswith('.'):
-            valor=valor[:-1]
-        valor=valor.lower()
-        if valor.endswith('kg'):
-            valor=valor.replace('kg','').strip()
-            if len(valor.split(' '))>1:
-                valor=valor.split(' ')
-                valor=valor[2]
-            return float(multiplicar_si_hay_x(valor))
-        elif valor.endswith('uds'):
-            return float(multiplicar_si_hay_x(valor).replace('uds',''))
-        elif valor.endswith('ud'):
-            return float(multiplicar_si_hay_x(valor).replace('ud',''))
-        elif valor.endswith('unidades'):
-            return float(multiplicar_si_hay_x(valor).replace('unidades',''))
-        elif valor.endswith('comprimidos'):
-            return float(multiplicar_si_hay_x(valor).replace('comprimidos',''))
-        elif valor.endswith('g'):
-            return float((multiplicar_si_hay_x(valor).replace('g','').replace(' ','')))/1000
-        elif valor.endswith('L'):
-            return float(multiplicar_si_hay_x(valor).replace('L',''))
-        elif valor.endswith('ml'):
-            return float((multiplicar_si_hay_x(valor).replace('ml','')))/1000
-        elif valor.endswith('cl'):
-            return float((multiplicar_si_hay_x(valor).replace('cl','')))/100
-        elif valor.endswith('l'):
-            return float(multiplicar_si_hay_x(valor).replace('l',''))
-        elif valor.endswith('cm'):
-            return float((multiplicar_si_hay_x(valor).replace('cm','')))/100
-        elif valor.endswith('m'):
-            return float(multiplicar_si_hay_x(valor).replace('m',''))
-        elif '(' in valor or ')' in valor:
-            return float(valor[valor.index('(')+1:valor.index(')')])
-        else:
-            try:
-                return float(valor)
-            except Exception as e:
-                print(f"Error con el valor: {valor} - {e}")
-                return '.'
-def colu_unidades(p):
-    if p is None:
-        return None
-    if p.endswith('g'):
-        return 1
-    elif p.endswith('l'):
-        return 2
-    elif p.endswith('m'):
-        return 3
-    else:
-        return 0
+def pesos_y_unidades(formatos):
+    """Weight (cantidad total en kg, l, m o ud) y Unit a partir de los formatos, con scraper_cantidades."""
+    cantidades = parsear_formatos(formatos)
+    return cantidades['total'], cantidades['unidad'].map(CODIGO_UNIDAD)
 
 def disponibilidad(d):
     if d.lower()=='disponible':
@@ -232,31 +100,29 @@ def disponibilidad(d):
         return 1
 ###ALCAMPO
 def extract_transform_alcampo(df):
+    df=quitar_origen(df,headers)
     df.columns=headers
     print(df.count())
     df.dropna(inplace=True)
     df.drop_duplicates(subset=["Product","Weight","Price","Unit_Price","Availability","Category"],inplace=True)
     print(df.count())
     df['Price'] = df['Price'].apply(limpiar_precio)
-    df['Unit_Price'] = df['Unit_Price'].apply(limpiar_precio_unitario)
-    df['Unit_Price'] = df['Unit_Price'].apply(normalizar_precio_unitario)
+    df['Unit_Price'] = parsear_precios_unidad(df['Unit_Price'])
     df['Parent_Category']=df['Category'].str.split('>').str[0]
     df['Category']=df['Category'].str.split('>').str[1]
-    df['Unit']=df['Weight'].apply(colu_unidades)
     print(df['Availability'].value_counts())
     df['Availability']=df['Availability'].apply(disponibilidad)
-    df['Weight']=df['Weight'].apply(limpiar_peso)
-    df['Weight']=df['Weight'].apply(normalizar_peso)
-    df_restantes_str = df[df['Weight'].apply(lambda x: isinstance(x, str))]
-    print(df_restantes_str)
+    df['Weight'], df['Unit'] = pesos_y_unidades(df['Weight'])
+    print(df[df['Weight'].isna()])
     print(df.count())
     df=df.drop_duplicates(subset=['Product','Weight','Price','Unit_Price','Availability','Category','Parent_Category','Unit'])
     print(df.count())
-    filtered_df = df[~df['Weight'].apply(lambda x: isinstance(x, str)) & df['Weight'].notna()]
+    filtered_df = df[df['Weight'].notna()]
     return filtered_df
 
 ###MERCADONA
 def extract_transform_mercadona(df):
+    df=quitar_origen(df,headers_mercadona)
     df.columns=headers_mercadona
     print(df.count())
     df.dropna(inplace=True)
@@ -264,34 +130,26 @@ def extract_transform_mercadona(df):
     print(df.count())
     print(df)
     df['Price'] = df['Price'].apply(limpiar_precio)
-    df['Unit_Price'] = df['Unit_Price'].apply(limpiar_precio_unitario)
-    
-    df['Unit_Price'] = df['Unit_Price'].apply(normalizar_precio_unitario)
+    df['Unit_Price'] = parsear_precios_unidad(df['Unit_Price'])
     
     df['Parent_Category']=df['Category'].str.split('-').str[0]
     df['Category']=df['Category'].str.split('-').str[1]
     df['Availability']=0
-    df['Weight']=df['Weight'].apply(limpiar_peso)
-    df['Unit']=df['Weight'].apply(colu_unidades)
-    df['Weight']=df['Weight'].apply(normalizar_peso)
+    df['Weight'], df['Unit'] = pesos_y_unidades(df['Weight'])
     print(df)
     return df
 
 ###CARREFOUR
 def extract_transform_carrefour(df):
+    df=quitar_origen(df,headers_carrefour)
     df.columns=headers_carrefour
     df.dropna(inplace=True)
     df.drop_duplicates(inplace=True)
     df[['Product', 'Weight']] = df['Product'].apply(extraer_peso_final)
     df['Price'] = df['Price'].apply(limpiar_precio)
-    df['Unit_Price'] = df['Unit_Price'].apply(limpiar_precio_unitario)
-    
-    df['Unit_Price'] = df['Unit_Price'].apply(normalizar_precio_unitario)
+    df['Unit_Price'] = parsear_precios_unidad(df['Unit_Price'])
     df['Availability']=df['Availability'].apply(disponibilidad)
-    df['Weight']=df['Weight'].apply(limpiar_peso)
-    df['Unit']=df['Weight'].apply(colu_unidades)
-
-    df['Weight']=df['Weight'].apply(normalizar_peso)
+    df['Weight'], df['Unit'] = pesos_y_unidades(df['Weight'])
     print(df)
     return df
 
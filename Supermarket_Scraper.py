@@ -1,180 +1,69 @@
-import os 
-import re
-import csv
-import time 
 import random 
 import sqlite3
 import keyboard
 import traceback
 from datetime import datetime
-from bs4 import BeautifulSoup
-from seleniumbase import Driver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import ElementClickInterceptedException, StaleElementReferenceException
-import signal
 import sys
+import argparse
+from scraper_common import click_element, crear_driver, guardar_csv, instalar_cierre, wait_for_elements
+from scraper_profile import medidor_trafico
+from scraper_ritmo import controlador_ritmo
+from scraper_metricas import metricas
+from scraper_waits import contador_esperas, esperar_dom_estable, esperar_pagina, esperar_rejilla
+from scraper_sinks import SumideroCSV
+from scraper_replay import grabador_html
+from scraper_tracing import trazador
+from scraper_logging import NIVELES, campos, configurar_logging, obtener_logger, registrar_producto
+from mercadona_parser import JS_HTML_REJILLA, parsear_celda_bs4, parsear_productos_html
 
-def wait_for_elements(driver, by, selector, timeout=10, multiple=False):
-    """Espera a que uno o varios elementos estén presentes en la página."""
-    wait = WebDriverWait(driver, timeout)
-    if multiple:
-        return wait.until(EC.presence_of_all_elements_located((by, selector)))
-    else:
-        return wait.until(EC.presence_of_element_located((by, selector)))
-
-def click_element(driver, by, selector, timeout=10):
-    """Espera y hace clic en un elemento."""
-    try:
-        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((by, selector))).click()
-    except Exception as e:
-        print(f"No se pudo hacer clic en el elemento: {e}")
+log = obtener_logger('mercadona')
 
 def mercadona_csv(datos, nombre_archivo="dia.csv"):
-    """
-    Guarda los datos en un archivo CSV.
-
-    Parámetros:
-    datos -- Lista de diccionarios con los datos a guardar.
-    nombre_archivo -- Nombre del archivo CSV a crear.
-    """
-    if not datos:
-        print("No hay datos para guardar.")
-        return
-    
-    columnas = datos[0].keys()
-    existe_archivo = os.path.isfile(nombre_archivo)
-
-    with open(nombre_archivo, 'a+' if existe_archivo else 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=columnas)
+    """Guarda los datos en un archivo CSV."""
+    guardar_csv(datos, nombre_archivo)
 
-        if not existe_archivo:
-            writer.writeheader()
+# Perfil ligero del navegador (se activa con --ligero)
+perfil_ligero = False
 
-        writer.writerows(datos)
+# Ritmo de navegación (scraper_ritmo.py)
+RITMO = {'pausa_inicial': 2.0, 'pausa_min': 0.0, 'paso': 0.05}
 
-def iniciar_driver():
+def iniciar_driver(directorio_perfil=None):
     """Inicia el driver de Selenium con las configuraciones necesarias."""
-    driver = Driver(
-        browser="chrome",
-        uc=True,
-        headless2=False,
-        incognito=False,
-        agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
-        do_not_track=True,
-        undetectable=True
-    )
-    driver.maximize_window()
-    return driver
-
-def calcular_precio_unitario(formato, precio):
+    return crear_driver(perfil_ligero, directorio_perfil)
+
+def obtener_datos_productos(driver, categoria):
     """
-    Calcula el precio por litro o por kilogramo basado en el formato del producto.
-    
-    Args:
-        formato (str): El formato del producto (ej: "2 botellas x 2 L", "5 L", "400 g")
-        precio (str): El precio del producto como string
-    
-    Returns:
-        float: Precio por litro o por kg, o None si no se puede calcular
+    Obtiene los datos de los productos dentro de una categoría.
+
+    El HTML de toda la rejilla se lee con una sola llamada a WebDriver y se
+    parsea de una vez con lxml.
     """
-    try:
-        # Convertir precio a float
-        precio = float(precio)
-        
-        # Patrones comunes
-        litros_pattern = r'(\d+(?:\.\d+)?)\s*(?:L|l|litro)'
-        ml_pattern = r'(\d+(?:\.\d+)?)\s*(?:ml|ML|cc)'
-        kg_pattern = r'(\d+(?:\.\d+)?)\s*(?:kg|KG|Kg)'
-        g_pattern = r'(\d+(?:\.\d+)?)\s*(?:g|G|gr|GR)'
-        unidades_pattern = r'(\d+)\s*(?:botella|lata|pack|unidad|ud)'
-        
-        # Buscar patrones en el formato
-        litros = re.findall(litros_pattern, formato)
-        ml = re.findall(ml_pattern, formato)
-        kg = re.findall(kg_pattern, formato)
-        g = re.findall(g_pattern, formato)
-        unidades = re.findall(unidades_pattern, formato)
-        
-        cantidad_total = 0
-        
-        # Calcular cantidad total
-        if litros:
-            cantidad_total = sum(float(x) for x in litros)
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif ml:
-            cantidad_total = sum(float(x) for x in ml) / 1000  # convertir a litros
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif kg:
-            cantidad_total = sum(float(x) for x in kg)
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif g:
-            cantidad_total = sum(float(x) for x in g) / 1000  # convertir a kg
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        return None
-        
-    except Exception as e:
-        print(f"Error calculando precio unitario para formato '{formato}': {str(e)}")
-        return None
+    wait_for_elements(driver, By.CSS_SELECTOR, 'div.product-cell[data-testid="product-cell"]', multiple=True)
+    with trazador.span('lectura_dom', sitio='mercadona'):
+        html_rejilla = driver.execute_script(JS_HTML_REJILLA)
+    with trazador.span('parseo', sitio='mercadona'):
+        productos = parsear_productos_html(html_rejilla, categoria)
+    log.info("Total productos encontrados", extra=campos(productos=len(productos)))
 
-def obtener_datos_productos(driver, categoria):
-    """Obtiene los datos de los productos dentro de una categoría."""
+    for producto in productos:
+        registrar_producto(log, producto, ['titulo', 'formato', 'precio', 'precio_unitario'])
+    return productos
+
+def obtener_datos_productos_por_celda(driver, categoria):
+    """Obtiene los datos leyendo y parseando cada celda de producto por separado."""
     productos = []
     elemento_productos = wait_for_elements(driver, By.CSS_SELECTOR, 'div.product-cell[data-testid="product-cell"]', multiple=True)
-    print(f"Total productos encontrados: {len(elemento_productos)}")
+    log.info("Total productos encontrados", extra=campos(productos=len(elemento_productos)))
 
     for anuncio in elemento_productos: 
         html_content = anuncio.get_attribute('innerHTML')
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Obtener el título
-        h4_element = soup.find('h4', class_="subhead1-r product-cell__description-name", attrs={"data-testid": "product-cell-name"})
-        titulo = h4_element.text if h4_element else "Título no disponible"
-
-        # Obtener la descripción detallada (cantidad/peso)
-        formato_element = soup.find('div', class_="product-format product-format__size--cell")
-        if formato_element:
-            span_elements = formato_element.find_all('span', class_="footnote1-r")
-            formato = " ".join(span.text.strip() for span in span_elements) if span_elements else "Formato no disponible"
-        else:
-            formato = "Formato no disponible"
-
-        # Obtener el precio
-        p_element = soup.find('p', class_="product-price__unit-price subhead1-b", attrs={"data-testid": "product-price"})
-        if p_element is None:
-            p_element = soup.find('p', class_="product-price__unit-price subhead1-b product-price__unit-price--discount", attrs={"data-testid": "product-price"})
-        
-        precio = p_element.text.replace(".", "").replace(",", ".").replace("€", "").strip() if p_element else "Precio no disponible"
-        
-        # Calcular precio unitario
-        precio_unitario = None
-        if precio != "Precio no disponible" and formato != "Formato no disponible":
-            precio_unitario = calcular_precio_unitario(formato, precio)
-        
-        print(f"Producto: {titulo}\nFormato: {formato}\nPrecio: {precio}\nPrecio unitario: {precio_unitario:.2f}€/unidad" if precio_unitario else "Precio unitario: No disponible")
-        
-        productos.append({
-            'titulo': titulo,
-            'formato': formato,
-            'precio': precio,
-            'precio_unitario': f"{precio_unitario:.2f}" if precio_unitario is not None else "No disponible",
-            'categoria': categoria,
-            'fecha_extraccion': datetime.now().strftime('%Y-%m-%d')
-        })
+        productos.append(parsear_celda_bs4(html_content, categoria))
     return productos
 
 def cerrar_modal_si_existe(driver):
@@ -184,23 +73,13 @@ def cerrar_modal_si_existe(driver):
             EC.presence_of_element_located((By.CSS_SELECTOR, '[data-testid="mask"]'))
         )
         modal.click()
-        time.sleep(1)
-    except:
-        pass
-
-def signal_handler(sig, frame):
-    print('\nCerrando el navegador gracefully...')
-    try:
-        if 'driver' in globals():
-            driver.quit()
+        esperar_dom_estable(driver, 'mercadona', referencia=1)
     except:
         pass
-    sys.exit(0)
-
-signal.signal(signal.SIGINT, signal_handler)
 
-def explorar_categorias(driver):
-    lista_productos = []
+def explorar_categorias(driver, sumidero):
+    """Recorre todas las subcategorías escribiendo sus productos en el sumidero según se obtienen."""
+    total_productos = 0
     url_base = driver.current_url
     max_reintentos_categoria = 3
     
@@ -216,12 +95,12 @@ def explorar_categorias(driver):
                     
                     if driver.current_url != url_base:
                         driver.get(url_base)
-                        time.sleep(3)
+                        esperar_pagina(driver, 'mercadona', referencia=3)
                     
                     # Obtener la lista actualizada de categorías
                     print("Actualizando lista de categorías...")
                     driver.execute_script("window.scrollTo(0, 0);")  # Scroll al inicio
-                    time.sleep(2)
+                    esperar_dom_estable(driver, 'mercadona', referencia=2)
                     
                     # Intentar obtener y hacer clic en la categoría
                     max_intentos = 3
@@ -235,7 +114,7 @@ def explorar_categorias(driver):
                                 if modal.is_displayed():
                                     print("Modal detectado, intentando cerrar...")
                                     modal.click()
-                                    time.sleep(1)
+                                    esperar_dom_estable(driver, 'mercadona', referencia=1)
                             except:
                                 pass
                             
@@ -247,25 +126,25 @@ def explorar_categorias(driver):
                             
                             # Hacer scroll y clic
                             driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", categoria)
-                            time.sleep(2)
+                            esperar_dom_estable(driver, 'mercadona', referencia=2)
                             driver.execute_script("arguments[0].click();", categoria)
                             break
                         except Exception as e:
                             if intento_categoria == max_intentos - 1:
                                 raise
                             print(f"Error en intento {intento_categoria + 1}: {str(e)}")
-                            time.sleep(2)
+                            controlador_ritmo.esperar()
                             driver.refresh()
-                            time.sleep(3)
+                            esperar_pagina(driver, 'mercadona', referencia=3)
                     
-                    time.sleep(3)
+                    esperar_pagina(driver, 'mercadona', referencia=3)
 
                     # Esperar a que la categoría esté abierta y obtener las subcategorías
                     try:
                         print("Buscando subcategorías...")
                         # Esperar a que la categoría esté abierta
                         el_category = wait_for_elements(driver, By.CSS_SELECTOR, 'li.category-menu__item.open', multiple=False)
-                        time.sleep(2)
+                        esperar_dom_estable(driver, 'mercadona', referencia=2)
                         
                         # Obtener todas las subcategorías directamente
                         subcategorias = wait_for_elements(driver, By.CSS_SELECTOR, 'li.category-menu__item.open li.category-item button.category-item__link', multiple=True)
@@ -301,14 +180,14 @@ def explorar_categorias(driver):
                                     
                                     # Hacer scroll y clic en el botón
                                     driver.execute_script("arguments[0].scrollIntoView(true);", sub_element)
-                                    time.sleep(2)
+                                    esperar_dom_estable(driver, 'mercadona', referencia=2)
                                     driver.execute_script("arguments[0].click();", sub_element)
                                     
                                 except Exception as e:
                                     print(f"Error al obtener nombre o navegar: {str(e)}")
                                     continue
                                 
-                                time.sleep(3)
+                                esperar_rejilla(driver, 'mercadona', referencia=3)
                                 
                                 # Esperar a que los productos se carguen
                                 try:
@@ -316,7 +195,7 @@ def explorar_categorias(driver):
                                 except:
                                     print("No se detectaron productos, reintentando navegación...")
                                     driver.refresh()
-                                    time.sleep(3)
+                                    esperar_rejilla(driver, 'mercadona', referencia=3)
                                     try:
                                         wait_for_elements(driver, By.CSS_SELECTOR, 'div.product-cell[data-testid="product-cell"]', timeout=10, multiple=True)
                                     except:
@@ -325,13 +204,19 @@ def explorar_categorias(driver):
                                 
                                 # Obtener los productos
                                 print(f"Obteniendo productos de {nombre}...")
-                                productos = obtener_datos_productos(driver, f"{categoria_actual} - {nombre}")
-                                lista_productos.extend(productos)
+                                with trazador.span('categoria', sitio='mercadona', categoria=f"{categoria_actual} - {nombre}") as span:
+                                    productos = obtener_datos_productos(driver, f"{categoria_actual} - {nombre}")
+                                    span['productos'] = len(productos)
+                                medidor_trafico.medir(driver, f"{categoria_actual} - {nombre}")
+                                grabador_html.grabar(driver, 'mercadona', f"{categoria_actual} - {nombre}")
+                                sumidero.escribir(productos)
+                                total_productos += len(productos)
+                                print(f"Guardados {len(productos)} productos (total: {total_productos})")
                                 
                                 # Volver a la categoría principal
                                 print("Volviendo a la categoría principal...")
                                 driver.get(url_base)
-                                time.sleep(3)
+                                esperar_pagina(driver, 'mercadona', referencia=3)
                                 
                                 # Reabrir la categoría principal
                                 print("Reabriendo la categoría...")
@@ -340,14 +225,15 @@ def explorar_categorias(driver):
                                     if cat.text.replace(",", "") == categoria_actual:
                                         driver.execute_script("arguments[0].click();", cat)
                                         break
-                                time.sleep(3)
+                                esperar_dom_estable(driver, 'mercadona', referencia=3)
                                 
                             except Exception as e:
                                 print(f"Error al obtener información de la subcategoría: {str(e)}")
+                                trazador.evento('reintento', sitio='mercadona', categoria=categoria_actual, error=str(e)[:200])
                                 print("Stacktrace:")
                                 print(traceback.format_exc())
                                 driver.get(url_base)
-                                time.sleep(3)
+                                esperar_pagina(driver, 'mercadona', referencia=3)
                                 continue
 
                     except Exception as e:
@@ -355,7 +241,7 @@ def explorar_categorias(driver):
                         print("Stacktrace:")
                         print(traceback.format_exc())
                         driver.get(url_base)
-                        time.sleep(3)
+                        esperar_pagina(driver, 'mercadona', referencia=3)
                         continue
 
                     # Después de procesar todas las subcategorías exitosamente
@@ -366,7 +252,7 @@ def explorar_categorias(driver):
                     print("Stacktrace:")
                     print(traceback.format_exc())
                     driver.get(url_base)
-                    time.sleep(3)
+                    esperar_pagina(driver, 'mercadona', referencia=3)
                     if intento == max_reintentos_categoria - 1:
                         print(f"Se agotaron los reintentos para la categoría {i+1}")
                     continue
@@ -377,32 +263,175 @@ def explorar_categorias(driver):
         print(traceback.format_exc())
     
     finally:
-        return lista_productos
+        return total_productos
+
+URL_INICIO = "https://tienda.mercadona.es/"
+URL_CATEGORIAS = "https://tienda.mercadona.es/categories/112"
+
+def preparar_sesion(driver):
+    """Abre la tienda, acepta las cookies y navega a la sección de categorías."""
+    driver.get(URL_INICIO)
+    # Aceptar cookies
+    click_element(driver, By.XPATH, "//button[normalize-space()='Aceptar']")
+    esperar_dom_estable(driver, 'mercadona', referencia=3)
+
+    # Navegar a la sección de categorías
+    driver.get(URL_CATEGORIAS)
+
+def abrir_categoria(driver, url_base, indice_categoria):
+    """Abre la categoría indicada en el menú lateral y devuelve su nombre."""
+    if driver.current_url != url_base:
+        driver.get(url_base)
+        esperar_pagina(driver, 'mercadona', referencia=3)
+
+    driver.execute_script("window.scrollTo(0, 0);")
+
+    # Cerrar el modal solo si está visible, sin esperar a que aparezca
+    try:
+        modal = driver.find_element(By.CSS_SELECTOR, '[data-testid="mask"]')
+        if modal.is_displayed():
+            modal.click()
+            esperar_dom_estable(driver, 'mercadona', referencia=1)
+    except:
+        pass
+
+    categorias = wait_for_elements(driver, By.CSS_SELECTOR, '.category-menu__header', multiple=True)
+    categoria = categorias[indice_categoria]
+    nombre_categoria = categoria.text.replace(",", "")
+
+    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", categoria)
+    driver.execute_script("arguments[0].click();", categoria)
+    wait_for_elements(driver, By.CSS_SELECTOR, 'li.category-menu__item.open', multiple=False)
+    esperar_dom_estable(driver, 'mercadona', referencia=2)
+    return nombre_categoria
+
+def construir_tareas(driver):
+    """
+    Recorre el menú una sola vez y devuelve la lista de pares (categoría, subcategoría)
+    que hay que procesar.
+
+    Cada tarea guarda los índices y los nombres, de forma que un worker pueda
+    reabrir la subcategoría en su propio navegador y comprobar que es la correcta.
+    """
+    tareas = []
+    url_base = driver.current_url
+    categorias = wait_for_elements(driver, By.CSS_SELECTOR, '.category-menu__header', multiple=True)
+    total_categorias = len(categorias)
+
+    for i in range(total_categorias):
+        try:
+            nombre_categoria = abrir_categoria(driver, url_base, i)
+            subcategorias = wait_for_elements(driver, By.CSS_SELECTOR, 'li.category-menu__item.open li.category-item button.category-item__link', multiple=True)
+            for idx, sub_element in enumerate(subcategorias):
+                tareas.append({
+                    'indice_categoria': i,
+                    'categoria': nombre_categoria,
+                    'indice_subcategoria': idx,
+                    'subcategoria': sub_element.text.strip()
+                })
+            print(f"Categoría {i+1}/{total_categorias} ({nombre_categoria}): {len(subcategorias)} subcategorías")
+        except Exception as e:
+            print(f"Error construyendo las tareas de la categoría {i+1}: {str(e)}")
+            driver.get(url_base)
+            esperar_rejilla(driver, 'mercadona', referencia=3)
+
+    print(f"Total de tareas (subcategorías) a procesar: {len(tareas)}")
+    return tareas
+
+def procesar_tarea(driver, url_base, tarea):
+    """Abre la subcategoría de una tarea y devuelve sus productos."""
+    nombre_categoria = abrir_categoria(driver, url_base, tarea['indice_categoria'])
+    if nombre_categoria != tarea['categoria']:
+        raise Exception(f"La categoría {tarea['indice_categoria']} es '{nombre_categoria}', se esperaba '{tarea['categoria']}'")
+
+    categoria_abierta = wait_for_elements(driver, By.CSS_SELECTOR, 'li.category-menu__item.open', multiple=False)
+    subcategorias_links = categoria_abierta.find_elements(By.CSS_SELECTOR, 'button.category-item__link')
+
+    # Buscar por índice y, si el menú ha cambiado, por nombre
+    sub_element = None
+    idx = tarea['indice_subcategoria']
+    if idx < len(subcategorias_links) and subcategorias_links[idx].text.strip() == tarea['subcategoria']:
+        sub_element = subcategorias_links[idx]
+    else:
+        for link in subcategorias_links:
+            if link.text.strip() == tarea['subcategoria']:
+                sub_element = link
+                break
+    if sub_element is None:
+        raise Exception(f"No se encontró la subcategoría '{tarea['subcategoria']}'")
+
+    driver.execute_script("arguments[0].scrollIntoView(true);", sub_element)
+    driver.execute_script("arguments[0].click();", sub_element)
+    esperar_pagina(driver, 'mercadona', referencia=3)
+
+    wait_for_elements(driver, By.CSS_SELECTOR, 'div.product-cell[data-testid="product-cell"]', timeout=10, multiple=True)
+    productos = obtener_datos_productos(driver, f"{tarea['categoria']} - {tarea['subcategoria']}")
+    medidor_trafico.medir(driver, f"{tarea['categoria']} - {tarea['subcategoria']}")
+    grabador_html.grabar(driver, 'mercadona', f"{tarea['categoria']} - {tarea['subcategoria']}")
+    return productos
+
+def tareas_cola(driver):
+    """Tareas iniciales para la cola de trabajo (scraper_cola.py): una por subcategoría."""
+    return [(f"{tarea['categoria']} > {tarea['subcategoria']}", tarea) for tarea in construir_tareas(driver)]
+
+def ejecutar_tarea_cola(driver, tarea):
+    """Procesa una tarea de la cola de trabajo. Devuelve (productos, tareas nuevas)."""
+    return procesar_tarea(driver, URL_CATEGORIAS, tarea), []
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scraper de Mercadona')
+    parser.add_argument('--workers', type=int, default=1, help='Número de navegadores en paralelo (1 = modo secuencial; más de 1 usa scraper_engine.py)')
+    parser.add_argument('--ligero', action='store_true', help='Navegador sin interfaz, ventana pequeña y sin imágenes, fuentes, vídeo ni analítica')
+    parser.add_argument('--grabar-html', help='Directorio donde guardar el HTML renderizado de cada página como fixture (ver scraper_replay.py)')
+    parser.add_argument('--traza', help='Archivo JSONL donde registrar la duración de cada fase (resumen con scraper_tracing.py)')
+    parser.add_argument('--log-nivel', choices=NIVELES, default='INFO', help='DEBUG añade el detalle de cada producto')
+    parser.add_argument('--log-formato', choices=['texto', 'json'], default='texto')
+    parser.add_argument('--log-muestreo', type=int, default=1, help='En DEBUG, registrar solo uno de cada N productos')
+    parser.add_argument('--metricas-puerto', type=int, help='Exponer métricas de Prometheus en http://127.0.0.1:<puerto>/metrics')
+    parser.add_argument('--metricas-archivo', help='Archivo .prom con las métricas, reescrito cada --metricas-intervalo segundos')
+    parser.add_argument('--metricas-intervalo', type=int, default=15)
+    args = parser.parse_args()
+    config_log = {'nivel': args.log_nivel, 'formato': args.log_formato, 'muestreo': args.log_muestreo}
+    configurar_logging(**config_log)
+    perfil_ligero = args.ligero
+    controlador_ritmo.configurar(**RITMO)
+    grabador_html.directorio = args.grabar_html
+    trazador.activar(args.traza)
+
+    fecha = datetime.now().date()
+    print(f"Iniciando escaneo a fecha: {datetime.now()}")
+
+    if args.workers > 1:
+        # El reparto entre navegadores lo hace el motor común (cola de tareas, reintentos y métricas)
+        import scraper_engine
+        total = scraper_engine.ejecutar('mercadona', args.workers, salida=f"mercadona_{fecha}.csv",
+                                        config=scraper_engine.config_proceso(args))
+        if not total:
+            print("No se encontraron productos.")
+        sys.exit(0)
+
+    metricas.activar(args.metricas_puerto, args.metricas_archivo, args.metricas_intervalo, sitio='mercadona')
     driver = iniciar_driver()
+    instalar_cierre(lambda: driver)
+    sumidero = SumideroCSV(f"mercadona_{fecha}.csv")
     try:
-        fecha = datetime.now().date()
-        print(f"Iniciando escaneo a fecha: {datetime.now()}")
-
-        driver.get("https://tienda.mercadona.es/")
-        # Aceptar cookies
-        click_element(driver, By.XPATH, "//button[normalize-space()='Aceptar']")
-        time.sleep(3)
-        
-        # Navegar a la sección de categorías
-        driver.get("https://tienda.mercadona.es/categories/112")
+        preparar_sesion(driver)
         
-        # Extraer datos de las categorías y productos
-        productos = explorar_categorias(driver)
+        # Extraer datos de las categorías y productos (se guardan según se obtienen)
+        total = explorar_categorias(driver, sumidero)
         
-        if productos:
-            mercadona_csv(productos, f"mercadona_{fecha}.csv")
-        else:
+        if not total:
             print("No se encontraron productos.")
 
     except Exception as e:
         print(f"Error durante el proceso de scraping: {e}")
     
     finally:
-        driver.quit()
\ No newline at end of file
+        driver.quit()
+        sumidero.cerrar()
+        medidor_trafico.resumen()
+        contador_esperas.resumen()
+        controlador_ritmo.resumen()
+        metricas.resumen()
+        metricas.cerrar()
+        trazador.cerrar()
\ No newline at end of file
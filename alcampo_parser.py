@@ -0,0 +1,276 @@
+import re
+import json
+from datetime import datetime
+from urllib.parse import urljoin, urlparse
+import lxml.html
+from lxml import etree
+from cssselect import HTMLTranslator
+
+# Selectores CSS de la lista de productos y de las tarjetas. Son la única copia:
+# los scripts los reciben como SELECTORES y los parsers sin navegador los
+# traducen a XPath (como en carrefour_parser.py).
+SELECTORES = {
+    'contenedor': "div[data-retailer-anchor='product-list']",
+    'tarjetas': 'div.sc-kdIgRK',
+    'skeleton': 'div._skeleton_1ndyq_12',
+    'enlace': 'a[data-test="fop-product-link"]',
+    'titulo': 'div.title-container h3',
+    'precio': 'div.price-pack-size-container span[data-test="fop-price"]',
+    'tamano': 'div[data-test="fop-size"]',
+    'formato': 'span._text_cn5lb_1',
+    'precio_unidad': 'span[data-test="fop-price-per-unit"]',
+    'sin_alternativas': 'button[data-test="fop-controls-no-alternatives-button"]',
+    'contador': 'button[data-test="counter-button"]'
+}
+JS_SELECTORES = f"const SELECTORES = {json.dumps(SELECTORES)};"
+
+# Script que devuelve, en una sola llamada, los datos de todas las tarjetas de la
+# lista de productos que ya han terminado de cargar (sin skeleton y con todos los
+# campos presentes). Las tarjetas incompletas se recogerán en el siguiente scroll.
+JS_EXTRAER_LOTE = JS_SELECTORES + """
+const contenedor = document.querySelector(SELECTORES.contenedor);
+if (!contenedor) return null;
+const texto = el => el ? el.innerText.trim() : null;
+const lote = [];
+for (const card of contenedor.querySelectorAll(SELECTORES.tarjetas)) {
+    if (card.querySelector(SELECTORES.skeleton)) continue;
+
+    const enlace = card.querySelector(SELECTORES.enlace);
+    const titulo = texto(card.querySelector(SELECTORES.titulo));
+    const precio = texto(card.querySelector(SELECTORES.precio));
+    const tamano = card.querySelector(SELECTORES.tamano);
+    const formato = tamano ? texto(tamano.querySelector(SELECTORES.formato)) : null;
+    const precioUnidad = tamano ? texto(tamano.querySelector(SELECTORES.precio_unidad)) : null;
+    if (titulo === null || precio === null || formato === null || precioUnidad === null) continue;
+
+    let disponibilidad = 'desconocido';
+    if (card.querySelector(SELECTORES.sin_alternativas)) {
+        disponibilidad = 'agotado';
+    } else if (card.querySelector(SELECTORES.contador)) {
+        disponibilidad = 'disponible';
+    }
+
+    lote.push({
+        url: enlace ? enlace.href : null,
+        titulo: titulo,
+        formato: formato,
+        precio: precio,
+        precio_unidad: precioUnidad,
+        disponibilidad: disponibilidad
+    });
+}
+return lote;
+"""
+
+# Campos baratos de una tarjeta (arguments[0]) en una sola llamada: URL, precio
+# y disponibilidad, normalizados como en obtener_datos_producto. Con el índice de
+# productos vistos bastan para decidir si hace falta leer el resto.
+JS_CAMPOS_BARATOS = JS_SELECTORES + """
+const card = arguments[0];
+const enlace = card.querySelector(SELECTORES.enlace);
+const precio = card.querySelector(SELECTORES.precio);
+let disponibilidad = 'desconocido';
+if (card.querySelector(SELECTORES.sin_alternativas)) {
+    disponibilidad = 'agotado';
+} else if (card.querySelector(SELECTORES.contador)) {
+    disponibilidad = 'disponible';
+}
+return {
+    url: enlace ? enlace.href : null,
+    precio: precio ? precio.innerText.replace(/€/g, '').trim() : null,
+    disponibilidad: disponibilidad
+};
+"""
+
+def xpath_css(selector):
+    """XPath precompilado equivalente a querySelectorAll(selector) sobre un elemento (solo descendientes)."""
+    return etree.XPath(HTMLTranslator().css_to_xpath(selector, prefix='descendant::'))
+
+# Los selectores de SELECTORES precompilados para leer las tarjetas de una
+# página guardada sin navegador; replican JS_EXTRAER_LOTE.
+XPATH_CONTENEDOR = xpath_css(SELECTORES['contenedor'])
+XPATH_TARJETAS = xpath_css(SELECTORES['tarjetas'])
+XPATH_SKELETON = xpath_css(SELECTORES['skeleton'])
+XPATH_ENLACE = xpath_css(SELECTORES['enlace'])
+XPATH_TITULO = xpath_css(SELECTORES['titulo'])
+XPATH_PRECIO = xpath_css(SELECTORES['precio'])
+XPATH_TAMANO = xpath_css(SELECTORES['tamano'])
+XPATH_FORMATO = xpath_css(SELECTORES['formato'])
+XPATH_PRECIO_UNIDAD = xpath_css(SELECTORES['precio_unidad'])
+XPATH_SIN_ALTERNATIVAS = xpath_css(SELECTORES['sin_alternativas'])
+XPATH_CONTADOR = xpath_css(SELECTORES['contador'])
+
+def texto(elementos):
+    """Texto del primer elemento sin espacios sobrantes (o None si no hay), como innerText.trim()."""
+    if not elementos:
+        return None
+    return re.sub(r'[ \t]+', ' ', elementos[0].text_content()).strip()
+
+def campo_url(tarjeta, url_base):
+    enlaces = XPATH_ENLACE(tarjeta)
+    if not enlaces or enlaces[0].get('href') is None:
+        return None
+    return urljoin(url_base or '', enlaces[0].get('href'))
+
+def campo_titulo(tarjeta, url_base):
+    return texto(XPATH_TITULO(tarjeta))
+
+def campo_precio(tarjeta, url_base):
+    return texto(XPATH_PRECIO(tarjeta))
+
+def campo_formato(tarjeta, url_base):
+    tamano = XPATH_TAMANO(tarjeta)
+    return texto(XPATH_FORMATO(tamano[0])) if tamano else None
+
+def campo_precio_unidad(tarjeta, url_base):
+    tamano = XPATH_TAMANO(tarjeta)
+    return texto(XPATH_PRECIO_UNIDAD(tamano[0])) if tamano else None
+
+def campo_disponibilidad(tarjeta, url_base):
+    if XPATH_SIN_ALTERNATIVAS(tarjeta):
+        return 'agotado'
+    if XPATH_CONTADOR(tarjeta):
+        return 'disponible'
+    return 'desconocido'
+
+# Extractor de cada campo de la tarjeta (el benchmark los mide por separado)
+CAMPOS_TARJETA = {
+    'url': campo_url,
+    'titulo': campo_titulo,
+    'formato': campo_formato,
+    'precio': campo_precio,
+    'precio_unidad': campo_precio_unidad,
+    'disponibilidad': campo_disponibilidad
+}
+
+def nodos_tarjetas(html):
+    """Tarjetas ya cargadas (sin skeleton) de la lista de productos, o None si no hay lista."""
+    contenedores = XPATH_CONTENEDOR(lxml.html.fromstring(html))
+    if not contenedores:
+        return None
+    return [tarjeta for tarjeta in XPATH_TARJETAS(contenedores[0]) if not XPATH_SKELETON(tarjeta)]
+
+def parsear_lote_html(html, url_base=None):
+    """Equivalente sin navegador de JS_EXTRAER_LOTE sobre una página ya renderizada."""
+    tarjetas = nodos_tarjetas(html)
+    if tarjetas is None:
+        return None
+    lote = []
+    for tarjeta in tarjetas:
+        datos = {campo: extractor(tarjeta, url_base) for campo, extractor in CAMPOS_TARJETA.items()}
+        if None in (datos['titulo'], datos['precio'], datos['formato'], datos['precio_unidad']):
+            continue
+        lote.append(datos)
+    return lote
+
+# Peticiones de la web que devuelven productos (la lista con scroll infinito los
+# pide en lotes a la API y después los pinta como tarjetas)
+PATRON_XHR_PRODUCTOS = re.compile(r'/api/.*product', re.IGNORECASE)
+
+UNIDADES_PRECIO = {'litre': 'l', 'liter': 'l', 'litro': 'l', 'l': 'l', 'kg': 'kg', 'kilo': 'kg', 'kilogram': 'kg',
+                   'each': 'ud', 'unit': 'ud', 'unidad': 'ud', 'ud': 'ud'}
+
+def euros(valor):
+    """'6.99', 6.99 o {'amount': '6.99'} -> '6,99 €', como en las tarjetas."""
+    if isinstance(valor, dict):
+        valor = valor.get('amount', valor.get('value'))
+    try:
+        return f"{float(valor):.2f}".replace('.', ',') + ' €'
+    except (TypeError, ValueError):
+        return None
+
+def primera_clave(objeto, claves):
+    for clave in claves:
+        if objeto.get(clave) not in (None, ''):
+            return objeto[clave]
+    return None
+
+def tarjeta_json(objeto, url_base=None):
+    """
+    Campos de tarjeta (los de JS_EXTRAER_LOTE) a partir de un producto de la
+    API, o None si el objeto no es un producto. La URL (/products/<id>) no es
+    la del enlace de la tarjeta, que lleva además el nombre del producto
+    (/products/<nombre>/<id>), pero acaba en el mismo identificador, que es la
+    clave de procesar_lote.
+    """
+    titulo = primera_clave(objeto, ['name', 'title', 'displayName'])
+    precio = objeto.get('price')
+    if not isinstance(titulo, str) or precio is None or isinstance(precio, bool):
+        return None
+    actual = precio.get('current', precio) if isinstance(precio, dict) else precio
+    importe = euros(actual)
+    if importe is None:
+        return None
+
+    precio_unidad = ''
+    unidad = precio.get('unit') if isinstance(precio, dict) else None
+    if isinstance(unidad, dict) and euros(unidad.get('current', unidad)):
+        nombre = str(unidad.get('label') or unidad.get('unit') or '').rsplit('.', 1)[-1].lower()
+        precio_unidad = f"({euros(unidad.get('current', unidad))} / {UNIDADES_PRECIO.get(nombre, nombre)})"
+
+    formato = primera_clave(objeto, ['size', 'packSizeDescription', 'format'])
+    if isinstance(formato, dict):
+        formato = formato.get('value')
+    identificador = primera_clave(objeto, ['retailerProductId', 'productId', 'id'])
+    disponible = objeto.get('available', objeto.get('isAvailable'))
+    return {
+        'url': urljoin(url_base or '', f"/products/{identificador}") if identificador is not None else None,
+        'titulo': titulo.strip(),
+        'formato': str(formato or '').strip(),
+        'precio': importe,
+        'precio_unidad': precio_unidad,
+        'disponibilidad': 'agotado' if disponible is False else 'disponible' if disponible else 'desconocido'
+    }
+
+def parsear_productos_json(datos, url_base=None, maximo_nodos=200000):
+    """Lote de tarjetas con los productos de una respuesta de la API, en orden de aparición."""
+    lote = []
+    pila = [datos]
+    visitados = 0
+    while pila and visitados < maximo_nodos:
+        valor = pila.pop()
+        visitados += 1
+        if isinstance(valor, dict):
+            tarjeta = tarjeta_json(valor, url_base)
+            if tarjeta:
+                lote.append(tarjeta)
+                continue
+            pila.extend(reversed(list(valor.values())))
+        elif isinstance(valor, list):
+            pila.extend(reversed(valor))
+    return lote
+
+def construir_producto(tarjeta, categoria, fecha=None):
+    """Convierte los campos en bruto de una tarjeta en el registro que se guarda en el CSV."""
+    return {
+        'titulo': tarjeta['titulo'],
+        'formato': tarjeta['formato'],
+        'precio': tarjeta['precio'].replace("€", "").strip(),
+        'precio_unidad': tarjeta['precio_unidad'].replace('(', '').replace(')', ''),
+        'disponibilidad': tarjeta['disponibilidad'],
+        'categoria': categoria,
+        'fecha_scraping': fecha or datetime.now().strftime("%Y-%m-%d")
+    }
+
+def id_producto(url):
+    """Identificador del producto en Alcampo: el último tramo de la ruta de su URL (o None)."""
+    if not url:
+        return None
+    return urlparse(url).path.rstrip('/').rsplit('/', 1)[-1] or None
+
+def procesar_lote(lote, categoria, productos_procesados, fecha=None):
+    """
+    Filtra las tarjetas ya procesadas y devuelve los registros nuevos.
+    Actualiza `productos_procesados` con las claves añadidas: el identificador
+    del producto (id_producto) o, si la tarjeta no tiene enlace, el título,
+    formato y precio.
+    """
+    fecha = fecha or datetime.now().strftime("%Y-%m-%d")
+    nuevos = []
+    for tarjeta in lote or []:
+        clave = id_producto(tarjeta.get('url')) or (tarjeta['titulo'], tarjeta['formato'], tarjeta['precio'])
+        if clave in productos_procesados:
+            continue
+        nuevos.append(construir_producto(tarjeta, categoria, fecha))
+        productos_procesados.add(clave)
+    return nuevos
@@ -1,115 +1,54 @@
-import os 
-import re
-import csv
 import time 
-import random 
 import sqlite3
 import keyboard
 import traceback
 from datetime import datetime
 from bs4 import BeautifulSoup
-from seleniumbase import Driver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import ElementClickInterceptedException, StaleElementReferenceException
-import signal
-import sys
+import argparse
+from scraper_common import click_element, crear_driver, guardar_csv, instalar_cierre, wait_for_elements as esperar_elementos
+from scraper_profile import medidor_trafico
+from scraper_ritmo import controlador_ritmo
+from scraper_metricas import metricas
+from scraper_waits import contador_esperas, esperar_dom_estable, esperar_pagina, esperar_rejilla
+from alcampo_parser import JS_CAMPOS_BARATOS, JS_EXTRAER_LOTE, PATRON_XHR_PRODUCTOS, construir_producto, id_producto, parsear_productos_json, procesar_lote
+from scraper_red import CapturaRed
+from scraper_pool import PoolSesiones
+from scraper_replay import grabador_html
+from scraper_tracing import trazador
+from scraper_huellas import AlmacenHuellas, calcular_huella, marcar_rastreados
+from scraper_vistos import IndiceVistos
+from scraper_logging import NIVELES, atributo, campos, configurar_logging, obtener_logger, registrar_producto
+
+log = obtener_logger('alcampo')
 
-# Reutilizamos las funciones auxiliares del scraper original
 def wait_for_elements(driver, by, selector, timeout=20, multiple=False):
-    """Espera a que uno o varios elementos estén presentes en la página."""
-    wait = WebDriverWait(driver, timeout)
-    if multiple:
-        return wait.until(EC.presence_of_all_elements_located((by, selector)))
-    else:
-        return wait.until(EC.presence_of_element_located((by, selector)))
-
-def click_element(driver, by, selector, timeout=10):
-    """Espera y hace clic en un elemento."""
-    try:
-        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((by, selector))).click()
-    except Exception as e:
-        print(f"No se pudo hacer clic en el elemento: {e}")
+    """Espera a que uno o varios elementos estén presentes (Alcampo tarda más: 20s por defecto)."""
+    return esperar_elementos(driver, by, selector, timeout, multiple)
 
 def alcampo_csv(datos, nombre_archivo="alcampo.csv"):
     """Guarda los datos en un archivo CSV."""
-    if not datos:
-        print("No hay datos para guardar.")
-        return
-    
-    columnas = datos[0].keys()
-    existe_archivo = os.path.isfile(nombre_archivo)
+    guardar_csv(datos, nombre_archivo)
+
+# Perfil ligero del navegador (se activa con --ligero)
+perfil_ligero = False
+
+# Registro de red de Chrome para el modo de extracción 'xhr' (lo activa --extraccion xhr)
+capturar_red = False
+
+# Modos de extracción de una categoría (--extraccion, también en scraper_engine.py)
+MODOS_EXTRACCION = ('lotes', 'xhr', 'tarjetas')
 
-    with open(nombre_archivo, 'a+' if existe_archivo else 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=columnas)
-        if not existe_archivo:
-            writer.writeheader()
-        writer.writerows(datos)
+# Ritmo de navegación (scraper_ritmo.py): 3s entre subcategorías al empezar y nunca menos de 0,5s
+RITMO = {'pausa_inicial': 3.0, 'pausa_min': 0.5, 'paso': 0.1}
 
-def iniciar_driver():
+def iniciar_driver(directorio_perfil=None):
     """Inicia el driver de Selenium con las configuraciones necesarias."""
-    driver = Driver(
-        browser="chrome",
-        uc=True,
-        headless2=False,
-        incognito=False,
-        agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
-        do_not_track=True,
-        undetectable=True
-    )
-    driver.maximize_window()
-    return driver
-
-def calcular_precio_unitario(formato, precio):
-    """Calcula el precio por litro o por kilogramo basado en el formato del producto."""
-    try:
-        precio = float(precio)
-        
-        litros_pattern = r'(\d+(?:\.\d+)?)\s*(?:L|l|litro)'
-        ml_pattern = r'(\d+(?:\.\d+)?)\s*(?:ml|ML|cc)'
-        kg_pattern = r'(\d+(?:\.\d+)?)\s*(?:kg|KG|Kg)'
-        g_pattern = r'(\d+(?:\.\d+)?)\s*(?:g|G|gr|GR)'
-        unidades_pattern = r'(\d+)\s*(?:botella|lata|pack|unidad|ud)'
-        
-        litros = re.findall(litros_pattern, formato)
-        ml = re.findall(ml_pattern, formato)
-        kg = re.findall(kg_pattern, formato)
-        g = re.findall(g_pattern, formato)
-        unidades = re.findall(unidades_pattern, formato)
-        
-        cantidad_total = 0
-        
-        if litros:
-            cantidad_total = sum(float(x) for x in litros)
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif ml:
-            cantidad_total = sum(float(x) for x in ml) / 1000
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif kg:
-            cantidad_total = sum(float(x) for x in kg)
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif g:
-            cantidad_total = sum(float(x) for x in g) / 1000
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        return None
-        
-    except Exception as e:
-        print(f"Error calculando precio unitario para formato '{formato}': {str(e)}")
-        return None
+    return crear_driver(perfil_ligero, directorio_perfil, registro_red=capturar_red)
 
 def aceptar_cookies(driver):
     """Acepta las cookies si aparece el diálogo"""
@@ -120,7 +59,7 @@ def aceptar_cookies(driver):
         )
         boton_cookies.click()
         print("Cookies aceptadas")
-        time.sleep(2)
+        esperar_dom_estable(driver, 'alcampo', referencia=2)
     except Exception as e:
         print(f"No se encontró el diálogo de cookies o ya estaban aceptadas: {str(e)}")
 
@@ -128,7 +67,7 @@ def scroll_suave(driver, pixels):
     """Hace un scroll suave de la página."""
     for i in range(0, pixels, 100):  # Scroll de 100 en 100 píxeles
         driver.execute_script(f"window.scrollBy(0, 100);")
-        time.sleep(0.5)  # Pequeña pausa entre cada scroll
+        time.sleep(0.1)  # Pausa mínima para que cada paso dispare la carga diferida
 
 def esperar_carga_productos(driver, contenedor_principal, max_intentos=5):
     """Espera a que se carguen nuevos productos después de hacer scroll."""
@@ -138,21 +77,19 @@ def esperar_carga_productos(driver, contenedor_principal, max_intentos=5):
     for intento in range(max_intentos):
         # Hacer scroll suave hacia abajo (300 píxeles cada vez)
         scroll_suave(driver, 300)
-        time.sleep(2)
+        esperar_dom_estable(driver, 'alcampo', referencia=2)
         
         # Verificar si la altura de la página cambió
         nueva_altura = driver.execute_script("return document.documentElement.scrollHeight")
         nuevos_productos = len(contenedor_principal.find_elements(By.CSS_SELECTOR, 'div.product-card-container'))
         
-        print(f"Intento {intento + 1}: Productos anteriores: {productos_anteriores}, Nuevos productos: {nuevos_productos}")
+        log.debug("Scroll", extra=campos(intento=intento + 1, productos_anteriores=productos_anteriores, productos=nuevos_productos))
         
         if nueva_altura > altura_anterior or nuevos_productos > productos_anteriores:
-            print("Se detectaron nuevos productos, esperando a que carguen completamente...")
-            time.sleep(3)  # Dar tiempo extra para la carga completa
+            esperar_rejilla(driver, 'alcampo', referencia=3, navegacion=False)
             return True
             
-        print(f"Esperando nuevos productos... Intento {intento + 1}/{max_intentos}")
-        time.sleep(1)
+        esperar_dom_estable(driver, 'alcampo', referencia=1)
     
     return False
 
@@ -233,11 +170,10 @@ def obtener_datos_productos_alcampo(driver, categoria):
             timeout=15
         )
         
-        print("\nVerificando estructura del contenedor principal:")
-        print(f"Clases del contenedor: {contenedor_principal.get_attribute('class')}")
+        log.debug("Clases del contenedor: %s", atributo(contenedor_principal, 'class'))
         
         print("\nEsperando 5 segundos para la carga inicial de productos...")
-        time.sleep(5)
+        esperar_rejilla(driver, 'alcampo', referencia=5, navegacion=False)
 
         while sin_productos_nuevos < max_intentos_sin_nuevos:
             try:
@@ -255,10 +191,10 @@ def obtener_datos_productos_alcampo(driver, categoria):
                 
                 if not elemento_productos:
                     print("\nNo se encontraron productos, esperando más tiempo...")
-                    time.sleep(2)
+                    esperar_rejilla(driver, 'alcampo', referencia=2, navegacion=False)
                     continue
                     
-                print(f"\nProductos encontrados en esta iteración: {len(elemento_productos)}")
+                log.debug("Productos encontrados en esta iteración", extra=campos(productos=len(elemento_productos)))
                 
                 # Procesar solo los productos que están completamente visibles
                 productos_visibles = []
@@ -279,44 +215,46 @@ def obtener_datos_productos_alcampo(driver, categoria):
                 
 
 
-                print(f"Productos visibles en pantalla: {len(productos_visibles)}")
+                log.debug("Productos visibles en pantalla", extra=campos(productos=len(productos_visibles)))
                 
                 # Procesar solo los productos visibles
                 for producto in productos_visibles:
                     try:
                         # Verificar si el producto está aún cargando
                         if producto.find_elements(By.CSS_SELECTOR, 'div._skeleton_1ndyq_12'):
-                            print("Producto aún cargando, esperando...")
-                            time.sleep(2)
+                            log.debug("Producto aún cargando, esperando")
+                            esperar_dom_estable(driver, 'alcampo', referencia=2)
                             continue
 
                         # Obtener URL del producto para evitar duplicados
-                        try:
-                            url_producto = producto.find_element(By.CSS_SELECTOR, 'a[data-test="fop-product-link"]').get_attribute('href')
+                        datos_producto = None
+                        if indice_vistos:
+                            # URL, precio y disponibilidad en una sola llamada: si coinciden
+                            # con los del índice se reutiliza la fila sin leer el resto
+                            baratos = driver.execute_script(JS_CAMPOS_BARATOS, producto)
+                            url_producto = baratos['url']
                             if url_producto in productos_procesados:
                                 continue
-                        except:
-                            print("No se pudo obtener URL del producto")
-                            url_producto = None
+                            if url_producto:
+                                datos_producto = indice_vistos.reutilizar(url_producto, baratos['precio'], baratos['disponibilidad'])
+                        else:
+                            try:
+                                url_producto = producto.find_element(By.CSS_SELECTOR, 'a[data-test="fop-product-link"]').get_attribute('href')
+                                if url_producto in productos_procesados:
+                                    continue
+                            except:
+                                log.debug("No se pudo obtener URL del producto")
+                                url_producto = None
 
                         # Obtener datos del producto
-                        datos_producto = obtener_datos_producto(driver, producto)
                         if datos_producto is None:
-                            continue
+                            datos_producto = obtener_datos_producto(driver, producto)
+                            if datos_producto is None:
+                                continue
+                            if indice_vistos and url_producto:
+                                indice_vistos.registrar(url_producto, datos_producto)
 
-                        print(f"\nProducto encontrado:")
-                        print(f"Título: {datos_producto['titulo']}")
-                        print(f"Formato: {datos_producto['formato']}")
-                        print(f"Precio: {datos_producto['precio']}")
-                        print(f"Precio por unidad: {datos_producto['precio_unidad']}")
-                        # Añadir el estado de disponibilidad con un formato visual
-                        estado = datos_producto['disponibilidad']
-                        if estado == "disponible":
-                            print(f"Estado: ✅ Disponible")
-                        elif estado == "agotado":
-                            print(f"Estado: ❌ Agotado")
-                        else:
-                            print(f"Estado: ❓ Desconocido")
+                        registrar_producto(log, datos_producto, ['titulo', 'formato', 'precio', 'precio_unidad', 'disponibilidad'])
 
                         datos_producto['categoria'] = categoria
                         datos_producto['fecha_scraping'] = datetime.now().strftime("%Y-%m-%d")
@@ -326,22 +264,105 @@ def obtener_datos_productos_alcampo(driver, categoria):
                             productos_procesados.add(url_producto)
 
                     except Exception as e:
-                        print(f"\nError procesando producto: {str(e)}")
+                        log.warning("Error procesando producto: %s", e)
                         continue
 
                 # Hacer scroll y esperar nuevos productos
-                if not esperar_carga_productos(driver, contenedor_principal):
+                with trazador.span('scroll', sitio='alcampo') as span:
+                    hay_nuevos = esperar_carga_productos(driver, contenedor_principal)
+                    span['resultado'] = 'ok' if hay_nuevos else 'sin_nuevos'
+                if not hay_nuevos:
+                    sin_productos_nuevos += 1
+                    print(f"\nNo se encontraron nuevos productos. Intento {sin_productos_nuevos}/{max_intentos_sin_nuevos}")
+                else:
+                    sin_productos_nuevos = 0
+                    log.info("Nuevos productos encontrados", extra=campos(total=len(productos)))
+
+            except Exception as e:
+                print(f"Error en iteración de productos: {str(e)}")
+                time.sleep(2)
+                continue
+
+    except Exception as e:
+        print(f"Error obteniendo productos: {str(e)}")
+        traceback.print_exc()
+
+    print(f"\nTotal de productos recopilados: {len(productos)}")
+    return productos
+
+def obtener_datos_productos_alcampo_lotes(driver, categoria):
+    """
+    Obtiene los productos de una categoría de Alcampo con una sola llamada
+    de script por cada paso de scroll, que devuelve todas las tarjetas ya cargadas.
+    """
+    productos = []
+    productos_procesados = set()  # Para evitar duplicados por URL
+    sin_productos_nuevos = 0
+    max_intentos_sin_nuevos = 3
+    driver.switch_to.default_content()
+
+    try:
+        print("Esperando a que cargue el contenedor principal...")
+        contenedor_principal = wait_for_elements(
+            driver,
+            By.CSS_SELECTOR,
+            "div[data-retailer-anchor='product-list']",
+            multiple=False,
+            timeout=15
+        )
+        esperar_rejilla(driver, 'alcampo', referencia=5, navegacion=False)
+
+        while sin_productos_nuevos < max_intentos_sin_nuevos:
+            try:
+                with trazador.span('lectura_dom', sitio='alcampo'):
+                    lote = driver.execute_script(JS_EXTRAER_LOTE)
+                if lote is None:
+                    # El contenedor se ha vuelto a renderizar, buscarlo de nuevo
+                    contenedor_principal = wait_for_elements(
+                        driver,
+                        By.CSS_SELECTOR,
+                        "div[data-retailer-anchor='product-list']",
+                        multiple=False,
+                        timeout=15
+                    )
+                    continue
+
+                if indice_vistos:
+                    indice_vistos.registrar_lote([(tarjeta['url'], construir_producto(tarjeta, categoria)) for tarjeta in lote
+                                                  if tarjeta.get('url') and id_producto(tarjeta['url']) not in productos_procesados])
+                with trazador.span('parseo', sitio='alcampo') as span:
+                    nuevos = procesar_lote(lote, categoria, productos_procesados)
+                    span['productos'] = len(nuevos)
+                productos.extend(nuevos)
+                log.info("Lote leído", extra=campos(tarjetas=len(lote), nuevos=len(nuevos), total=len(productos)))
+                for producto in nuevos:
+                    registrar_producto(log, producto, ['titulo', 'formato', 'precio', 'precio_unidad', 'disponibilidad'])
+
+                # Hacer scroll y esperar nuevos productos
+                with trazador.span('scroll', sitio='alcampo') as span:
+                    hay_nuevos = esperar_carga_productos(driver, contenedor_principal)
+                    span['resultado'] = 'ok' if hay_nuevos else 'sin_nuevos'
+                if not hay_nuevos:
                     sin_productos_nuevos += 1
                     print(f"\nNo se encontraron nuevos productos. Intento {sin_productos_nuevos}/{max_intentos_sin_nuevos}")
                 else:
                     sin_productos_nuevos = 0
-                    print(f"\nNuevos productos encontrados. Total actual: {len(productos)}")
 
             except Exception as e:
                 print(f"Error en iteración de productos: {str(e)}")
                 time.sleep(2)
+                contenedor_principal = wait_for_elements(
+                    driver,
+                    By.CSS_SELECTOR,
+                    "div[data-retailer-anchor='product-list']",
+                    multiple=False,
+                    timeout=15
+                )
                 continue
 
+        # Recoger las tarjetas que hayan terminado de cargar tras el último scroll
+        productos.extend(procesar_lote(driver.execute_script(JS_EXTRAER_LOTE), categoria, productos_procesados))
+
     except Exception as e:
         print(f"Error obteniendo productos: {str(e)}")
         traceback.print_exc()
@@ -349,23 +370,81 @@ def obtener_datos_productos_alcampo(driver, categoria):
     print(f"\nTotal de productos recopilados: {len(productos)}")
     return productos
 
+def obtener_datos_productos_alcampo_xhr(driver, categoria, max_intentos_sin_nuevos=3):
+    """
+    Obtiene los productos de una categoría de Alcampo de las respuestas de la
+    API que pide el scroll infinito, leídas del registro de red de Chrome
+    (scraper_red.py), sin leer las tarjetas. El primer lote, que llega con la
+    página, se lee del DOM con una sola llamada; el scroll solo sirve para que
+    la página pida el lote siguiente. Al final se añaden de una vez las tarjetas
+    del DOM que no llegaron por la red (por ejemplo, si cambia la API).
+    """
+    productos = []
+    productos_procesados = set()
+    url_base = driver.current_url
+    captura = CapturaRed(driver, PATRON_XHR_PRODUCTOS)
+    driver.switch_to.default_content()
+
+    wait_for_elements(driver, By.CSS_SELECTOR, "div[data-retailer-anchor='product-list']", multiple=False, timeout=15)
+    esperar_rejilla(driver, 'alcampo', referencia=5, navegacion=False)
+    # Solo las respuestas de esta página: el registro puede traer las de navegaciones anteriores
+    desde = driver.execute_script("return performance.timeOrigin;")
+    try:
+        respuestas = captura.respuestas(desde)
+    except Exception as e:
+        print(f"El navegador no tiene el registro de red activado ({e}); se extrae por lotes del DOM")
+        return obtener_datos_productos_alcampo_lotes(driver, categoria)
+
+    with trazador.span('lectura_dom', sitio='alcampo'):
+        lote = driver.execute_script(JS_EXTRAER_LOTE)
+    productos.extend(procesar_lote(lote, categoria, productos_procesados))
+    sin_productos_nuevos = 0
+    while True:
+        nuevos = []
+        with trazador.span('parseo', sitio='alcampo') as span:
+            for url, datos in respuestas:
+                nuevos.extend(procesar_lote(parsear_productos_json(datos, url_base), categoria, productos_procesados))
+            span['productos'] = len(nuevos)
+        productos.extend(nuevos)
+        log.info("Respuestas de la API leídas", extra=campos(respuestas=len(respuestas), nuevos=len(nuevos), total=len(productos)))
+        for producto in nuevos:
+            registrar_producto(log, producto, ['titulo', 'formato', 'precio', 'precio_unidad', 'disponibilidad'])
+
+        sin_productos_nuevos = 0 if nuevos else sin_productos_nuevos + 1
+        if sin_productos_nuevos >= max_intentos_sin_nuevos:
+            break
+        # Llegar al final de la lista para que la página pida el siguiente lote
+        with trazador.span('scroll', sitio='alcampo'):
+            driver.execute_script("window.scrollTo(0, document.documentElement.scrollHeight);")
+            esperar_dom_estable(driver, 'alcampo', referencia=2)
+        respuestas = captura.respuestas(desde)
+
+    with trazador.span('lectura_dom', sitio='alcampo'):
+        restantes = procesar_lote(driver.execute_script(JS_EXTRAER_LOTE), categoria, productos_procesados)
+    productos.extend(restantes)
+    if restantes:
+        print(f"Tarjetas del DOM que no llegaron por la red: {len(restantes)}")
+    captura.resumen()
+    print(f"\nTotal de productos recopilados: {len(productos)}")
+    return productos
+
 def navegar_a_catalogo(driver):
     """Navega al catálogo completo de Alcampo."""
     try:
         print("Accediendo a la web de Alcampo...")
         driver.get("https://www.compraonline.alcampo.es/")
-        time.sleep(3)
+        esperar_pagina(driver, 'alcampo', referencia=3)
 
         # Aceptar cookies si aparece el diálogo
         aceptar_cookies(driver)
 
         print("Haciendo clic en el botón de menú...")
         click_element(driver, By.ID, "nav-menu-button")
-        time.sleep(2)
+        esperar_dom_estable(driver, 'alcampo', referencia=2)
 
         print("Navegando al catálogo completo...")
         click_element(driver, By.XPATH, "//a[@data-test='Todo el catálogo']")
-        time.sleep(3)
+        esperar_pagina(driver, 'alcampo', referencia=3)
 
         return True
 
@@ -446,18 +525,18 @@ def reiniciar_navegacion(driver):
     try:
         print("Reiniciando navegación...")
         driver.get("https://www.compraonline.alcampo.es/")
-        time.sleep(3)
+        esperar_pagina(driver, 'alcampo', referencia=3)
         
         # Aceptar cookies si aparece el diálogo
         aceptar_cookies(driver)
         
         # Hacer clic en el botón de menú
         click_element(driver, By.ID, "nav-menu-button")
-        time.sleep(2)
+        esperar_dom_estable(driver, 'alcampo', referencia=2)
         
         # Navegar al catálogo completo
         click_element(driver, By.XPATH, "//a[@data-test='Todo el catálogo']")
-        time.sleep(3)
+        esperar_pagina(driver, 'alcampo', referencia=3)
         
         return True
     except Exception as e:
@@ -481,8 +560,30 @@ def es_error_sesion(error):
     ]
     return any(msg in error_str for msg in errores_sesion)
 
+# Pool de navegadores de reserva (se activa con --pool)
+pool_sesiones = None
+
+# Índice persistente de productos vistos (se activa con --vistos)
+indice_vistos = None
+
+@trazador.trazar('reinicio', sitio='alcampo')
 def reiniciar_sesion(driver=None, max_intentos=3):
     """Reinicia la sesión del driver y devuelve una nueva instancia."""
+    controlador_ritmo.registrar(fallo_sesion=True)
+    if pool_sesiones:
+        # Sustituir por un navegador de reserva que ya está en el catálogo
+        for intento in range(max_intentos):
+            nuevo_driver = pool_sesiones.reemplazar(driver)
+            driver = None
+            try:
+                nuevo_driver.current_url
+                return nuevo_driver
+            except Exception as e:
+                print(f"El navegador de reserva no responde (intento {intento + 1}/{max_intentos}): {str(e)}")
+                driver = nuevo_driver
+        print("No se pudo reiniciar la sesión después de todos los intentos")
+        return None
+
     for intento in range(max_intentos):
         try:
             if driver:
@@ -494,7 +595,7 @@ def reiniciar_sesion(driver=None, max_intentos=3):
                     driver = None
             
             print(f"\nReiniciando sesión (intento {intento + 1}/{max_intentos})...")
-            time.sleep(5 * (intento + 1))  # Espera incremental entre intentos
+            time.sleep(controlador_ritmo.pausa_actual() * (intento + 1))  # Espera incremental entre intentos
             
             nuevo_driver = iniciar_driver()
             
@@ -521,13 +622,84 @@ def reiniciar_sesion(driver=None, max_intentos=3):
         except Exception as e:
             print(f"Error reiniciando sesión (intento {intento + 1}): {str(e)}")
             if intento < max_intentos - 1:
-                time.sleep(5 * (intento + 1))
+                time.sleep(controlador_ritmo.pausa_actual() * (intento + 1))
                 continue
             
     print("No se pudo reiniciar la sesión después de todos los intentos")
     return None
 
-def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesion=3):
+def obtener_productos(driver, categoria, modo_extraccion='lotes'):
+    """Obtiene los productos de la página actual con el modo indicado ('lotes', 'xhr' o 'tarjetas')."""
+    with trazador.span('categoria', sitio='alcampo', categoria=categoria) as span:
+        if modo_extraccion == 'lotes':
+            productos = obtener_datos_productos_alcampo_lotes(driver, categoria)
+        elif modo_extraccion == 'xhr':
+            productos = obtener_datos_productos_alcampo_xhr(driver, categoria)
+        else:
+            productos = obtener_datos_productos_alcampo(driver, categoria)
+        span['productos'] = len(productos)
+    medidor_trafico.medir(driver, categoria)
+    grabador_html.grabar(driver, 'alcampo', categoria)
+    return productos
+
+def huella_pagina(driver):
+    """Huella de la página abierta: número de tarjetas y (título, precio) del primer lote cargado."""
+    esperar_rejilla(driver, 'alcampo', referencia=5, navegacion=False)
+    lote = driver.execute_script(JS_EXTRAER_LOTE) or []
+    return calcular_huella(len(lote), [(tarjeta['titulo'], tarjeta['precio']) for tarjeta in lote])
+
+def obtener_productos_incremental(driver, categoria, modo_extraccion='lotes', huellas=None):
+    """
+    Como obtener_productos, pero si la huella de la página coincide con la de la
+    última ejecución devuelve las filas de entonces en lugar de hacer todo el scroll.
+    """
+    if not huellas:
+        return obtener_productos(driver, categoria, modo_extraccion)
+
+    huella = huella_pagina(driver)
+    if huellas.sin_cambios('alcampo', categoria, huella):
+        productos = huellas.filas_anteriores('alcampo', categoria, 'fecha_scraping')
+        print(f"\nCategoría {categoria} sin cambios desde la última ejecución: {len(productos)} filas arrastradas")
+        return productos
+
+    productos = obtener_productos(driver, categoria, modo_extraccion)
+    if productos:
+        huellas.guardar('alcampo', categoria, huella, productos)
+    return marcar_rastreados(productos)
+
+def preparar_sesion(driver):
+    """Deja el navegador en el catálogo completo, listo para leer las categorías."""
+    return navegar_a_catalogo(driver)
+
+def tareas_cola(driver):
+    """Tareas iniciales para la cola de trabajo (scraper_cola.py): una por categoría, sin 'Folletos y promociones'."""
+    return [(categoria['url'], {'nombre': categoria['nombre'], 'url': categoria['url']})
+            for categoria in obtener_categorias(driver)[1:]]
+
+def ejecutar_tarea_cola(driver, tarea, modo_extraccion='lotes'):
+    """
+    Procesa una tarea de la cola de trabajo. Una categoría con subcategorías
+    encola una tarea por subcategoría; si no tiene, se leen sus productos.
+    Devuelve (productos, tareas nuevas).
+    """
+    driver.get(url_tarea_cola(tarea))
+    return extraer_tarea_cola(driver, tarea, modo_extraccion)
+
+def url_tarea_cola(tarea):
+    return tarea['url']
+
+def extraer_tarea_cola(driver, tarea, modo_extraccion='lotes'):
+    """Segunda mitad de ejecutar_tarea_cola, con la página de la tarea ya abierta (también en una pestaña, ver scraper_pestanas.py)."""
+    esperar_pagina(driver, 'alcampo', referencia=3)
+    if 'padre' not in tarea:
+        subcategorias = obtener_subcategorias(driver)
+        if subcategorias:
+            return [], [(subcategoria['url'], {'nombre': subcategoria['nombre'], 'url': subcategoria['url'], 'padre': tarea['nombre']})
+                        for subcategoria in subcategorias]
+        return obtener_productos(driver, tarea['nombre'], modo_extraccion), []
+    return obtener_productos(driver, f"{tarea['padre']} > {tarea['nombre']}", modo_extraccion), []
+
+def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesion=3, modo_extraccion='lotes', huellas=None):
     """Procesa una categoría y todas sus subcategorías."""
     for intento_sesion in range(max_reintentos_sesion):
         try:
@@ -548,7 +720,7 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
             
             try:
                 driver.get(categoria['url'])
-                time.sleep(3)
+                esperar_pagina(driver, 'alcampo', referencia=3)
             except Exception as e:
                 if es_error_sesion(e):
                     print(f"Error de sesión al acceder a la categoría: {str(e)}")
@@ -572,7 +744,7 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
                             return False, None
                         try:
                             driver.get(categoria['url'])
-                            time.sleep(3)
+                            esperar_pagina(driver, 'alcampo', referencia=3)
                         except:
                             continue
                     else:
@@ -602,7 +774,7 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
                             
                             try:
                                 driver.get(subcategoria['url'])
-                                time.sleep(3)
+                                esperar_pagina(driver, 'alcampo', referencia=3)
                             except Exception as e:
                                 if es_error_sesion(e):
                                     print(f"Error de sesión al acceder a la subcategoría: {str(e)}")
@@ -612,7 +784,7 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
                                     continue
                                 raise
                             
-                            productos_subcategoria = obtener_datos_productos_alcampo(driver, f"{categoria['nombre']} > {subcategoria['nombre']}")
+                            productos_subcategoria = obtener_productos_incremental(driver, f"{categoria['nombre']} > {subcategoria['nombre']}", modo_extraccion, huellas)
                             if productos_subcategoria:
                                 productos_totales.extend(productos_subcategoria)
                                 alcampo_csv(productos_subcategoria)
@@ -625,13 +797,14 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
                                 break
                                 
                         except Exception as e:
+                            trazador.evento('reintento', sitio='alcampo', categoria=subcategoria['nombre'], error=str(e)[:200])
                             if es_error_sesion(e):
                                 print(f"\nError de sesión procesando subcategoría: {str(e)}")
                                 if intento_sub < max_reintentos_sesion - 1:
                                     driver = reiniciar_sesion(driver)
                                     if not driver:
                                         return False, None
-                                    time.sleep(5)
+                                    controlador_ritmo.esperar()
                                     continue
                             else:
                                 print(f"\nError procesando subcategoría: {str(e)}")
@@ -641,13 +814,13 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
                         print(f"\nNo se pudo procesar la subcategoría {subcategoria['nombre']} después de todos los intentos")
                         continue
                             
-                    time.sleep(random.uniform(2, 4))
+                    controlador_ritmo.esperar()  # Pausa adaptativa entre subcategorías (3s ± 25% al empezar)
             else:
                 print(f"\nNo se encontraron subcategorías en {categoria['nombre']}, procesando como categoría principal")
                 productos_categoria = None
                 for _ in range(3):
                     try:
-                        productos_categoria = obtener_datos_productos_alcampo(driver, categoria['nombre'])
+                        productos_categoria = obtener_productos_incremental(driver, categoria['nombre'], modo_extraccion, huellas)
                         break
                     except Exception as e:
                         if es_error_sesion(e):
@@ -657,7 +830,7 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
                                 return False, None
                             try:
                                 driver.get(categoria['url'])
-                                time.sleep(3)
+                                esperar_pagina(driver, 'alcampo', referencia=3)
                             except:
                                 continue
                         else:
@@ -684,7 +857,7 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
                     driver = reiniciar_sesion(driver)
                     if not driver:
                         return False, None
-                    time.sleep(5)
+                    controlador_ritmo.esperar()
                     continue
             else:
                 print(f"\nERROR procesando categoría {categoria['nombre']}: {str(e)}")
@@ -693,27 +866,47 @@ def procesar_categoria(driver, categoria, productos_totales, max_reintentos_sesi
     
     return False, driver
 
-def signal_handler(sig, frame):
-    print('\nCerrando el navegador gracefully...')
-    try:
-        if 'driver' in globals():
-            driver.quit()
-    except:
-        pass
-    sys.exit(0)
-
 def main():
-    signal.signal(signal.SIGINT, signal_handler)
-    
+    parser = argparse.ArgumentParser(description='Scraper de Alcampo')
+    parser.add_argument('--extraccion', choices=MODOS_EXTRACCION, default='lotes',
+                        help='lotes: un script por scroll; xhr: las respuestas de la API desde el registro de red; tarjetas: leer cada tarjeta con WebDriver')
+    parser.add_argument('--ligero', action='store_true', help='Navegador sin interfaz, ventana pequeña y sin imágenes, fuentes, vídeo ni analítica')
+    parser.add_argument('--grabar-html', help='Directorio donde guardar el HTML renderizado de cada página como fixture (ver scraper_replay.py)')
+    parser.add_argument('--traza', help='Archivo JSONL donde registrar la duración de cada fase (resumen con scraper_tracing.py)')
+    parser.add_argument('--pool', type=int, default=0, help='Navegadores de reserva ya preparados para sustituir al instante una sesión caída (0 = sin pool)')
+    parser.add_argument('--incremental', type=str, help='Base de datos SQLite de huellas: las categorías sin cambios reutilizan las filas de la última ejecución')
+    parser.add_argument('--vistos', type=str, help='Base de datos SQLite de productos vistos: en modo tarjetas no se vuelven a leer los productos con el mismo precio y disponibilidad')
+    parser.add_argument('--log-nivel', choices=NIVELES, default='INFO', help='DEBUG añade el detalle de cada producto y de cada scroll')
+    parser.add_argument('--log-formato', choices=['texto', 'json'], default='texto')
+    parser.add_argument('--log-muestreo', type=int, default=1, help='En DEBUG, registrar solo uno de cada N productos')
+    parser.add_argument('--metricas-puerto', type=int, help='Exponer métricas de Prometheus en http://127.0.0.1:<puerto>/metrics')
+    parser.add_argument('--metricas-archivo', help='Archivo .prom con las métricas, reescrito cada --metricas-intervalo segundos')
+    parser.add_argument('--metricas-intervalo', type=int, default=15)
+    args = parser.parse_args()
+    configurar_logging(args.log_nivel, args.log_formato, args.log_muestreo)
+    huellas = AlmacenHuellas(args.incremental) if args.incremental else None
+    global pool_sesiones, perfil_ligero, capturar_red, indice_vistos
+    perfil_ligero = args.ligero
+    capturar_red = args.extraccion == 'xhr'
+    controlador_ritmo.configurar(**RITMO)
+    if args.vistos:
+        indice_vistos = IndiceVistos(args.vistos)
+    grabador_html.directorio = args.grabar_html
+    trazador.activar(args.traza)
+    metricas.activar(args.metricas_puerto, args.metricas_archivo, args.metricas_intervalo, sitio='alcampo')
+    if args.pool > 0:
+        pool_sesiones = PoolSesiones(iniciar_driver, navegar_a_catalogo, reservas=args.pool, nombre='alcampo')
+
     max_reintentos = 3
     todos_los_productos = []
     categorias_procesadas = set()
     driver = None
+    instalar_cierre(lambda: driver)
     
     for intento in range(max_reintentos):
         try:
             if not driver:
-                driver = iniciar_driver()
+                driver = pool_sesiones.obtener() if pool_sesiones else iniciar_driver()
                 if not driver:
                     print("No se pudo iniciar el driver, reintentando...")
                     time.sleep(5 * (intento + 1))
@@ -774,7 +967,7 @@ def main():
                     print(f"\nIniciando procesamiento de categoría {categoria['nombre']}")
                     print(f"URL: {categoria['url']}")
                     
-                    exito, nuevo_driver = procesar_categoria(driver, categoria, todos_los_productos)
+                    exito, nuevo_driver = procesar_categoria(driver, categoria, todos_los_productos, modo_extraccion=args.extraccion, huellas=huellas)
                     
                     if nuevo_driver is None:
                         print("\nSe perdió la sesión del driver, reiniciando...")
@@ -826,6 +1019,21 @@ def main():
     print("Categorías procesadas:")
     for categoria in sorted(categorias_procesadas):
         print(f"- {categoria}")
+    if huellas:
+        huellas.resumen()
+        huellas.cerrar()
+    if indice_vistos:
+        indice_vistos.resumen()
+        indice_vistos.cerrar()
+    if pool_sesiones:
+        pool_sesiones.cerrar()
+        pool_sesiones.resumen()
+    trazador.cerrar()
+    medidor_trafico.resumen()
+    contador_esperas.resumen()
+    controlador_ritmo.resumen()
+    metricas.resumen()
+    metricas.cerrar()
 
 if __name__ == "__main__":
     main()
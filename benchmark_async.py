@@ -0,0 +1,38 @@
+import time
+import asyncio
+import argparse
+from mock_server import iniciar_servidor
+from scraper_async import MotorAsync, Peticion
+from mercadona_api import productos_de_categoria
+
+async def medir(url, num_paginas, concurrencia):
+    """Descarga `num_paginas` veces la misma categoría y devuelve (segundos, productos)."""
+    peticiones = [Peticion(url, {'pagina': n}, f"Benchmark - {n}") for n in range(num_paginas)]
+    productos = 0
+    inicio = time.perf_counter()
+    async with MotorAsync(concurrencia_por_host=concurrencia) as motor:
+        async for _ in motor.rastrear(peticiones, lambda detalle, nombre: productos_de_categoria(detalle, nombre, '2025-01-01')):
+            productos += 1
+    return time.perf_counter() - inicio, productos
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del motor asíncrono contra un servidor local')
+    parser.add_argument('--directorio', default='fixtures/mercadona_api')
+    parser.add_argument('--ruta', default='/api/categories/156/', help='Fixture que se pide en cada petición')
+    parser.add_argument('--paginas', type=int, default=200)
+    parser.add_argument('--latencia-ms', type=float, default=50.0, help='Latencia simulada del servidor')
+    parser.add_argument('--concurrencias', default='1,2,4,8,16,32')
+    args = parser.parse_args()
+
+    servidor, url_base = iniciar_servidor(args.directorio, latencia=args.latencia_ms / 1000)
+    try:
+        print(f"{args.paginas} páginas por nivel, latencia simulada {args.latencia_ms:.0f} ms\n")
+        print(f"{'Concurrencia':>12}{'Tiempo (s)':>12}{'Páginas/s':>12}{'Productos':>12}")
+        for concurrencia in [int(c) for c in args.concurrencias.split(',')]:
+            segundos, productos = asyncio.run(medir(url_base + args.ruta, args.paginas, concurrencia))
+            print(f"{concurrencia:>12}{segundos:>12.2f}{args.paginas / segundos:>12.1f}{productos:>12}")
+    finally:
+        servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import re
+import csv
+import glob
+import time
+import argparse
+from collections import Counter
+from scraper_cantidades import calcular_precio_unitario, parsear_formato, parsear_formatos
+
+# Compara el cálculo del precio unitario anterior (cinco patrones compilados y
+# cinco re.findall por producto) con scraper_cantidades sobre los formatos de
+# los CSV de Mercadona, y lista los formatos en los que cambia el resultado.
+
+def calcular_precio_unitario_anterior(formato, precio):
+    """El calcular_precio_unitario que tenía cada scraper, tal cual (sin los mensajes de error)."""
+    try:
+        precio = float(precio)
+        litros = re.findall(r'(\d+(?:\.\d+)?)\s*(?:L|l|litro)', formato)
+        ml = re.findall(r'(\d+(?:\.\d+)?)\s*(?:ml|ML|cc)', formato)
+        kg = re.findall(r'(\d+(?:\.\d+)?)\s*(?:kg|KG|Kg)', formato)
+        g = re.findall(r'(\d+(?:\.\d+)?)\s*(?:g|G|gr|GR)', formato)
+        unidades = re.findall(r'(\d+)\s*(?:botella|lata|pack|unidad|ud)', formato)
+        for valores, divisor in ((litros, 1), (ml, 1000), (kg, 1), (g, 1000)):
+            if valores:
+                cantidad_total = sum(float(x) for x in valores) / divisor
+                if unidades:
+                    cantidad_total *= float(unidades[0])
+                return precio / cantidad_total
+        return None
+    except Exception:
+        return None
+
+def medir(funcion, repeticiones):
+    """Devuelve el mejor tiempo de `repeticiones` ejecuciones y el último resultado."""
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+def con_cache_vacia(funcion):
+    """La función, empezando cada ejecución con la caché de parsear_formato vacía."""
+    def ejecutar():
+        parsear_formato.cache_clear()
+        return funcion()
+    return ejecutar
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del parseo de formatos y del precio unitario')
+    parser.add_argument('--csv', default='mercadona_*.csv', help='Patrón de los CSV con las columnas formato y precio')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--diferencias', type=int, default=15, help='Formatos distintos con resultado cambiado a mostrar')
+    args = parser.parse_args()
+
+    archivos = sorted(glob.glob(args.csv))
+    filas = []
+    for archivo in archivos:
+        with open(archivo, newline='', encoding='utf-8') as f:
+            filas.extend((fila['formato'], fila['precio']) for fila in csv.DictReader(f))
+    formatos = [formato for formato, _ in filas]
+    print(f"Filas leídas de {len(archivos)} CSV: {len(filas)} ({len(set(formatos))} formatos distintos)")
+
+    t_anterior, anteriores = medir(lambda: [calcular_precio_unitario_anterior(f, p) for f, p in filas], args.repeticiones)
+    t_frio, nuevos = medir(con_cache_vacia(lambda: [calcular_precio_unitario(f, p) for f, p in filas]), args.repeticiones)
+    t_caliente, _ = medir(lambda: [calcular_precio_unitario(f, p) for f, p in filas], args.repeticiones)
+    t_lote, cantidades = medir(con_cache_vacia(lambda: parsear_formatos(formatos)), args.repeticiones)
+
+    n = len(filas)
+    print(f"\n{'Método':<40}{'Tiempo (s)':>12}{'Filas/s':>12}")
+    for nombre, tiempo in (('Anterior (5 re.findall por fila)', t_anterior),
+                           ('scraper_cantidades, caché vacía', t_frio),
+                           ('scraper_cantidades, caché llena', t_caliente),
+                           ('parsear_formatos (lote, caché vacía)', t_lote)):
+        print(f"{nombre:<40}{tiempo:>12.4f}{n / tiempo:>12.0f}")
+
+    sin_cantidad = sum(1 for c in cantidades if c is None)
+    print(f"\nFormatos sin cantidad reconocible: {sin_cantidad}")
+    print(f"Unidades base: {dict(Counter(c.unidad for c in cantidades if c))}")
+
+    cambios = Counter()
+    for (formato, precio), antes, despues in zip(filas, anteriores, nuevos):
+        if (antes is None) != (despues is None) or (antes is not None and abs(antes - despues) > 0.005):
+            cambios[(formato, precio, antes, despues)] += 1
+    print(f"Filas con un precio unitario distinto al anterior: {sum(cambios.values())}")
+    for (formato, precio, antes, despues), veces in cambios.most_common(args.diferencias):
+        antes = f"{antes:.2f}" if antes is not None else "-"
+        despues = f"{despues:.2f}" if despues is not None else "-"
+        print(f"  {formato!r:<40} {precio:>7}  {antes:>9} -> {despues:>9}  ({veces} filas)")
+
+if __name__ == "__main__":
+    main()
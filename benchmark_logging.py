@@ -0,0 +1,79 @@
+import os
+import time
+import argparse
+import contextlib
+from scraper_logging import configurar_logging
+from scraper_replay import DriverReplay, cargar_fixtures
+import Supermarket_Scraper as mercadona
+import carrefour_scraper as carrefour
+
+# Compara el volumen de log y el tiempo de extracción en INFO y en DEBUG
+# reproduciendo las páginas grabadas (fixtures/html) con DriverReplay: se
+# ejecutan las mismas funciones de extracción de los scrapers, sin navegador.
+# Cada llamada a WebDriver espera --latencia-ms, como el viaje de ida y vuelta
+# al navegador real, así que los volcados de outerHTML cuestan lo que costarían.
+
+class FlujoContador:
+    """Destino de la salida que solo cuenta líneas y bytes."""
+
+    def __init__(self):
+        self.lineas = 0
+        self.bytes = 0
+
+    def write(self, texto):
+        self.lineas += texto.count('\n')
+        self.bytes += len(texto.encode('utf-8'))
+        return len(texto)
+
+    def flush(self):
+        pass
+
+# Escenario: (supermercado de los fixtures, función (driver, entrada) -> productos)
+ESCENARIOS = {
+    'mercadona': ('mercadona', lambda driver, entrada: mercadona.obtener_datos_productos(driver, entrada['categoria'])),
+    'carrefour js': ('carrefour', lambda driver, entrada: carrefour.extraer_productos_pagina_js(
+        driver, {'titulo': entrada['categoria'], 'url': entrada['url']})),
+    'carrefour dom': ('carrefour', lambda driver, entrada: carrefour.extraer_productos_pagina_dom(
+        driver, {'titulo': entrada['categoria'], 'url': entrada['url']}))
+}
+
+def ejecutar(extraer, fixtures, nivel, muestreo, latencia, vueltas):
+    """Ejecuta la extracción sobre todas las páginas y devuelve las métricas de la ejecución."""
+    flujo = FlujoContador()
+    configurar_logging(nivel, muestreo=muestreo, flujo=flujo)
+    productos = llamadas = 0
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(flujo):
+        for _ in range(vueltas):
+            for entrada, html in fixtures:
+                driver = DriverReplay(html, entrada['url'], latencia)
+                productos += len(extraer(driver, entrada))
+                llamadas += driver.llamadas
+    segundos = time.perf_counter() - inicio
+    return {'productos': productos, 'segundos': segundos, 'llamadas': llamadas,
+            'lineas': flujo.lineas, 'kb': flujo.bytes / 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description='Volumen de log y tiempo de extracción en INFO frente a DEBUG sobre las páginas grabadas')
+    parser.add_argument('--directorio', default=os.path.join('fixtures', 'html'))
+    parser.add_argument('--escenario', choices=list(ESCENARIOS), action='append', help='Escenario a medir (por defecto todos)')
+    parser.add_argument('--latencia-ms', type=float, default=2.0, help='Latencia simulada de cada llamada a WebDriver')
+    parser.add_argument('--muestreo', type=int, default=10, help='Uno de cada N productos en la pasada DEBUG muestreada')
+    parser.add_argument('--vueltas', type=int, default=1, help='Pasadas sobre todas las páginas')
+    args = parser.parse_args()
+
+    configuraciones = [('INFO', 1), ('DEBUG', 1), (f'DEBUG 1/{args.muestreo}', args.muestreo)]
+    print(f"{'Escenario':<15}{'Nivel':<12}{'Productos':>10}{'Segundos':>10}{'Llamadas':>10}{'Líneas':>9}{'KB log':>9}")
+    for nombre in args.escenario or ESCENARIOS:
+        sitio, extraer = ESCENARIOS[nombre]
+        fixtures = cargar_fixtures(args.directorio, sitio)
+        if not fixtures:
+            print(f"No hay páginas grabadas de {sitio} en {args.directorio}")
+            continue
+        for etiqueta, muestreo in configuraciones:
+            datos = ejecutar(extraer, fixtures, etiqueta.split()[0], muestreo, args.latencia_ms / 1000, args.vueltas)
+            print(f"{nombre:<15}{etiqueta:<12}{datos['productos']:>10}{datos['segundos']:>10.2f}{datos['llamadas']:>10}"
+                  f"{datos['lineas']:>9}{datos['kb']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
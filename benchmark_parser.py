@@ -0,0 +1,88 @@
+import csv
+import glob
+import html
+import re
+import time
+import argparse
+from mercadona_parser import parsear_celda_bs4, parsear_productos_html
+
+PLANTILLA_CELDA = (
+    '<div class="product-cell" data-testid="product-cell">'
+    '<button class="product-cell__content-link" data-testid="open-product-detail">'
+    '<div class="product-cell__image-wrapper"><img alt="{titulo}" src="https://prod-mercadona.imgix.net/images/x.jpg"></div>'
+    '<div class="product-cell__info">'
+    '<h4 class="subhead1-r product-cell__description-name" data-testid="product-cell-name">{titulo}</h4>'
+    '<div class="product-format product-format__size--cell">{spans}</div>'
+    '<div class="product-price">'
+    '<p class="{clase_precio}" data-testid="product-price">{precio} €</p>'
+    '<p class="product-price__extra-price subhead1-r">/ud.</p>'
+    '</div></div></button></div>'
+)
+
+def generar_celdas(archivos):
+    """Genera el HTML de una celda de producto por cada fila de los CSV de Mercadona."""
+    celdas = []
+    for archivo in archivos:
+        with open(archivo, newline='', encoding='utf-8') as f:
+            for n, fila in enumerate(csv.DictReader(f)):
+                # El formato se reparte en dos spans como en la web ("Garrafa", "5 L")
+                partes = re.split(r'\s(?=\d)', fila['formato'], maxsplit=1)
+                spans = ''.join(f'<span class="footnote1-r">{html.escape(p)}</span>' for p in partes)
+                clase_precio = "product-price__unit-price subhead1-b"
+                if n % 10 == 0:
+                    clase_precio += " product-price__unit-price--discount"
+                celdas.append(PLANTILLA_CELDA.format(
+                    titulo=html.escape(fila['titulo']),
+                    spans=spans,
+                    clase_precio=clase_precio,
+                    precio=fila['precio'].replace('.', ',')
+                ))
+    return celdas
+
+def medir(funcion, repeticiones):
+    """Devuelve el mejor tiempo de `repeticiones` ejecuciones y el último resultado."""
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark del parseo de la rejilla de productos de Mercadona')
+    parser.add_argument('--csv', default='mercadona_*.csv', help='Patrón de los CSV usados para generar las celdas')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--latencia-webdriver-ms', type=float, default=0.0,
+                        help='Coste estimado de cada round-trip a WebDriver, para sumarlo a cada método')
+    args = parser.parse_args()
+
+    archivos = sorted(glob.glob(args.csv))
+    celdas = generar_celdas(archivos)
+    rejilla = ''.join(celdas)
+    fecha = '2025-01-01'
+    print(f"Celdas generadas a partir de {len(archivos)} CSV: {len(celdas)}")
+
+    t_antes, productos_antes = medir(lambda: [parsear_celda_bs4(c, 'benchmark', fecha) for c in celdas], args.repeticiones)
+    t_despues, productos_despues = medir(lambda: parsear_productos_html(rejilla, 'benchmark', fecha), args.repeticiones)
+
+    if productos_antes != productos_despues:
+        diferentes = sum(1 for a, b in zip(productos_antes, productos_despues) if a != b)
+        print(f"ATENCIÓN: los registros no coinciden ({diferentes} diferentes, {len(productos_antes)} vs {len(productos_despues)})")
+    else:
+        print("Los dos métodos devuelven los mismos registros")
+
+    # Una llamada a WebDriver por celda antes, una sola por rejilla después
+    latencia = args.latencia_webdriver_ms / 1000
+    t_antes += latencia * len(celdas)
+    t_despues += latencia
+
+    n = len(celdas)
+    print(f"\n{'Método':<35}{'Tiempo (s)':>12}{'Productos/s':>15}")
+    print(f"{'BeautifulSoup por celda':<35}{t_antes:>12.3f}{n / t_antes:>15.0f}")
+    print(f"{'lxml en una pasada':<35}{t_despues:>12.3f}{n / t_despues:>15.0f}")
+    print(f"Mejora: x{t_antes / t_despues:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import io
+import time
+import queue
+import argparse
+import threading
+import contextlib
+import carrefour_scraper
+from mock_server import iniciar_servidor
+from scraper_common import preparar_pestana
+from scraper_pestanas import PestanasNavegador, memoria_procesos, procesos_navegador, recorrer
+from scraper_ritmo import controlador_ritmo
+
+# Un navegador por worker frente a varias pestañas en un solo navegador: rastrea
+# las mismas páginas de Carrefour (la página grabada en fixtures/html, servida
+# por mock_server.py con latencia) y compara productos/s, la memoria de todos
+# los procesos de Chrome (RSS y PSS, muestreada durante el rastreo) y
+# productos/s por GB de RSS.
+#
+# Uso:
+#   python benchmark_pestanas.py --paginas 60 --navegadores 4 --pestanas 4 --latencia-ms 800
+
+RUTA_FIXTURE = '/carrefour/leche_y_bebidas_vegetales.html'
+
+class MuestreoMemoria:
+    """Hilo que suma la memoria de los navegadores cada `intervalo` segundos y guarda el pico."""
+
+    def __init__(self, drivers, intervalo=0.5):
+        self.drivers = drivers
+        self.intervalo = intervalo
+        self.pico = {'rss': 0, 'pss': 0, 'procesos': 0}
+        self.parar = threading.Event()
+        self.hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self):
+        while True:
+            pids = set()
+            for driver in self.drivers:
+                pids |= procesos_navegador(driver)
+            memoria = memoria_procesos(pids)
+            for clave in self.pico:
+                self.pico[clave] = max(self.pico[clave], memoria[clave])
+            if self.parar.wait(self.intervalo):
+                return
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.parar.set()
+        self.hilo.join()
+
+def extraer(driver, tarea):
+    productos, _ = carrefour_scraper.extraer_tarea_cola(driver, tarea, 'estado')
+    return len(productos)
+
+def con_navegadores(drivers, tareas):
+    """Un hilo por navegador, cada uno con una sola pestaña y driver.get bloqueante."""
+    pendientes = queue.Queue()
+    for tarea in tareas:
+        pendientes.put(tarea)
+    productos = []
+
+    def trabajar(driver):
+        while True:
+            try:
+                tarea = pendientes.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                driver.get(carrefour_scraper.url_tarea_cola(tarea))
+                productos.append(extraer(driver, tarea))
+            except Exception as e:
+                print(f"Error en el offset {tarea['offset']}: {e}")
+
+    hilos = [threading.Thread(target=trabajar, args=(driver,)) for driver in drivers]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return sum(productos)
+
+def con_pestanas(driver, tareas, pestanas):
+    """Un solo navegador con `pestanas` pestañas y el planificador de scraper_pestanas.py."""
+    navegador = PestanasNavegador(driver, pestanas, lambda driver: preparar_pestana(driver, carrefour_scraper.perfil_ligero))
+    productos = 0
+    for tarea, resultado in recorrer(navegador, tareas, carrefour_scraper.url_tarea_cola, extraer):
+        if isinstance(resultado, Exception):
+            print(f"Error en el offset {tarea['offset']}: {resultado}")
+        else:
+            productos += resultado
+    return productos
+
+def medir(nombre, drivers, ejecutar):
+    """Ejecuta un modo con los navegadores ya arrancados y devuelve su fila de resultados."""
+    with MuestreoMemoria(drivers) as memoria:
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            productos = ejecutar()
+        segundos = time.perf_counter() - inicio
+    productos_s = productos / segundos if segundos else 0.0
+    gb_rss = memoria.pico['rss'] / 1024 ** 3
+    return {'modo': nombre, 'segundos': segundos, 'productos': productos, 'productos_s': productos_s,
+            'rss_mb': memoria.pico['rss'] / 1024 ** 2, 'pss_mb': memoria.pico['pss'] / 1024 ** 2,
+            'procesos': memoria.pico['procesos'], 'por_gb': productos_s / gb_rss if gb_rss else 0.0}
+
+def main():
+    parser = argparse.ArgumentParser(description='Un navegador por worker frente a varias pestañas en un navegador: productos/s y memoria')
+    parser.add_argument('--directorio', default='fixtures/html')
+    parser.add_argument('--paginas', type=int, default=60, help='Páginas (offsets) a rastrear en cada modo')
+    parser.add_argument('--navegadores', type=int, default=4, help='Navegadores del modo un navegador por worker')
+    parser.add_argument('--pestanas', type=int, default=4, help='Pestañas del modo un solo navegador')
+    parser.add_argument('--latencia-ms', type=float, default=800.0, help='Latencia de cada página en el servidor local')
+    parser.add_argument('--con-interfaz', action='store_true', help='Navegadores con ventana (por defecto el perfil ligero, sin interfaz)')
+    args = parser.parse_args()
+
+    carrefour_scraper.perfil_ligero = not args.con_interfaz
+    controlador_ritmo.configurar(pausa_inicial=0.0, pausa_min=0.0, adaptativo=False)
+    servidor, url_base = iniciar_servidor(args.directorio, latencia=args.latencia_ms / 1000)
+    categoria = {'titulo': 'Leche y bebidas vegetales', 'url': url_base + RUTA_FIXTURE}
+    # Sin el offset 0, que encolaría el resto de páginas
+    tareas = [{'categoria': categoria, 'offset': pagina * 24} for pagina in range(1, args.paginas + 1)]
+    print(f"{args.paginas} páginas con {args.latencia_ms:.0f} ms de latencia\n")
+
+    resultados = []
+    modos = [(f'{args.navegadores} navegadores x 1 pestaña', args.navegadores, None),
+             (f'1 navegador x {args.pestanas} pestañas', 1, args.pestanas),
+             ('1 navegador x 1 pestaña', 1, None)]
+    try:
+        for nombre, numero, pestanas in modos:
+            drivers = [carrefour_scraper.iniciar_driver() for _ in range(numero)]
+            try:
+                if pestanas:
+                    resultados.append(medir(nombre, drivers, lambda: con_pestanas(drivers[0], tareas, pestanas)))
+                else:
+                    resultados.append(medir(nombre, drivers, lambda: con_navegadores(drivers, tareas)))
+            finally:
+                for driver in drivers:
+                    driver.quit()
+    finally:
+        servidor.shutdown()
+
+    print(f"{'Modo':<28}{'Tiempo (s)':>11}{'Productos':>10}{'Prod/s':>8}{'Procesos':>9}{'RSS (MB)':>10}{'PSS (MB)':>10}{'Prod/s/GB':>11}")
+    for fila in resultados:
+        print(f"{fila['modo']:<28}{fila['segundos']:>11.2f}{fila['productos']:>10}{fila['productos_s']:>8.1f}{fila['procesos']:>9}"
+              f"{fila['rss_mb']:>10.0f}{fila['pss_mb']:>10.0f}{fila['por_gb']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
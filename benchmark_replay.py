@@ -0,0 +1,146 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import lxml.html
+from scraper_replay import SITIOS, REPRODUCTORES, cargar_fixtures, reproducir_carrefour_estado
+from mercadona_parser import CAMPOS_CELDA, nodos_celdas, parsear_celda_bs4
+from carrefour_parser import CAMPOS_TARJETA as CAMPOS_CARREFOUR, nodos_tarjetas as nodos_carrefour
+from alcampo_parser import CAMPOS_TARJETA as CAMPOS_ALCAMPO, nodos_tarjetas as nodos_alcampo
+
+# Benchmark de los parsers sobre las páginas grabadas (fixtures/html): productos/s
+# de cada backend, memoria asignada y tiempo de cada campo. Con --guardar y
+# --comparar sirve para detectar regresiones de rendimiento entre versiones.
+
+def mercadona_bs4(html, entrada):
+    """Backend antiguo: una llamada a BeautifulSoup por celda (el HTML de cada celda se prepara fuera)."""
+    return [parsear_celda_bs4(celda, entrada['categoria'], entrada['fecha']) for celda in entrada['_celdas']]
+
+def preparar_celdas(fixtures):
+    for entrada, html in fixtures:
+        entrada['_celdas'] = [lxml.html.tostring(celda, encoding='unicode') for celda in nodos_celdas(html)]
+
+# Backends de cada supermercado: nombre -> (html, entrada) -> registros
+BACKENDS = {
+    'mercadona': {'lxml': REPRODUCTORES['mercadona'], 'bs4 por celda': mercadona_bs4},
+    'carrefour': {'lxml': REPRODUCTORES['carrefour'], 'lxml estado': reproducir_carrefour_estado},
+    'alcampo': {'lxml': REPRODUCTORES['alcampo']}
+}
+
+# Cómo localizar los nodos de producto y los extractores de campo de cada supermercado
+CAMPOS = {
+    'mercadona': (lambda html, entrada: [(celda,) for celda in nodos_celdas(html)], CAMPOS_CELDA),
+    'carrefour': (lambda html, entrada: nodos_carrefour(html), CAMPOS_CARREFOUR),
+    'alcampo': (lambda html, entrada: [(tarjeta, entrada['url']) for tarjeta in nodos_alcampo(html) or []], CAMPOS_ALCAMPO)
+}
+
+def medir(funcion, repeticiones, vueltas):
+    """Mejor tiempo por vuelta de `repeticiones` mediciones de `vueltas` ejecuciones cada una."""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for _ in range(vueltas):
+            funcion()
+        duracion = (time.perf_counter() - inicio) / vueltas
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+def medir_memoria(funcion):
+    """Pico de memoria asignada (bytes) y número de bloques vivos al terminar."""
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.take_snapshot()
+        resultado = funcion()
+        despues = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    bloques = sum(stat.count_diff for stat in despues.compare_to(antes, 'filename') if stat.count_diff > 0)
+    return pico, bloques, resultado
+
+def benchmark_sitio(sitio, fixtures, repeticiones, vueltas):
+    """Devuelve {backend: métricas} y el tiempo por campo del supermercado."""
+    resultados = {}
+    for nombre, backend in BACKENDS[sitio].items():
+        ejecutar = lambda: [registro for entrada, html in fixtures for registro in backend(html, entrada)]
+        pico, bloques, productos = medir_memoria(ejecutar)
+        segundos = medir(ejecutar, repeticiones, vueltas)
+        resultados[nombre] = {
+            'productos': len(productos),
+            'segundos': segundos,
+            'productos_s': len(productos) / segundos if segundos else 0.0,
+            'pico_kb': pico / 1024,
+            'bloques': bloques
+        }
+
+    localizar, extractores = CAMPOS[sitio]
+    nodos = [nodo for entrada, html in fixtures for nodo in localizar(html, entrada)]
+    campos = {'(parseo y localización)': medir(lambda: [localizar(html, entrada) for entrada, html in fixtures], repeticiones, vueltas)}
+    for campo, extractor in extractores.items():
+        campos[campo] = medir(lambda: [extractor(*nodo) for nodo in nodos], repeticiones, vueltas)
+    # Tiempo por producto en microsegundos
+    campos = {campo: segundos / max(len(nodos), 1) * 1e6 for campo, segundos in campos.items()}
+    return resultados, campos
+
+def comparar(resultados, referencia, tolerancia):
+    """Imprime las diferencias de productos/s con una ejecución guardada y devuelve las regresiones."""
+    regresiones = []
+    print("\n=== Comparación con la referencia ===")
+    for sitio, backends in resultados.items():
+        for backend, metricas in backends.items():
+            anterior = referencia.get(sitio, {}).get(backend)
+            if not anterior:
+                continue
+            cambio = metricas['productos_s'] / anterior['productos_s'] - 1
+            marca = ''
+            if cambio < -tolerancia:
+                marca = '  <-- REGRESIÓN'
+                regresiones.append((sitio, backend, cambio))
+            print(f"{sitio:<11}{backend:<16}{anterior['productos_s']:>12.0f} -> {metricas['productos_s']:>10.0f} productos/s ({cambio:+.0%}){marca}")
+    return regresiones
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de los parsers sobre las páginas grabadas')
+    parser.add_argument('--directorio', default=os.path.join('fixtures', 'html'))
+    parser.add_argument('--sitio', choices=SITIOS, action='append', help='Supermercado a medir (por defecto todos)')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--vueltas', type=int, default=20, help='Pasadas sobre todas las páginas en cada medición')
+    parser.add_argument('--guardar', help='Guardar los resultados en un JSON (referencia para --comparar)')
+    parser.add_argument('--comparar', help='JSON de una ejecución anterior: falla si algún backend es más lento que la tolerancia')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='Pérdida de productos/s admitida al comparar (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    resultados = {}
+    for sitio in args.sitio or SITIOS:
+        fixtures = cargar_fixtures(args.directorio, sitio)
+        if not fixtures:
+            print(f"No hay páginas grabadas de {sitio} en {args.directorio}")
+            continue
+        if 'bs4 por celda' in BACKENDS[sitio]:
+            preparar_celdas(fixtures)
+
+        backends, campos = benchmark_sitio(sitio, fixtures, args.repeticiones, args.vueltas)
+        resultados[sitio] = backends
+        print(f"\n=== {sitio} ({len(fixtures)} páginas) ===")
+        print(f"{'Backend':<18}{'Productos':>10}{'Productos/s':>14}{'Pico (KB)':>12}{'Bloques':>10}")
+        for nombre, metricas in backends.items():
+            print(f"{nombre:<18}{metricas['productos']:>10}{metricas['productos_s']:>14.0f}{metricas['pico_kb']:>12.0f}{metricas['bloques']:>10}")
+        print(f"\n{'Campo':<26}{'µs/producto':>12}")
+        for campo, microsegundos in campos.items():
+            print(f"{campo:<26}{microsegundos:>12.1f}")
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=1)
+        print(f"\nResultados guardados en {args.guardar}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            referencia = json.load(f)
+        if comparar(resultados, referencia, args.tolerancia):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
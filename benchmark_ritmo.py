@@ -0,0 +1,79 @@
+import io
+import time
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from mock_server import estadisticas, iniciar_servidor
+from mercadona_api import crear_sesion, obtener_json_con_ritmo
+from scraper_ritmo import ControladorRitmo
+
+# Compara ritmos fijos con el control adaptativo (scraper_ritmo.py) contra el
+# servidor local con fallos inyectados: latencia, errores 503 aleatorios,
+# sobrecarga por encima de --capacidad peticiones simultáneas y un antibot que
+# bloquea durante --castigo segundos al pasar de --tasa-maxima peticiones/s.
+
+def estrategias(args):
+    """Nombre -> controlador. Los fijos solo cuentan las señales, sin adaptarse."""
+    fijo = lambda pausa, sesiones: ControladorRitmo(pausa_inicial=pausa, pausa_min=0.0, sesiones_max=sesiones,
+                                                    sesiones_iniciales=sesiones, adaptativo=False)
+    return {
+        f'fijo {args.workers} sesiones sin pausa': fijo(0.0, args.workers),
+        f'fijo 1 sesión, pausa {args.pausa_prudente:g}s': fijo(args.pausa_prudente, 1),
+        'adaptativo (AIMD)': ControladorRitmo(pausa_inicial=args.pausa_prudente, pausa_min=0.0, pausa_max=5.0, paso=0.01,
+                                              sesiones_max=args.workers, ventana=10),
+    }
+
+def ejecutar(url, paginas, workers, ritmo):
+    """Descarga `paginas` veces la misma categoría con el ritmo indicado."""
+    sesion = crear_sesion(tamano_pool=workers, reintentos=0)
+    fallidas = 0
+
+    def descargar(_):
+        return obtener_json_con_ritmo(sesion, url, None, ritmo)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futuros = [executor.submit(descargar, n) for n in range(paginas)]
+        for futuro in futuros:
+            try:
+                futuro.result()
+            except Exception:
+                fallidas += 1
+    segundos = time.perf_counter() - inicio
+    sesion.close()
+    return segundos, fallidas
+
+def main():
+    parser = argparse.ArgumentParser(description='Ritmo fijo frente a ritmo adaptativo contra un servidor local con fallos')
+    parser.add_argument('--directorio', default='fixtures/mercadona_api')
+    parser.add_argument('--ruta', default='/api/categories/156/', help='Fixture que se pide en cada petición')
+    parser.add_argument('--paginas', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=8, help='Sesiones paralelas máximas')
+    parser.add_argument('--pausa-prudente', type=float, default=0.2, help='Pausa del ritmo fijo prudente y pausa inicial del adaptativo')
+    parser.add_argument('--latencia-ms', type=float, default=50.0)
+    parser.add_argument('--errores', type=float, default=0.02)
+    parser.add_argument('--capacidad', type=int, default=4)
+    parser.add_argument('--tasa-maxima', type=float, default=25.0)
+    parser.add_argument('--castigo', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"{args.paginas} páginas; servidor: latencia {args.latencia_ms:.0f} ms, {args.errores:.0%} de errores, "
+          f"capacidad {args.capacidad}, antibot a {args.tasa_maxima:g} peticiones/s ({args.castigo:g}s de bloqueo)\n")
+    print(f"{'Estrategia':<32}{'Tiempo (s)':>11}{'Páginas/s':>10}{'Fallidas':>9}{'403':>6}{'503':>6}{'Bloqueos':>9}")
+    for nombre, ritmo in estrategias(args).items():
+        servidor, url_base = iniciar_servidor(args.directorio, latencia=args.latencia_ms / 1000, errores=args.errores,
+                                              capacidad=args.capacidad, tasa_maxima=args.tasa_maxima, castigo=args.castigo)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                segundos, fallidas = ejecutar(url_base + args.ruta, args.paginas, args.workers, ritmo)
+            datos = estadisticas(servidor)
+        finally:
+            servidor.shutdown()
+        respuestas = datos['respuestas']
+        print(f"{nombre:<32}{segundos:>11.2f}{(args.paginas - fallidas) / segundos:>10.1f}{fallidas:>9}"
+              f"{respuestas.get(403, 0):>6}{respuestas.get(503, 0):>6}{datos['bloqueos']:>9}")
+        if nombre.startswith('adaptativo'):
+            ritmo.resumen()
+
+if __name__ == "__main__":
+    main()
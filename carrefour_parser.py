@@ -0,0 +1,503 @@
+import re
+import json
+from datetime import datetime
+import lxml.html
+from lxml import etree
+from cssselect import HTMLTranslator
+from scraper_cantidades import parsear_formato
+
+# Selectores CSS de la rejilla y de las tarjetas. Son la única copia: los
+# scripts de extracción los reciben como SELECTORES y los parsers sin navegador
+# los traducen a XPath, así que un cambio en la web se corrige solo aquí.
+SELECTORES = {
+    'items': 'li.product-card-list__item',
+    'banner': '.trade-banner',
+    'contenido': '.product-card__parent, .product-card-list__lazy-card, .product-card',
+    'parent': 'div.product-card__parent',
+    'card': 'div.product-card',
+    'info': 'div.product-card__info-container',
+    'detalle': 'div.product-card__detail',
+    'imagen': 'img.product-card__image',
+    'enlace': 'h2.product-card__title a.product-card__title-link',
+    'precios': 'span.product-card__price',
+    'precios_unidad': 'span.product-card__price-per-unit',
+    'badge': 'div.product-card__badge span.badge__name',
+    'agotado': 'div.product-card__footer button.add-to-cart-button__button--sold-out',
+    'lazy': '.product-card-list__lazy-card',
+    'scripts_json': 'script[type="application/ld+json"], script[type="application/json"]'
+}
+
+# Lectura de una tarjeta ya renderizada (común a los scripts de extracción)
+JS_LEER_TARJETA = f"const SELECTORES = {json.dumps(SELECTORES)};" + """
+const texto = el => el ? el.textContent.replace(/\\s+/g, ' ').trim() : '';
+
+function leerTarjeta(item) {
+    if (item.matches(SELECTORES.banner) || item.style.display === 'none') return null;
+    if (!item.querySelector(SELECTORES.contenido)) return null;
+
+    const parent = item.querySelector(SELECTORES.parent);
+    const card = (parent || item).querySelector(SELECTORES.card);
+    if (!card) return null;
+
+    const info = card.querySelector(SELECTORES.info);
+    if (!info || !info.querySelector(SELECTORES.detalle)) return null;
+
+    const img = card.querySelector(SELECTORES.imagen);
+    const enlace = card.querySelector(SELECTORES.enlace);
+    const precios = Array.from(card.querySelectorAll(SELECTORES.precios)).map(texto).filter(Boolean);
+    const preciosUnidad = Array.from(card.querySelectorAll(SELECTORES.precios_unidad)).map(texto).filter(Boolean);
+    const badge = card.querySelector(SELECTORES.badge);
+
+    return {
+        titulo: (img && img.getAttribute('alt')) || texto(enlace),
+        app_price: parent ? parent.getAttribute('app_price') : null,
+        app_price_per_unit: parent ? parent.getAttribute('app_price_per_unit') : null,
+        precio_dom: precios.length ? precios[0] : null,
+        precio_unidad_dom: preciosUnidad.length ? preciosUnidad[0] : null,
+        promocion: badge ? (badge.getAttribute('title') || texto(badge)) : null,
+        agotado: !!card.querySelector(SELECTORES.agotado)
+    };
+}
+"""
+
+# Script inyectado que devuelve todas las tarjetas de producto de la página en una
+# sola llamada. Antes de extraer, recorre la página en pasos para que las tarjetas
+# "lazy" se rendericen, igual que hacía el scrollIntoView por producto.
+# Se ejecuta con execute_async_script: el último argumento es el callback.
+JS_EXTRAER_TARJETAS = JS_LEER_TARJETA + """
+const callback = arguments[arguments.length - 1];
+const maxEsperaMs = arguments[0] || 8000;
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+function pendientes() {
+    return Array.from(document.querySelectorAll(SELECTORES.items))
+        .filter(li => !li.matches(SELECTORES.banner) && li.querySelector(SELECTORES.lazy) && !li.querySelector(SELECTORES.card))
+        .length;
+}
+
+async function renderizar() {
+    const inicio = Date.now();
+    const paso = Math.max(window.innerHeight, 400);
+    for (let y = 0; y <= document.documentElement.scrollHeight && Date.now() - inicio < maxEsperaMs; y += paso) {
+        window.scrollTo(0, y);
+        await sleep(150);
+    }
+    while (pendientes() > 0 && Date.now() - inicio < maxEsperaMs) {
+        await sleep(200);
+    }
+    window.scrollTo(0, 0);
+}
+
+function extraer() {
+    const tarjetas = [];
+    for (const item of document.querySelectorAll(SELECTORES.items)) {
+        const tarjeta = leerTarjeta(item);
+        if (tarjeta) tarjetas.push(tarjeta);
+    }
+    return tarjetas;
+}
+
+renderizar().then(() => callback(JSON.stringify(extraer()))).catch(e => callback(JSON.stringify({error: String(e)})));
+"""
+
+# Claves con las que suelen venir los productos en el estado embebido de la
+# página (estado de hidratación, JSON-LD...). El orden es el de preferencia.
+CLAVES_TITULO = ['app_name', 'name', 'display_name', 'title']
+CLAVES_PRECIO = ['app_price', 'active_price', 'price', 'sale_price']
+CLAVES_PRECIO_UNIDAD = ['app_price_per_unit', 'price_per_unit', 'unit_price']
+CLAVES_UNIDAD = ['measure_unit', 'unit_of_measure', 'unit']
+CLAVES_PROMOCION = ['promotion', 'badge', 'badge_name', 'badges']
+GLOBALES_ESTADO = ['__INITIAL_STATE__', '__PRELOADED_STATE__', '__NUXT__', '__NEXT_DATA__', '__APOLLO_STATE__']
+
+# Extracción sin scroll, en una llamada síncrona: las tarjetas renderizadas se
+# leen del DOM, las que solo tienen el contenedor con los atributos app_* se
+# leen de los atributos y, si quedan tarjetas "lazy" vacías, se completan con
+# los productos del estado embebido (variables globales de hidratación y
+# scripts application/json o ld+json). Devuelve {tarjetas, pendientes}: las
+# pendientes son tarjetas lazy para las que no se encontraron datos.
+JS_EXTRAER_ESTADO = JS_LEER_TARJETA + f"""
+const CLAVES_TITULO = {json.dumps(CLAVES_TITULO)};
+const CLAVES_PRECIO = {json.dumps(CLAVES_PRECIO)};
+const CLAVES_PRECIO_UNIDAD = {json.dumps(CLAVES_PRECIO_UNIDAD)};
+const CLAVES_UNIDAD = {json.dumps(CLAVES_UNIDAD)};
+const CLAVES_PROMOCION = {json.dumps(CLAVES_PROMOCION)};
+const GLOBALES_ESTADO = {json.dumps(GLOBALES_ESTADO)};
+""" + """
+const normalizar = t => (t || '').toLowerCase().replace(/\\s+/g, ' ').trim();
+const euros = valor => typeof valor === 'number' ? valor.toFixed(2).replace('.', ',') + ' €' : String(valor);
+
+function primero(objeto, claves) {
+    for (const clave of claves) {
+        const valor = objeto[clave];
+        if (valor !== undefined && valor !== null && valor !== '') return valor;
+    }
+    return null;
+}
+
+function productoEstado(objeto) {
+    const titulo = primero(objeto, CLAVES_TITULO);
+    let ofertas = objeto.offers && typeof objeto.offers === 'object' ? objeto.offers : null;
+    if (Array.isArray(ofertas)) ofertas = ofertas[0] || null;
+    let precio = primero(objeto, CLAVES_PRECIO);
+    if (precio === null && ofertas) precio = primero(ofertas, ['price', 'lowPrice']);
+    if (typeof titulo !== 'string' || precio === null || typeof precio === 'object') return null;
+
+    let precioUnidad = primero(objeto, CLAVES_PRECIO_UNIDAD);
+    const unidad = primero(objeto, CLAVES_UNIDAD);
+    if (typeof precioUnidad === 'number') precioUnidad = unidad ? euros(precioUnidad) + '/' + unidad : null;
+    let promocion = primero(objeto, CLAVES_PROMOCION);
+    if (Array.isArray(promocion)) promocion = promocion[0] || null;
+    if (promocion && typeof promocion === 'object') promocion = primero(promocion, ['title', 'name', 'text']);
+    const disponibilidad = String((ofertas && ofertas.availability) || objeto.availability || '');
+
+    return {
+        titulo: titulo,
+        app_price: euros(precio),
+        app_price_per_unit: typeof precioUnidad === 'string' ? precioUnidad : null,
+        precio_dom: null,
+        precio_unidad_dom: null,
+        promocion: typeof promocion === 'string' ? promocion : null,
+        agotado: !!(objeto.sold_out || objeto.soldOut || objeto.is_sold_out || objeto.available === false
+                    || /OutOfStock|SoldOut/i.test(disponibilidad))
+    };
+}
+
+function fuentesEstado() {
+    const fuentes = [];
+    for (const nombre of GLOBALES_ESTADO) {
+        try { if (window[nombre] && typeof window[nombre] === 'object') fuentes.push(window[nombre]); } catch (e) {}
+    }
+    for (const script of document.querySelectorAll(SELECTORES.scripts_json)) {
+        try { fuentes.push(JSON.parse(script.textContent)); } catch (e) {}
+    }
+    return fuentes;
+}
+
+// Recorrido en profundidad en orden de documento; un objeto que es un producto no se recorre por dentro
+function productosEstado(fuentes) {
+    const productos = [];
+    const vistos = new Set();
+    const pila = fuentes.slice().reverse();
+    let visitados = 0;
+    while (pila.length && visitados++ < 200000) {
+        const valor = pila.pop();
+        if (!valor || typeof valor !== 'object' || vistos.has(valor)) continue;
+        vistos.add(valor);
+        if (!Array.isArray(valor)) {
+            const producto = productoEstado(valor);
+            if (producto) { productos.push(producto); continue; }
+        }
+        const hijos = Array.isArray(valor) ? valor : Object.values(valor);
+        for (let i = hijos.length - 1; i >= 0; i--) pila.push(hijos[i]);
+    }
+    return productos;
+}
+
+const tarjetas = [];
+let lazy = 0;
+let ultimaLazy = false;
+for (const item of document.querySelectorAll(SELECTORES.items)) {
+    const tarjeta = leerTarjeta(item);
+    if (tarjeta) { tarjetas.push(tarjeta); ultimaLazy = false; continue; }
+    if (item.matches(SELECTORES.banner) || item.style.display === 'none') continue;
+    const parent = item.querySelector(SELECTORES.parent);
+    ultimaLazy = false;
+    if (parent && parent.getAttribute('app_name') && parent.getAttribute('app_price')) {
+        tarjetas.push({titulo: parent.getAttribute('app_name'), app_price: parent.getAttribute('app_price'),
+                       app_price_per_unit: parent.getAttribute('app_price_per_unit'), precio_dom: null,
+                       precio_unidad_dom: null, promocion: null, agotado: false});
+    } else if (item.querySelector(SELECTORES.lazy)) {
+        lazy++;
+        ultimaLazy = true;
+    }
+}
+// La lista termina con una tarjeta lazy vacía incluso con todo renderizado: no es un producto
+if (ultimaLazy && tarjetas.length) lazy--;
+
+// El estado suele traer todos los productos de la página (también los ya leídos): solo se toman los que faltan
+if (lazy) {
+    const leidos = new Set(tarjetas.map(tarjeta => normalizar(tarjeta.titulo)));
+    for (const producto of productosEstado(fuentesEstado())) {
+        if (!lazy) break;
+        if (leidos.has(normalizar(producto.titulo))) continue;
+        leidos.add(normalizar(producto.titulo));
+        tarjetas.push(producto);
+        lazy--;
+    }
+}
+return JSON.stringify({tarjetas: tarjetas, pendientes: lazy});
+"""
+
+def xpath_css(selector, prefijo='descendant::'):
+    """
+    XPath precompilado equivalente a querySelectorAll(selector) sobre un
+    elemento: solo sus descendientes, en orden de documento. Con prefijo
+    'self::' equivale a element.matches(selector).
+    """
+    return etree.XPath(HTMLTranslator().css_to_xpath(selector, prefix=prefijo))
+
+# Los selectores de SELECTORES precompilados para leer las tarjetas de una
+# página guardada sin navegador; replican la lógica de JS_LEER_TARJETA.
+XPATH_ITEMS = xpath_css(SELECTORES['items'])
+XPATH_BANNER = xpath_css(SELECTORES['banner'], 'self::')
+XPATH_CONTENIDO = xpath_css(SELECTORES['contenido'])
+XPATH_PARENT = xpath_css(SELECTORES['parent'])
+XPATH_CARD = xpath_css(SELECTORES['card'])
+XPATH_INFO = xpath_css(SELECTORES['info'])
+XPATH_DETALLE = xpath_css(SELECTORES['detalle'])
+XPATH_IMAGEN = xpath_css(SELECTORES['imagen'])
+XPATH_ENLACE = xpath_css(SELECTORES['enlace'])
+XPATH_PRECIOS = xpath_css(SELECTORES['precios'])
+XPATH_PRECIOS_UNIDAD = xpath_css(SELECTORES['precios_unidad'])
+XPATH_BADGE = xpath_css(SELECTORES['badge'])
+XPATH_AGOTADO = xpath_css(SELECTORES['agotado'])
+XPATH_LAZY = xpath_css(SELECTORES['lazy'])
+XPATH_SCRIPTS_JSON = xpath_css(SELECTORES['scripts_json'])
+XPATH_SCRIPTS = etree.XPath('//script[not(@src)]')
+PATRON_GLOBAL_ESTADO = re.compile(r'window\.(' + '|'.join(GLOBALES_ESTADO) + r')\s*=\s*')
+
+def texto(elemento):
+    """Texto del elemento con los espacios normalizados, como texto() en el JS."""
+    return re.sub(r'\s+', ' ', elemento.text_content()).strip() if elemento is not None else ''
+
+def primero(elementos):
+    return elementos[0] if elementos else None
+
+def campo_titulo(card, parent):
+    imagen = primero(XPATH_IMAGEN(card))
+    return (imagen.get('alt') if imagen is not None else None) or texto(primero(XPATH_ENLACE(card)))
+
+def campo_app_price(card, parent):
+    return parent.get('app_price') if parent is not None else None
+
+def campo_app_price_per_unit(card, parent):
+    return parent.get('app_price_per_unit') if parent is not None else None
+
+def campo_precio_dom(card, parent):
+    precios = [t for t in map(texto, XPATH_PRECIOS(card)) if t]
+    return precios[0] if precios else None
+
+def campo_precio_unidad_dom(card, parent):
+    precios = [t for t in map(texto, XPATH_PRECIOS_UNIDAD(card)) if t]
+    return precios[0] if precios else None
+
+def campo_promocion(card, parent):
+    badge = primero(XPATH_BADGE(card))
+    return (badge.get('title') or texto(badge)) if badge is not None else None
+
+def campo_agotado(card, parent):
+    return bool(XPATH_AGOTADO(card))
+
+# Extractor de cada campo de la tarjeta (el benchmark los mide por separado)
+CAMPOS_TARJETA = {
+    'titulo': campo_titulo,
+    'app_price': campo_app_price,
+    'app_price_per_unit': campo_app_price_per_unit,
+    'precio_dom': campo_precio_dom,
+    'precio_unidad_dom': campo_precio_unidad_dom,
+    'promocion': campo_promocion,
+    'agotado': campo_agotado
+}
+
+def oculto(item):
+    """Banner o elemento oculto de la rejilla."""
+    estilo = (item.get('style') or '').replace(' ', '')
+    return bool(XPATH_BANNER(item)) or 'display:none' in estilo
+
+def nodo_tarjeta(item):
+    """(card, parent) si el elemento de la rejilla es una tarjeta completa, None si no (leerTarjeta en el JS)."""
+    if oculto(item) or not XPATH_CONTENIDO(item):
+        return None
+    parent = primero(XPATH_PARENT(item))
+    card = primero(XPATH_CARD(parent if parent is not None else item))
+    if card is None:
+        return None
+    info = primero(XPATH_INFO(card))
+    if info is None or not XPATH_DETALLE(info):
+        return None
+    return card, parent
+
+def nodos_tarjetas(html):
+    """Devuelve (card, parent) de cada tarjeta completa de la página."""
+    raiz = lxml.html.fromstring(html)
+    return [nodo for nodo in map(nodo_tarjeta, XPATH_ITEMS(raiz)) if nodo is not None]
+
+def parsear_tarjetas_html(html):
+    """Equivalente sin navegador de JS_EXTRAER_TARJETAS sobre una página ya renderizada."""
+    return [{campo: extractor(card, parent) for campo, extractor in CAMPOS_TARJETA.items()}
+            for card, parent in nodos_tarjetas(html)]
+
+def primera_clave(objeto, claves):
+    for clave in claves:
+        valor = objeto.get(clave)
+        if valor is not None and valor != '':
+            return valor
+    return None
+
+def euros(valor):
+    """1.29 -> '1,29 €' (los textos se dejan como vienen)."""
+    return f"{valor:.2f}".replace('.', ',') + ' €' if isinstance(valor, (int, float)) else str(valor)
+
+def producto_estado(objeto):
+    """Tarjeta a partir de un objeto del estado embebido, None si no parece un producto (productoEstado en el JS)."""
+    titulo = primera_clave(objeto, CLAVES_TITULO)
+    ofertas = objeto.get('offers') if isinstance(objeto.get('offers'), (dict, list)) else None
+    if isinstance(ofertas, list):
+        ofertas = ofertas[0] if ofertas and isinstance(ofertas[0], dict) else None
+    precio = primera_clave(objeto, CLAVES_PRECIO)
+    if precio is None and ofertas:
+        precio = primera_clave(ofertas, ['price', 'lowPrice'])
+    if not isinstance(titulo, str) or precio is None or isinstance(precio, (dict, list, bool)):
+        return None
+
+    precio_unidad = primera_clave(objeto, CLAVES_PRECIO_UNIDAD)
+    unidad = primera_clave(objeto, CLAVES_UNIDAD)
+    if isinstance(precio_unidad, (int, float)):
+        precio_unidad = f"{euros(precio_unidad)}/{unidad}" if unidad else None
+    promocion = primera_clave(objeto, CLAVES_PROMOCION)
+    if isinstance(promocion, list):
+        promocion = promocion[0] if promocion else None
+    if isinstance(promocion, dict):
+        promocion = primera_clave(promocion, ['title', 'name', 'text'])
+    disponibilidad = str((ofertas or {}).get('availability') or objeto.get('availability') or '')
+
+    return {
+        'titulo': titulo,
+        'app_price': euros(precio),
+        'app_price_per_unit': precio_unidad if isinstance(precio_unidad, str) else None,
+        'precio_dom': None,
+        'precio_unidad_dom': None,
+        'promocion': promocion if isinstance(promocion, str) else None,
+        'agotado': bool(objeto.get('sold_out') or objeto.get('soldOut') or objeto.get('is_sold_out')
+                        or objeto.get('available') is False or re.search(r'OutOfStock|SoldOut', disponibilidad, re.IGNORECASE))
+    }
+
+def fuentes_estado(raiz):
+    """Objetos del estado embebido: asignaciones window.__X__ = {...} y scripts JSON."""
+    fuentes = []
+    decodificador = json.JSONDecoder()
+    for script in XPATH_SCRIPTS(raiz):
+        codigo = script.text or ''
+        for asignacion in PATRON_GLOBAL_ESTADO.finditer(codigo):
+            try:
+                fuentes.append(decodificador.raw_decode(codigo, asignacion.end())[0])
+            except ValueError:
+                pass  # No es JSON literal (por ejemplo, la función de __NUXT__)
+    for script in XPATH_SCRIPTS_JSON(raiz):
+        try:
+            fuentes.append(json.loads(script.text or ''))
+        except ValueError:
+            pass
+    return fuentes
+
+def productos_estado(fuentes, maximo_nodos=200000):
+    """Productos del estado en orden de documento; un objeto que es un producto no se recorre por dentro."""
+    productos = []
+    pila = list(reversed(fuentes))
+    visitados = 0
+    while pila and visitados < maximo_nodos:
+        valor = pila.pop()
+        visitados += 1
+        if isinstance(valor, dict):
+            producto = producto_estado(valor)
+            if producto:
+                productos.append(producto)
+                continue
+            pila.extend(reversed(list(valor.values())))
+        elif isinstance(valor, list):
+            pila.extend(reversed(valor))
+    return productos
+
+def normalizar(titulo):
+    return re.sub(r'\s+', ' ', (titulo or '').lower()).strip()
+
+def parsear_estado_html(html):
+    """Equivalente sin navegador de JS_EXTRAER_ESTADO: devuelve (tarjetas, tarjetas lazy sin datos)."""
+    raiz = lxml.html.fromstring(html)
+    tarjetas = []
+    lazy = 0
+    ultima_lazy = False
+    for item in XPATH_ITEMS(raiz):
+        nodo = nodo_tarjeta(item)
+        if nodo is not None:
+            tarjetas.append({campo: extractor(*nodo) for campo, extractor in CAMPOS_TARJETA.items()})
+            ultima_lazy = False
+            continue
+        if oculto(item):
+            continue
+        parent = primero(XPATH_PARENT(item))
+        ultima_lazy = False
+        if parent is not None and parent.get('app_name') and parent.get('app_price'):
+            tarjetas.append({'titulo': parent.get('app_name'), 'app_price': parent.get('app_price'),
+                             'app_price_per_unit': parent.get('app_price_per_unit'), 'precio_dom': None,
+                             'precio_unidad_dom': None, 'promocion': None, 'agotado': False})
+        elif XPATH_LAZY(item):
+            lazy += 1
+            ultima_lazy = True
+    # La lista termina con una tarjeta lazy vacía incluso con todo renderizado: no es un producto
+    if ultima_lazy and tarjetas:
+        lazy -= 1
+
+    if lazy:
+        leidos = {normalizar(tarjeta['titulo']) for tarjeta in tarjetas}
+        for producto in productos_estado(fuentes_estado(raiz)):
+            if not lazy:
+                break
+            if normalizar(producto['titulo']) in leidos:
+                continue
+            leidos.add(normalizar(producto['titulo']))
+            tarjetas.append(producto)
+            lazy -= 1
+    return tarjetas, lazy
+
+def calcular_precio_unitario_titulo(titulo, precio):
+    """Calcula el precio unitario a partir de la cantidad que aparece en el título."""
+    precio_num = float(precio.replace('€', '').replace(',', '.').strip())
+    cantidad = parsear_formato(titulo)
+    if cantidad is None or not cantidad.total:
+        return None, None
+    return str(round(precio_num / cantidad.total, 2)), cantidad.unidad
+
+def construir_producto(tarjeta, categoria, fecha=None):
+    """
+    Convierte los campos en bruto de una tarjeta (los de JS_EXTRAER_TARJETAS)
+    en el registro que se guarda en el CSV.
+    """
+    fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+    titulo = tarjeta.get('titulo') or "Título no disponible"
+
+    # Obtener el precio: primero el atributo del parent y si no, el DOM
+    precio = tarjeta.get('app_price') or tarjeta.get('precio_dom') or "Precio no disponible"
+
+    # Obtener precio por unidad
+    precio_unidad = tarjeta.get('app_price_per_unit') or tarjeta.get('precio_unidad_dom')
+
+    # Procesar precio unitario
+    precio_unitario = None
+    unidad = None
+    if precio_unidad:
+        match = re.search(r'(\d+[.,]\d+)\s*€/(\w+)', precio_unidad)
+        if match:
+            precio_unitario = match.group(1).replace(',', '.')
+            unidad = match.group(2)
+
+    # Si no hay precio por unidad, intentar calcularlo del título
+    if not precio_unitario and precio != "Precio no disponible":
+        try:
+            precio_unitario, unidad = calcular_precio_unitario_titulo(titulo, precio)
+        except Exception as e:
+            print(f"Error calculando precio unitario: {str(e)}")
+            precio_unitario = None
+
+    promocion = tarjeta.get('promocion')
+    estado_producto = "Agotado temporalmente" if tarjeta.get('agotado') else "Disponible"
+
+    return {
+        'titulo': titulo,
+        'precio': precio,
+        'precio_unitario': f"{precio_unitario}€/{unidad}" if precio_unitario and unidad else "No disponible",
+        'categoria': categoria['titulo'],
+        'promocion': promocion if promocion else "No disponible",
+        'estado': estado_producto,
+        'fecha_extraccion': fecha
+    }
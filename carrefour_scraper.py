@@ -1,122 +1,47 @@
-import os 
 import re
-import csv
 import time 
 import random 
+import json
+import asyncio
 import argparse
 from datetime import datetime
 from bs4 import BeautifulSoup
-from seleniumbase import Driver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import ElementClickInterceptedException, StaleElementReferenceException
-import signal
-import sys
-
-def wait_for_elements(driver, by, selector, timeout=10, multiple=False):
-    """Espera a que uno o varios elementos estén presentes en la página."""
-    wait = WebDriverWait(driver, timeout)
-    if multiple:
-        return wait.until(EC.presence_of_all_elements_located((by, selector)))
-    else:
-        return wait.until(EC.presence_of_element_located((by, selector)))
+from scraper_common import crear_driver, guardar_csv, instalar_cierre, wait_for_elements
+from scraper_profile import medidor_trafico
+from scraper_ritmo import controlador_ritmo, texto_bloqueado
+from scraper_async import MotorAsync, Peticion
+from scraper_metricas import metricas
+from scraper_waits import contador_esperas, esperar_dom_estable, esperar_pagina, esperar_rejilla
+from scraper_frontier import FronteraCrawl
+from scraper_pool import PoolSesiones
+from scraper_replay import grabador_html
+from scraper_tracing import trazador
+from scraper_huellas import AlmacenHuellas, calcular_huella, marcar_rastreados
+from scraper_logging import NIVELES, atributo, campos, configurar_logging, muestrear, obtener_logger, registrar_producto
+from carrefour_parser import JS_EXTRAER_ESTADO, JS_EXTRAER_TARJETAS, calcular_precio_unitario_titulo, construir_producto, parsear_estado_html
 
-def click_element(driver, by, selector, timeout=10):
-    """Espera y hace clic en un elemento."""
-    try:
-        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((by, selector))).click()
-    except Exception as e:
-        print(f"No se pudo hacer clic en el elemento: {e}")
+log = obtener_logger('carrefour')
 
 def carrefour_csv(datos, nombre_archivo="carrefour.csv"):
-    """
-    Guarda los datos en un archivo CSV.
-    """
-    if not datos:
-        print("No hay datos para guardar.")
-        return
-    
-    columnas = datos[0].keys()
-    existe_archivo = os.path.isfile(nombre_archivo)
+    """Guarda los datos en un archivo CSV."""
+    guardar_csv(datos, nombre_archivo)
 
-    with open(nombre_archivo, 'a+' if existe_archivo else 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=columnas)
-        if not existe_archivo:
-            writer.writeheader()
-        writer.writerows(datos)
+# Perfil ligero del navegador (se activa con --ligero)
+perfil_ligero = False
 
-def iniciar_driver():
-    """Inicia el driver de Selenium con las configuraciones necesarias."""
-    driver = Driver(
-        browser="chrome",
-        uc=True,
-        headless2=False,
-        incognito=False,
-        agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
-        do_not_track=True,
-        undetectable=True
-    )
-    driver.maximize_window()
-    return driver
+# Modos de extracción de una página (--extraccion, también en scraper_engine.py)
+MODOS_EXTRACCION = ('js', 'estado', 'dom')
 
-def calcular_precio_unitario(formato, precio):
-    """
-    Calcula el precio por litro o por kilogramo basado en el formato del producto.
-    """
-    try:
-        # Asegurarse de que el precio sea un número
-        if isinstance(precio, str):
-            precio = precio.replace('€', '').replace(',', '.').strip()
-        try:
-            precio = float(precio)
-        except ValueError as e:
-            print(f"Error convirtiendo precio '{precio}' a float: {str(e)}")
-            return None
-        
-        litros_pattern = r'(\d+(?:\.\d+)?)\s*(?:L|l|litro)'
-        ml_pattern = r'(\d+(?:\.\d+)?)\s*(?:ml|ML|cc)'
-        kg_pattern = r'(\d+(?:\.\d+)?)\s*(?:kg|KG|Kg)'
-        g_pattern = r'(\d+(?:\.\d+)?)\s*(?:g|G|gr|GR)'
-        unidades_pattern = r'(\d+)\s*(?:botella|lata|pack|unidad|ud)'
-        
-        litros = re.findall(litros_pattern, formato)
-        ml = re.findall(ml_pattern, formato)
-        kg = re.findall(kg_pattern, formato)
-        g = re.findall(g_pattern, formato)
-        unidades = re.findall(unidades_pattern, formato)
-        
-        cantidad_total = 0
-        
-        if litros:
-            cantidad_total = sum(float(x.replace(',', '.')) for x in litros)
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif ml:
-            cantidad_total = sum(float(x.replace(',', '.')) for x in ml) / 1000
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif kg:
-            cantidad_total = sum(float(x.replace(',', '.')) for x in kg)
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        elif g:
-            cantidad_total = sum(float(x.replace(',', '.')) for x in g) / 1000
-            if unidades:
-                cantidad_total *= float(unidades[0])
-            return precio / cantidad_total
-            
-        return None
-        
-    except Exception as e:
-        print(f"Error calculando precio unitario para formato '{formato}' y precio '{precio}': {str(e)}")
-        return None
+# Ritmo de navegación (scraper_ritmo.py): 2s entre categorías al empezar, que bajan mientras no haya problemas
+RITMO = {'pausa_inicial': 2.0, 'pausa_min': 0.0, 'paso': 0.05}
+
+def iniciar_driver(directorio_perfil=None):
+    """Inicia el driver de Selenium con las configuraciones necesarias."""
+    return crear_driver(perfil_ligero, directorio_perfil)
 
 def obtener_categorias(driver):
     """Obtiene todas las categorías principales de Carrefour, excluyendo 'Mis Productos' y 'Ofertas'."""
@@ -156,7 +81,7 @@ def obtener_categorias(driver):
             if not boton_siguiente.is_displayed() or not boton_siguiente.is_enabled():
                 break
             boton_siguiente.click()
-            time.sleep(0.5)  # Pequeña espera para la animación
+            esperar_dom_estable(driver, 'carrefour', referencia=0.5)
         except Exception as e:
             print("No se puede navegar a más categorías")
             break
@@ -164,8 +89,22 @@ def obtener_categorias(driver):
     print(f"Categorías encontradas (excluyendo {', '.join(categorias_excluidas)}): {[cat['titulo'] for cat in categorias]}")
     return categorias
 
+# Pool de navegadores de reserva (se activa con --pool)
+pool_sesiones = None
+
+def preparar_sesion(driver):
+    """Deja un navegador de reserva en la portada con las cookies aceptadas."""
+    driver.get("https://www.carrefour.es/supermercado/")
+    esperar_pagina(driver, 'carrefour', referencia=3)
+    aceptar_cookies(driver)
+    return verificar_sesion(driver)
+
+@trazador.trazar('reinicio', sitio='carrefour')
 def reiniciar_driver(driver_actual=None):
-    """Cierra el driver actual si existe y crea uno nuevo."""
+    """Cierra el driver actual si existe y crea uno nuevo (o toma uno de reserva del pool)."""
+    controlador_ritmo.registrar(fallo_sesion=True)
+    if pool_sesiones:
+        return pool_sesiones.reemplazar(driver_actual)
     try:
         if driver_actual:
             driver_actual.quit()
@@ -182,8 +121,373 @@ def verificar_sesion(driver):
     except:
         return False
 
-def obtener_datos_productos(driver, categoria):
-    """Obtiene los datos de los productos dentro de una categoría."""
+def extraer_productos_pagina_dom(driver, categoria):
+    """Extrae los productos de la página actual recorriendo cada tarjeta con WebDriver."""
+    # Obtener todos los items de la lista de productos
+    wait = WebDriverWait(driver, 10)
+    items_productos = wait.until(
+        EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'li.product-card-list__item'))
+    )
+
+    # Filtrar los items que son banners ocultos
+    items_productos = [item for item in items_productos if 'trade-banner' not in item.get_attribute('class')]
+    log.info("Productos válidos en esta página", extra=campos(productos=len(items_productos)))
+
+    productos_pagina = []  # Lista temporal para productos de esta página
+    for index, item in enumerate(items_productos, 1):
+        log_item = muestrear(log, index)
+        try:
+            # Asegurar que el elemento está en el viewport antes de procesarlo
+            driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", item)
+            esperar_dom_estable(driver, 'carrefour', referencia=0.5)
+
+            # Verificar si el item está en el viewport y es interactuable
+            try:
+                is_visible = driver.execute_script("""
+                    var elem = arguments[0];
+                    if (elem.classList.contains('trade-banner')) return false;
+                    var style = window.getComputedStyle(elem);
+                    if (style.display === 'none' || style.visibility === 'hidden') return false;
+                    var rect = elem.getBoundingClientRect();
+                    return (
+                        rect.top >= 0 &&
+                        rect.left >= 0 &&
+                        rect.bottom <= (window.innerHeight || document.documentElement.clientHeight) &&
+                        rect.right <= (window.innerWidth || document.documentElement.clientWidth)
+                    );
+                """, item)
+
+                if not is_visible:
+                    # Hacer scroll hasta el elemento
+                    driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", item)
+                    esperar_dom_estable(driver, 'carrefour', referencia=0.5)
+            except Exception as e:
+                log_item.warning("Error verificando visibilidad: %s", e)
+                continue
+
+            # Verificar si es un item válido antes de procesarlo
+            if driver.execute_script("""
+                return arguments[0].classList.contains('trade-banner') ||
+                       arguments[0].style.display === 'none' ||
+                       !arguments[0].querySelector('.product-card__parent, .product-card-list__lazy-card, .product-card');
+            """, item):
+                log_item.debug("Item no válido o banner, saltando", extra=campos(item=index))
+                continue
+
+            log_item.debug("Procesando item %s (clases: %s, style: %s)", index, atributo(item, 'class'), atributo(item, 'style'))
+
+            # Intentar las diferentes rutas para encontrar el product-card
+            product_card = None
+            parent = None
+
+            # Primera ruta: product-card__parent directo
+            try:
+                log_item.debug("Ruta 1: búsqueda directa de product-card__parent")
+                log_item.debug("HTML del item completo:\n%s", atributo(item))
+
+                # Usar JavaScript para verificar si el elemento existe
+                parent_exists = driver.execute_script("""
+                    const el = arguments[0].querySelector('div.product-card__parent');
+                    return el !== null;
+                """, item)
+
+                if parent_exists:
+                    parent = item.find_element(By.CSS_SELECTOR, 'div.product-card__parent')
+                    log_item.debug("HTML del parent:\n%s", atributo(parent))
+
+                    # Obtener los atributos del parent
+                    try:
+                        app_price = parent.get_attribute('app_price')
+                        app_price_per_unit = parent.get_attribute('app_price_per_unit')
+                        log_item.debug("Atributos del parent", extra=campos(precio=app_price, precio_unidad=app_price_per_unit))
+                    except Exception as e:
+                        log_item.debug("Error obteniendo atributos del parent: %s", e)
+                        app_price = None
+                        app_price_per_unit = None
+
+                    product_card = parent.find_element(By.CSS_SELECTOR, 'div.product-card')
+                    log_item.debug("HTML del product-card:\n%s", atributo(product_card))
+                else:
+                    raise Exception("product-card__parent no encontrado")
+
+            except Exception as e:
+                log_item.debug("Error en la primera ruta: %s", e)
+                try:
+                    # Segunda ruta: lazy-card
+                    log_item.debug("Ruta 2: búsqueda a través de lazy-card")
+
+                    lazy_exists = driver.execute_script("""
+                        const el = arguments[0].querySelector('div.product-card-list__lazy-card');
+                        return el !== null;
+                    """, item)
+
+                    if lazy_exists:
+                        lazy_card = item.find_element(By.CSS_SELECTOR, 'div.product-card-list__lazy-card')
+                        log_item.debug("HTML del lazy-card:\n%s", atributo(lazy_card))
+
+                        parent = lazy_card.find_element(By.CSS_SELECTOR, 'div.product-card__parent')
+                        log_item.debug("HTML del parent:\n%s", atributo(parent))
+
+                        try:
+                            app_price = parent.get_attribute('app_price')
+                            app_price_per_unit = parent.get_attribute('app_price_per_unit')
+                            log_item.debug("Atributos del parent", extra=campos(precio=app_price, precio_unidad=app_price_per_unit))
+                        except Exception as e:
+                            log_item.debug("Error obteniendo atributos del parent en lazy-card: %s", e)
+                            app_price = None
+                            app_price_per_unit = None
+
+                        product_card = parent.find_element(By.CSS_SELECTOR, 'div.product-card')
+                        log_item.debug("HTML del product-card:\n%s", atributo(product_card))
+                    else:
+                        raise Exception("lazy-card no encontrado")
+
+                except Exception as e:
+                    log_item.debug("Error en la segunda ruta: %s", e)
+                    try:
+                        # Tercera ruta: product-card directo
+                        log_item.debug("Ruta 3: búsqueda directa de product-card")
+
+                        card_exists = driver.execute_script("""
+                            const el = arguments[0].querySelector('div.product-card');
+                            return el !== null;
+                        """, item)
+
+                        if card_exists:
+                            product_card = item.find_element(By.CSS_SELECTOR, 'div.product-card')
+                            log_item.debug("HTML del product-card:\n%s", atributo(product_card))
+                            app_price = None
+                            app_price_per_unit = None
+                        else:
+                            raise Exception("product-card no encontrado")
+
+                    except Exception as e:
+                        log_item.warning("No se pudo encontrar la estructura del producto", extra=campos(item=index, error=str(e)))
+                        continue
+
+            if not product_card:
+                log_item.warning("No se encontró product-card por ninguna ruta", extra=campos(item=index))
+                continue
+
+            # Obtener información del producto
+            try:
+                # Navegar hasta el contenedor de información
+                try:
+                    info_container = product_card.find_element(By.CSS_SELECTOR, 'div.product-card__info-container')
+                except Exception as e:
+                    log_item.warning("Error encontrando contenedor de información: %s", e)
+                    continue
+
+                try:
+                    detail_container = info_container.find_element(By.CSS_SELECTOR, 'div.product-card__detail')
+                except Exception as e:
+                    log_item.warning("Error encontrando contenedor de detalles: %s", e)
+                    continue
+
+                # Obtener el título
+                titulo = ""
+                try:
+                    # Primero intentar obtener el título de la imagen
+                    try:
+                        img_element = product_card.find_element(By.CSS_SELECTOR, 'img.product-card__image')
+                        titulo = img_element.get_attribute('alt')
+                    except Exception as e:
+                        log_item.debug("Error obteniendo título de la imagen: %s", e)
+
+                    # Si no hay título de la imagen, intentar del h2
+                    if not titulo:
+                        try:
+                            titulo_h2 = product_card.find_element(By.CSS_SELECTOR, 'h2.product-card__title')
+                            titulo_element = titulo_h2.find_element(By.CSS_SELECTOR, 'a.product-card__title-link')
+                            try:
+                                titulo = driver.execute_script(
+                                    "return arguments[0].textContent.replace(/\\s+/g, ' ').trim()",
+                                    titulo_element
+                                )
+                            except Exception as e:
+                                log_item.debug("Error ejecutando JavaScript para título: %s", e)
+                                titulo = titulo_element.text.strip()
+                        except Exception as e:
+                            log_item.debug("Error obteniendo título del h2: %s", e)
+
+                    if not titulo:
+                        titulo = "Título no disponible"
+
+                except Exception as e:
+                    log_item.warning("Error al obtener título: %s", e)
+                    titulo = "Título no disponible"
+
+                # Obtener el precio
+                precio = app_price if app_price else "Precio no disponible"
+                if not precio or precio == "Precio no disponible":
+                    try:
+                        elementos_precio = product_card.find_elements(By.CSS_SELECTOR, 'span.product-card__price')
+                        for precio_element in elementos_precio:
+                            try:
+                                log_item.debug("HTML del elemento precio: %s", atributo(precio_element))
+                                try:
+                                    precio_texto = driver.execute_script(
+                                        "return arguments[0].textContent.replace(/\\s+/g, ' ').trim()",
+                                        precio_element
+                                    )
+                                except Exception as e:
+                                    log_item.debug("Error ejecutando JavaScript para precio: %s", e)
+                                    precio_texto = precio_element.text.strip()
+
+                                if precio_texto:
+                                    precio = precio_texto
+                                    break
+                            except Exception as e:
+                                log_item.debug("Error procesando elemento de precio: %s", e)
+                                continue
+                    except Exception as e:
+                        log_item.warning("Error obteniendo precio del DOM: %s", e)
+
+                # Obtener precio por unidad
+                precio_unidad = app_price_per_unit if app_price_per_unit else None
+                if not precio_unidad:
+                    try:
+                        elementos_precio_unidad = product_card.find_elements(By.CSS_SELECTOR, 'span.product-card__price-per-unit')
+                        for precio_unidad_element in elementos_precio_unidad:
+                            try:
+                                log_item.debug("HTML del elemento precio por unidad: %s", atributo(precio_unidad_element))
+                                try:
+                                    precio_unidad_texto = driver.execute_script(
+                                        "return arguments[0].textContent.replace(/\\s+/g, ' ').trim()",
+                                        precio_unidad_element
+                                    )
+                                except Exception as e:
+                                    log_item.debug("Error ejecutando JavaScript para precio por unidad: %s", e)
+                                    precio_unidad_texto = precio_unidad_element.text.strip()
+
+                                if precio_unidad_texto:
+                                    precio_unidad = precio_unidad_texto
+                                    break
+                            except Exception as e:
+                                log_item.debug("Error procesando elemento de precio por unidad: %s", e)
+                                continue
+                    except Exception as e:
+                        log_item.warning("Error obteniendo precio por unidad del DOM: %s", e)
+
+                # Procesar precio unitario
+                precio_unitario = None
+                unidad = None
+                if precio_unidad:
+                    match = re.search(r'(\d+[.,]\d+)\s*€/(\w+)', precio_unidad)
+                    if match:
+                        precio_unitario = match.group(1).replace(',', '.')
+                        unidad = match.group(2)
+
+                # Si no hay precio por unidad, intentar calcularlo del título
+                if not precio_unitario and precio != "Precio no disponible":
+                    try:
+                        precio_unitario, unidad = calcular_precio_unitario_titulo(titulo, precio)
+                    except Exception as e:
+                        log_item.debug("Error calculando precio unitario: %s", e)
+                        precio_unitario = None
+
+                # Obtener información de promoción
+                promocion = None
+                try:
+                    badge_div = product_card.find_element(By.CSS_SELECTOR, 'div.product-card__badge')
+                    promo_element = badge_div.find_element(By.CSS_SELECTOR, 'span.badge__name')
+                    promocion = promo_element.get_attribute('title') or promo_element.text.strip()
+                except:
+                    pass
+
+                # Verificar si el producto está agotado
+                estado_producto = "Disponible"
+                try:
+                    footer = product_card.find_element(By.CSS_SELECTOR, 'div.product-card__footer')
+                    boton_agotado = footer.find_elements(By.CSS_SELECTOR, 'button.add-to-cart-button__button--sold-out')
+                    if boton_agotado:
+                        estado_producto = "Agotado temporalmente"
+                except Exception as e:
+                    log_item.debug("Error verificando disponibilidad del producto: %s", e)
+
+                producto_actual = {
+                    'titulo': titulo,
+                    'precio': precio,
+                    'precio_unitario': f"{precio_unitario}€/{unidad}" if precio_unitario and unidad else "No disponible",
+                    'categoria': categoria['titulo'],
+                    'promocion': promocion if promocion else "No disponible",
+                    'estado': estado_producto,
+                    'fecha_extraccion': datetime.now().strftime('%Y-%m-%d')
+                }
+
+                # Añadir el producto procesado a la lista temporal
+                productos_pagina.append(producto_actual)
+                registrar_producto(log_item, producto_actual, ['titulo', 'precio', 'precio_unitario', 'promocion', 'estado'])
+
+            except Exception as e:
+                log_item.warning("Error procesando detalles del producto", extra=campos(item=index, error=str(e)))
+                continue
+
+        except Exception as e:
+            log_item.warning("Error procesando producto", extra=campos(item=index, error=str(e)))
+            continue
+
+    return productos_pagina
+
+def extraer_productos_pagina_js(driver, categoria, max_espera_ms=8000):
+    """
+    Extrae todos los productos de la página actual con un único script inyectado
+    que devuelve las tarjetas como un array JSON.
+    """
+    wait_for_elements(driver, By.CSS_SELECTOR, 'li.product-card-list__item', multiple=True)
+    driver.set_script_timeout(max_espera_ms / 1000 + 10)
+    with trazador.span('lectura_dom', sitio='carrefour'):
+        resultado = json.loads(driver.execute_async_script(JS_EXTRAER_TARJETAS, max_espera_ms))
+    if isinstance(resultado, dict) and resultado.get('error'):
+        raise Exception(f"Error en el script de extracción: {resultado['error']}")
+    return construir_productos(resultado, categoria)
+
+def extraer_productos_pagina_estado(driver, categoria):
+    """
+    Extrae los productos sin hacer scroll: las tarjetas renderizadas y los
+    atributos app_* se leen del DOM y las tarjetas lazy aún vacías se completan
+    con el estado embebido en la página, todo en una llamada síncrona. Si quedan
+    tarjetas lazy sin datos en el estado, se repite la página con el modo 'js'.
+    """
+    wait_for_elements(driver, By.CSS_SELECTOR, 'li.product-card-list__item', multiple=True)
+    with trazador.span('lectura_dom', sitio='carrefour', modo='estado'):
+        resultado = json.loads(driver.execute_script(JS_EXTRAER_ESTADO))
+    if resultado['pendientes']:
+        log.info("Tarjetas sin datos en el estado de la página, se extrae con scroll",
+                 extra=campos(pendientes=resultado['pendientes'], leidas=len(resultado['tarjetas'])))
+        return extraer_productos_pagina_js(driver, categoria)
+    return construir_productos(resultado['tarjetas'], categoria)
+
+def construir_productos(tarjetas, categoria):
+    """Productos de la página a partir de las tarjetas devueltas por los scripts de extracción."""
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    with trazador.span('parseo', sitio='carrefour'):
+        productos_pagina = [construir_producto(tarjeta, categoria, fecha) for tarjeta in tarjetas]
+    log.info("Productos válidos en esta página", extra=campos(productos=len(productos_pagina)))
+    for producto in productos_pagina:
+        registrar_producto(log, producto, ['titulo', 'precio', 'precio_unitario', 'promocion', 'estado'])
+    return productos_pagina
+
+def extraer_productos_pagina(driver, categoria, modo_extraccion='js'):
+    """Extrae los productos de la página actual con el modo indicado ('js', 'estado' o 'dom')."""
+    with trazador.span('pagina', sitio='carrefour', categoria=categoria['titulo'], url=driver.current_url) as span:
+        if modo_extraccion == 'js':
+            productos_pagina = extraer_productos_pagina_js(driver, categoria)
+        elif modo_extraccion == 'estado':
+            productos_pagina = extraer_productos_pagina_estado(driver, categoria)
+        else:
+            productos_pagina = extraer_productos_pagina_dom(driver, categoria)
+        span['productos'] = len(productos_pagina)
+    medidor_trafico.medir(driver, categoria['titulo'])
+    grabador_html.grabar(driver, 'carrefour', categoria['titulo'])
+    return productos_pagina
+
+def obtener_datos_productos(driver, categoria, modo_extraccion='js', primera_pagina=None):
+    """
+    Obtiene los datos de los productos dentro de una categoría. Si se pasan los
+    productos de la primera página (ya extraídos por huella_categoria) no se
+    vuelve a extraer.
+    """
     productos = []
     current_offset = 0
     pagina_actual = 1
@@ -203,7 +507,7 @@ def obtener_datos_productos(driver, categoria):
                 print("Sesión inválida detectada - reiniciando driver")
                 driver = reiniciar_driver(driver)
                 driver.get(categoria['url'])
-                time.sleep(3)  # Espera adicional después de reiniciar
+                esperar_pagina(driver, 'carrefour', referencia=3)
                 try:
                     aceptar_cookies(driver)
                 except:
@@ -231,421 +535,48 @@ def obtener_datos_productos(driver, categoria):
                 # Esperar a que el contenedor principal de productos se cargue
                 wait = WebDriverWait(driver, 10)
                 wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'ul.product-card-list__list')))
-                time.sleep(2)
+                esperar_rejilla(driver, 'carrefour', referencia=2, navegacion=False)
                 
                 # Obtener información de paginación
                 is_last_page = False
                 try:
                     # Primero intentar encontrar el div de paginación
                     pagination_div = driver.find_element(By.CSS_SELECTOR, 'div.pagination__row')
-                    print("\nDebug - HTML del div de paginación:")
-                    print(pagination_div.get_attribute('outerHTML'))
+                    log.debug("HTML del div de paginación:\n%s", atributo(pagination_div))
                     
                     # Obtener todos los elementos de texto dentro del div de paginación
                     pagination_elements = pagination_div.find_elements(By.CSS_SELECTOR, '*')
                     pagination_info = ' '.join([el.text for el in pagination_elements if el.text.strip()])
-                    print(f"\nDebug - Texto completo de paginación encontrado: '{pagination_info}'")
+                    log.debug("Texto de paginación: '%s'", pagination_info)
                     
                     # Buscar el patrón "Página X de Y" con una expresión regular más flexible
                     page_match = re.search(r'[Pp]ágina\s*(\d+)\s*de\s*(\d+)', pagination_info, re.IGNORECASE)
                     if page_match:
                         current_page = int(page_match.group(1))
                         total_pages = int(page_match.group(2))
-                        print(f"Debug - Números extraídos - current_page: {current_page}, total_pages: {total_pages}")
                         # Verificar si estamos en la última página
                         is_last_page = current_page >= total_pages
-                        print(f"¿Es última página? {is_last_page} (Página {current_page} de {total_pages})")
+                        log.debug("Paginación", extra=campos(pagina=current_page, total=total_pages, ultima=is_last_page))
                     else:
-                        print("Debug - No se encontró el patrón 'Página X de Y' en el texto")
                         # Intentar buscar los números de otra manera
                         all_numbers = re.findall(r'\d+', pagination_info)
-                        print(f"Debug - Todos los números encontrados en el texto: {all_numbers}")
+                        log.debug("No se encontró el patrón 'Página X de Y'", extra=campos(numeros=all_numbers))
                         if len(all_numbers) >= 2:
                             current_page = int(all_numbers[0])
                             total_pages = int(all_numbers[-1])
-                            print(f"Debug - Usando números alternativos - current_page: {current_page}, total_pages: {total_pages}")
                             is_last_page = current_page >= total_pages
-                            print(f"¿Es última página? {is_last_page} (Página {current_page} de {total_pages})")
+                            log.debug("Paginación (números alternativos)", extra=campos(pagina=current_page, total=total_pages, ultima=is_last_page))
                         else:
-                            print("No se pudo determinar la información de paginación")
+                            log.info("No se pudo determinar la información de paginación")
                             is_last_page = False  # Continuamos hasta que podamos determinar los números
                 except Exception as e:
                     print(f"Error obteniendo información de paginación: {e}")
                     is_last_page = False  # Continuamos hasta que podamos determinar los números
 
-                # Obtener todos los items de la lista de productos
-                items_productos = wait.until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'li.product-card-list__item'))
-                )
-                
-                # Filtrar los items que son banners ocultos
-                items_productos = [item for item in items_productos if 'trade-banner' not in item.get_attribute('class')]
-                print(f"Productos válidos en esta página: {len(items_productos)}")
-
-                productos_pagina = []  # Lista temporal para productos de esta página
-                for index, item in enumerate(items_productos, 1):
-                    try:
-                        # Asegurar que el elemento está en el viewport antes de procesarlo
-                        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", item)
-                        time.sleep(0.5)
-                        
-                        # Verificar si el item está en el viewport y es interactuable
-                        try:
-                            is_visible = driver.execute_script("""
-                                var elem = arguments[0];
-                                if (elem.classList.contains('trade-banner')) return false;
-                                var style = window.getComputedStyle(elem);
-                                if (style.display === 'none' || style.visibility === 'hidden') return false;
-                                var rect = elem.getBoundingClientRect();
-                                return (
-                                    rect.top >= 0 &&
-                                    rect.left >= 0 &&
-                                    rect.bottom <= (window.innerHeight || document.documentElement.clientHeight) &&
-                                    rect.right <= (window.innerWidth || document.documentElement.clientWidth)
-                                );
-                            """, item)
-                            
-                            if not is_visible:
-                                # Hacer scroll hasta el elemento
-                                driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", item)
-                                time.sleep(0.5)  # Pequeña espera para que termine el scroll
-                        except Exception as e:
-                            print(f"Error verificando visibilidad: {str(e)}")
-                            continue
-
-                        # Verificar si es un item válido antes de procesarlo
-                        if driver.execute_script("""
-                            return arguments[0].classList.contains('trade-banner') || 
-                                   arguments[0].style.display === 'none' ||
-                                   !arguments[0].querySelector('.product-card__parent, .product-card-list__lazy-card, .product-card');
-                        """, item):
-                            print("Item no válido o banner, saltando...")
-                            continue
-
-                        print("\n=== Procesando nuevo item ===")
-                        print(f"Clases del item: {item.get_attribute('class')}")
-                        print(f"Style del item: {item.get_attribute('style')}")
-
-                        # Intentar las diferentes rutas para encontrar el product-card
-                        product_card = None
-                        parent = None
-                        
-                        # Primera ruta: product-card__parent directo
-                        try:
-                            print("\n=== RUTA 1: Búsqueda directa de product-card__parent ===")
-                            print("Intentando encontrar product-card__parent directamente...")
-                            
-                            # Mostrar el HTML del item para debug
-                            print(f"HTML del item completo:\n{item.get_attribute('outerHTML')}\n")
-                            
-                            # Usar JavaScript para verificar si el elemento existe
-                            parent_exists = driver.execute_script("""
-                                const el = arguments[0].querySelector('div.product-card__parent');
-                                console.log('Elemento encontrado:', el);
-                                return el !== null;
-                            """, item)
-                            
-                            print(f"¿Existe product-card__parent?: {parent_exists}")
-                            
-                            if parent_exists:
-                                parent = item.find_element(By.CSS_SELECTOR, 'div.product-card__parent')
-                                print("product-card__parent encontrado")
-                                print(f"HTML del parent:\n{parent.get_attribute('outerHTML')}\n")
-                                
-                                # Obtener los atributos del parent
-                                try:
-                                    app_price = parent.get_attribute('app_price')
-                                    app_price_per_unit = parent.get_attribute('app_price_per_unit')
-                                    print(f"Atributos del parent - precio: {app_price}, precio por unidad: {app_price_per_unit}")
-                                except Exception as e:
-                                    print(f"Error obteniendo atributos del parent: {str(e)}")
-                                    app_price = None
-                                    app_price_per_unit = None
-                                
-                                product_card = parent.find_element(By.CSS_SELECTOR, 'div.product-card')
-                                print("product-card encontrado dentro de parent")
-                                print(f"HTML del product-card:\n{product_card.get_attribute('outerHTML')}\n")
-                            else:
-                                print("product-card__parent no encontrado")
-                                raise Exception("Elemento no encontrado")
-                            
-                        except Exception as e:
-                            print(f"Error en la primera ruta: {str(e)}")
-                            try:
-                                # Segunda ruta: lazy-card
-                                print("\n=== RUTA 2: Búsqueda a través de lazy-card ===")
-                                print("Buscando dentro de lazy-card...")
-                                
-                                # Mostrar el HTML del item para debug
-                                print(f"HTML del item completo:\n{item.get_attribute('outerHTML')}\n")
-                                
-                                lazy_exists = driver.execute_script("""
-                                    const el = arguments[0].querySelector('div.product-card-list__lazy-card');
-                                    console.log('Lazy-card encontrado:', el);
-                                    return el !== null;
-                                """, item)
-                                
-                                print(f"¿Existe lazy-card?: {lazy_exists}")
-                                
-                                if lazy_exists:
-                                    lazy_card = item.find_element(By.CSS_SELECTOR, 'div.product-card-list__lazy-card')
-                                    print(f"HTML del lazy-card:\n{lazy_card.get_attribute('outerHTML')}\n")
-                                    
-                                    parent = lazy_card.find_element(By.CSS_SELECTOR, 'div.product-card__parent')
-                                    print("product-card__parent encontrado dentro de lazy-card")
-                                    print(f"HTML del parent:\n{parent.get_attribute('outerHTML')}\n")
-                                    
-                                    try:
-                                        app_price = parent.get_attribute('app_price')
-                                        app_price_per_unit = parent.get_attribute('app_price_per_unit')
-                                        print(f"Atributos del parent - precio: {app_price}, precio por unidad: {app_price_per_unit}")
-                                    except Exception as e:
-                                        print(f"Error obteniendo atributos del parent en lazy-card: {str(e)}")
-                                        app_price = None
-                                        app_price_per_unit = None
-                                    
-                                    product_card = parent.find_element(By.CSS_SELECTOR, 'div.product-card')
-                                    print("product-card encontrado dentro de lazy-card parent")
-                                    print(f"HTML del product-card:\n{product_card.get_attribute('outerHTML')}\n")
-                                else:
-                                    print("lazy-card no encontrado")
-                                    raise Exception("Elemento no encontrado")
-                                
-                            except Exception as e:
-                                print(f"Error en la segunda ruta: {str(e)}")
-                                try:
-                                    # Tercera ruta: product-card directo
-                                    print("\n=== RUTA 3: Búsqueda directa de product-card ===")
-                                    print("Buscando div.product-card directamente...")
-                                    
-                                    # Mostrar el HTML del item para debug
-                                    print(f"HTML del item completo:\n{item.get_attribute('outerHTML')}\n")
-                                    
-                                    card_exists = driver.execute_script("""
-                                        const el = arguments[0].querySelector('div.product-card');
-                                        console.log('Product-card encontrado:', el);
-                                        return el !== null;
-                                    """, item)
-                                    
-                                    print(f"¿Existe product-card?: {card_exists}")
-                                    
-                                    if card_exists:
-                                        product_card = item.find_element(By.CSS_SELECTOR, 'div.product-card')
-                                        print("product-card encontrado directamente")
-                                        print(f"HTML del product-card:\n{product_card.get_attribute('outerHTML')}\n")
-                                        app_price = None
-                                        app_price_per_unit = None
-                                    else:
-                                        print("product-card no encontrado")
-                                        raise Exception("Elemento no encontrado")
-                                    
-                                except Exception as e:
-                                    print(f"Error en la tercera ruta: {str(e)}")
-                                    print("No se pudo encontrar la estructura del producto")
-                                    continue
-
-                        if not product_card:
-                            print("No se encontró product-card por ninguna ruta")
-                            continue
-
-                        # Obtener información del producto
-                        try:
-                            # Navegar hasta el contenedor de información
-                            try:
-                                info_container = product_card.find_element(By.CSS_SELECTOR, 'div.product-card__info-container')
-                                print("Contenedor de información encontrado")
-                            except Exception as e:
-                                print(f"Error encontrando contenedor de información: {str(e)}")
-                                continue
-                            
-                            try:
-                                detail_container = info_container.find_element(By.CSS_SELECTOR, 'div.product-card__detail')
-                                print("Contenedor de detalles encontrado")
-                            except Exception as e:
-                                print(f"Error encontrando contenedor de detalles: {str(e)}")
-                                continue
-
-                            # Obtener el título
-                            titulo = ""
-                            try:
-                                print("Buscando título...")
-                                # Primero intentar obtener el título de la imagen
-                                try:
-                                    img_element = product_card.find_element(By.CSS_SELECTOR, 'img.product-card__image')
-                                    titulo = img_element.get_attribute('alt')
-                                    print(f"Título obtenido de la imagen: '{titulo}'")
-                                except Exception as e:
-                                    print(f"Error obteniendo título de la imagen: {str(e)}")
-                                
-                                # Si no hay título de la imagen, intentar del h2
-                                if not titulo:
-                                    print("Buscando título en h2...")
-                                    try:
-                                        titulo_h2 = product_card.find_element(By.CSS_SELECTOR, 'h2.product-card__title')
-                                        print("h2 encontrado")
-                                        titulo_element = titulo_h2.find_element(By.CSS_SELECTOR, 'a.product-card__title-link')
-                                        print("Enlace de título encontrado")
-                                        try:
-                                            titulo = driver.execute_script(
-                                                "return arguments[0].textContent.replace(/\\s+/g, ' ').trim()",
-                                                titulo_element
-                                            )
-                                            print(f"Título obtenido del enlace: '{titulo}'")
-                                        except Exception as e:
-                                            print(f"Error ejecutando JavaScript para título: {str(e)}")
-                                            titulo = titulo_element.text.strip()
-                                            print(f"Título obtenido como texto plano: '{titulo}'")
-                                    except Exception as e:
-                                        print(f"Error obteniendo título del h2: {str(e)}")
-                                
-                                if not titulo:
-                                    titulo = "Título no disponible"
-                                
-                            except Exception as e:
-                                print(f"Error al obtener título: {str(e)}")
-                                titulo = "Título no disponible"
-
-                            # Obtener el precio
-                            precio = app_price if app_price else "Precio no disponible"
-                            if not precio or precio == "Precio no disponible":
-                                try:
-                                    print("Buscando precio en el DOM...")
-                                    elementos_precio = product_card.find_elements(By.CSS_SELECTOR, 'span.product-card__price')
-                                    print(f"Encontrados {len(elementos_precio)} elementos de precio")
-                                    for precio_element in elementos_precio:
-                                        try:
-                                            print(f"HTML del elemento precio: {precio_element.get_attribute('outerHTML')}")
-                                            try:
-                                                precio_texto = driver.execute_script(
-                                                    "return arguments[0].textContent.replace(/\\s+/g, ' ').trim()",
-                                                    precio_element
-                                                )
-                                            except Exception as e:
-                                                print(f"Error ejecutando JavaScript para precio: {str(e)}")
-                                                precio_texto = precio_element.text.strip()
-                                                
-                                            print(f"Texto extraído del precio: '{precio_texto}'")
-                                            if precio_texto:
-                                                precio = precio_texto
-                                                print(f"Precio encontrado en el DOM: {precio}")
-                                                break
-                                        except Exception as e:
-                                            print(f"Error procesando elemento de precio: {str(e)}")
-                                            continue
-                                except Exception as e:
-                                    print(f"Error obteniendo precio del DOM: {e}")
-
-                            # Obtener precio por unidad
-                            precio_unidad = app_price_per_unit if app_price_per_unit else None
-                            if not precio_unidad:
-                                try:
-                                    print("Buscando precio por unidad en el DOM...")
-                                    elementos_precio_unidad = product_card.find_elements(By.CSS_SELECTOR, 'span.product-card__price-per-unit')
-                                    print(f"Encontrados {len(elementos_precio_unidad)} elementos de precio por unidad")
-                                    for precio_unidad_element in elementos_precio_unidad:
-                                        try:
-                                            print(f"HTML del elemento precio por unidad: {precio_unidad_element.get_attribute('outerHTML')}")
-                                            try:
-                                                precio_unidad_texto = driver.execute_script(
-                                                    "return arguments[0].textContent.replace(/\\s+/g, ' ').trim()",
-                                                    precio_unidad_element
-                                                )
-                                            except Exception as e:
-                                                print(f"Error ejecutando JavaScript para precio por unidad: {str(e)}")
-                                                precio_unidad_texto = precio_unidad_element.text.strip()
-                                                
-                                            print(f"Texto extraído del precio por unidad: '{precio_unidad_texto}'")
-                                            if precio_unidad_texto:
-                                                precio_unidad = precio_unidad_texto
-                                                print(f"Precio por unidad encontrado en el DOM: {precio_unidad}")
-                                                break
-                                        except Exception as e:
-                                            print(f"Error procesando elemento de precio por unidad: {str(e)}")
-                                            continue
-                                except Exception as e:
-                                    print(f"Error obteniendo precio por unidad del DOM: {e}")
-
-                            # Procesar precio unitario
-                            precio_unitario = None
-                            unidad = None
-                            if precio_unidad:
-                                match = re.search(r'(\d+[.,]\d+)\s*€/(\w+)', precio_unidad)
-                                if match:
-                                    precio_unitario = match.group(1).replace(',', '.')
-                                    unidad = match.group(2)
-
-                            # Si no hay precio por unidad, intentar calcularlo del título
-                            if not precio_unitario and precio != "Precio no disponible":
-                                # Limpiar el precio antes de los cálculos
-                                precio_limpio = precio.replace('€', '').replace(',', '.').strip()
-                                try:
-                                    precio_num = float(precio_limpio)
-                                    formato_match = re.search(r'(\d+(?:[.,]\d+)?)\s*(kg|g|l|ml|cl|ud|unidad(?:es)?|botella(?:s)?|lata(?:s)?|pack(?:s)?)', titulo, re.IGNORECASE)
-                                    if formato_match:
-                                        cantidad = float(formato_match.group(1).replace(',', '.'))
-                                        unidad_medida = formato_match.group(2).lower()
-                                        
-                                        if unidad_medida in ['g']:
-                                            cantidad = cantidad / 1000
-                                            unidad = 'kg'
-                                        elif unidad_medida in ['ml', 'cl']:
-                                            cantidad = cantidad / 1000 if unidad_medida == 'ml' else cantidad / 100
-                                            unidad = 'l'
-                                        elif unidad_medida in ['kg', 'l']:
-                                            unidad = unidad_medida
-                                        else:
-                                            unidad = 'ud'
-                                        
-                                        precio_unitario = str(round(precio_num / cantidad, 2))
-                                except Exception as e:
-                                    print(f"Error calculando precio unitario: {str(e)}")
-                                    precio_unitario = None
-
-                            # Obtener información de promoción
-                            promocion = None
-                            try:
-                                badge_div = product_card.find_element(By.CSS_SELECTOR, 'div.product-card__badge')
-                                promo_element = badge_div.find_element(By.CSS_SELECTOR, 'span.badge__name')
-                                promocion = promo_element.get_attribute('title') or promo_element.text.strip()
-                            except:
-                                pass
-
-                            # Verificar si el producto está agotado
-                            estado_producto = "Disponible"
-                            try:
-                                footer = product_card.find_element(By.CSS_SELECTOR, 'div.product-card__footer')
-                                boton_agotado = footer.find_elements(By.CSS_SELECTOR, 'button.add-to-cart-button__button--sold-out')
-                                if boton_agotado:
-                                    estado_producto = "Agotado temporalmente"
-                            except Exception as e:
-                                print(f"Error verificando disponibilidad del producto: {e}")
-
-                            print(f"Producto: {titulo}")
-                            print(f"Precio: {precio}")
-                            print(f"Precio unitario: {precio_unitario}€/{unidad}" if precio_unitario and unidad else "Precio unitario no disponible")
-                            if promocion:
-                                print(f"Promoción: {promocion}")
-
-                            producto_actual = {
-                                'titulo': titulo,
-                                'precio': precio,
-                                'precio_unitario': f"{precio_unitario}€/{unidad}" if precio_unitario and unidad else "No disponible",
-                                'categoria': categoria['titulo'],
-                                'promocion': promocion if promocion else "No disponible",
-                                'estado': estado_producto,
-                                'fecha_extraccion': datetime.now().strftime('%Y-%m-%d')
-                            }
-
-                            # Añadir el producto procesado a la lista temporal
-                            productos_pagina.append(producto_actual)
-
-                        except Exception as e:
-                            print(f"Error procesando detalles del producto: {str(e)}")
-                            continue
-
-                    except Exception as e:
-                        print(f"Error procesando producto {index}: {str(e)}")
-                        continue
+                if primera_pagina is not None and pagina_actual == 1:
+                    productos_pagina, primera_pagina = primera_pagina, None
+                else:
+                    productos_pagina = extraer_productos_pagina(driver, categoria, modo_extraccion)
 
                 # Añadir productos de esta página a la lista principal
                 productos.extend(productos_pagina)
@@ -707,7 +638,7 @@ def obtener_datos_productos(driver, categoria):
                             
                             try:
                                 driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", next_link)
-                                time.sleep(1)
+                                esperar_dom_estable(driver, 'carrefour', referencia=1)
                             except Exception as e:
                                 print(f"Error haciendo scroll al enlace: {e}")
                             
@@ -727,7 +658,7 @@ def obtener_datos_productos(driver, categoria):
                             # Verificar que la navegación fue exitosa
                             wait = WebDriverWait(driver, 10)
                             wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'ul.product-card-list__list')))
-                            time.sleep(2)
+                            esperar_rejilla(driver, 'carrefour', referencia=2)
                         else:
                             print("El enlace no es válido o es la misma página actual - terminando categoría")
                             break
@@ -745,6 +676,7 @@ def obtener_datos_productos(driver, categoria):
         except Exception as e:
             print(f"Error durante el procesamiento (intento {reintento_actual + 1} de {max_reintentos}): {str(e)}")
             reintento_actual += 1
+            trazador.evento('reintento', sitio='carrefour', categoria=categoria['titulo'], error=str(e)[:200])
             
             if reintento_actual < max_reintentos:
                 print("Reiniciando driver y reintentando...")
@@ -755,7 +687,7 @@ def obtener_datos_productos(driver, categoria):
                         driver.get(last_url)
                     else:
                         driver.get(categoria['url'])
-                    time.sleep(3)
+                    esperar_pagina(driver, 'carrefour', referencia=3)
                     try:
                         aceptar_cookies(driver)
                     except:
@@ -771,6 +703,208 @@ def obtener_datos_productos(driver, categoria):
     print(f"Total productos recolectados: {len(productos)}")
     return productos
 
+def url_con_offset(url, offset):
+    """Devuelve la URL de la página de una categoría con el offset indicado."""
+    separador = '&' if '?' in url else '?'
+    return f"{url}{separador}offset={offset}" if offset else url
+
+def obtener_total_paginas(driver):
+    """Lee el total de páginas del texto 'Página X de Y' (1 si no hay paginación)."""
+    try:
+        pagination_div = driver.find_element(By.CSS_SELECTOR, 'div.pagination__row')
+        page_match = re.search(r'[Pp]ágina\s*(\d+)\s*de\s*(\d+)', pagination_div.text, re.IGNORECASE)
+        if page_match:
+            return int(page_match.group(2))
+    except Exception:
+        pass
+    return 1
+
+def huella_categoria(driver, categoria, modo_extraccion='js'):
+    """
+    Huella de la categoría abierta: total de páginas y (título, precio) de la
+    primera página. Devuelve (huella, productos de la primera página) para que
+    el rastreo de la categoría no tenga que volver a extraerla.
+    """
+    esperar_rejilla(driver, 'carrefour', referencia=2, navegacion=False)
+    productos_pagina = extraer_productos_pagina(driver, categoria, modo_extraccion)
+    total_paginas = obtener_total_paginas(driver)
+    huella = calcular_huella(total_paginas, [(producto['titulo'], producto['precio']) for producto in productos_pagina])
+    return huella, productos_pagina
+
+def obtener_datos_productos_frontera(driver, categoria, frontera, modo_extraccion='js', max_reintentos=3):
+    """
+    Recorre las páginas de una categoría a través de la frontera persistente:
+    solo se visitan los offsets pendientes y cada página terminada se guarda
+    en la frontera junto con sus productos.
+
+    Devuelve (productos de la categoría, driver), porque el driver puede
+    reiniciarse por el camino.
+    """
+    url = categoria['url']
+    if not frontera.registrada(url):
+        driver.get(url)
+        esperar_rejilla(driver, 'carrefour', referencia=3)
+        total_paginas = obtener_total_paginas(driver)
+        frontera.registrar_categoria(url, categoria['titulo'], total_paginas)
+        print(f"Categoría registrada en la frontera: {total_paginas} páginas")
+
+    pendientes = frontera.pendientes(url)
+    print(f"Páginas pendientes en {categoria['titulo']}: {len(pendientes)}")
+
+    for offset in pendientes:
+        for intento in range(max_reintentos):
+            try:
+                print(f"\n=== Procesando offset {offset} (intento {intento + 1}) ===")
+                frontera.marcar_en_curso(url, offset)
+                url_pagina = url_con_offset(url, offset)
+                if driver.current_url != url_pagina:
+                    driver.get(url_pagina)
+                    esperar_rejilla(driver, 'carrefour', referencia=3)
+                productos_pagina = extraer_productos_pagina(driver, categoria, modo_extraccion)
+                frontera.completar(url, offset, productos_pagina)
+                print(f"Productos guardados en la frontera para el offset {offset}: {len(productos_pagina)}")
+                break
+            except Exception as e:
+                print(f"Error en el offset {offset}: {str(e)}")
+                frontera.marcar_pendiente(url, offset)
+                trazador.evento('reintento', sitio='carrefour', categoria=categoria['titulo'], offset=offset, error=str(e)[:200])
+                if intento < max_reintentos - 1 and not verificar_sesion(driver):
+                    print("Sesión inválida detectada - reiniciando driver")
+                    driver = reiniciar_driver(driver)
+                    driver.get(url)
+                    esperar_pagina(driver, 'carrefour', referencia=3)
+                    aceptar_cookies(driver)
+
+    if not frontera.categoria_completa(url):
+        print(f"Quedan páginas pendientes en {categoria['titulo']}, se completarán en la siguiente ejecución")
+        return [], driver
+    return frontera.productos_categoria(url), driver
+
+def cabeceras_sesion(driver, referer):
+    """Cabeceras para pedir páginas fuera del navegador con su misma sesión (cookies y User-Agent)."""
+    cookies = '; '.join(f"{cookie['name']}={cookie['value']}" for cookie in driver.get_cookies())
+    return {
+        'User-Agent': driver.execute_script("return navigator.userAgent;"),
+        'Accept': 'text/html,application/xhtml+xml',
+        'Accept-Language': 'es-ES,es;q=0.9',
+        'Referer': referer,
+        'Cookie': cookies
+    }
+
+async def descargar_offsets(url, offsets, cabeceras, concurrencia):
+    """Descarga a la vez las páginas de los offsets: {offset: (html o None, segundos, error)}."""
+    async with MotorAsync(concurrencia_por_host=concurrencia, reintentos=1, cabeceras=cabeceras) as motor:
+        async def descargar(offset):
+            inicio = time.monotonic()
+            try:
+                html = await motor.obtener(Peticion(url_con_offset(url, offset)))
+                return offset, (html if isinstance(html, str) else None, time.monotonic() - inicio, None)
+            except Exception as e:
+                return offset, (None, time.monotonic() - inicio, e)
+        return dict(await asyncio.gather(*(descargar(offset) for offset in offsets)))
+
+def obtener_datos_productos_paralelo(driver, categoria, concurrencia=8, modo_extraccion='js', max_reintentos=3, primera_pagina=None):
+    """
+    Descarga todas las páginas de una categoría a la vez en lugar de seguir el
+    enlace "siguiente": con la primera página abierta en el navegador se lee el
+    total de páginas, el resto de offsets se piden en paralelo con las cookies
+    de la sesión y se parsean con lxml (tarjetas y estado embebido). Los offsets
+    que fallan, devuelven una página de bloqueo o dejan tarjetas sin datos se
+    repiten uno a uno con el navegador. Los productos se devuelven en el orden
+    de las páginas. Si se pasan los productos de la primera página (ya
+    extraídos por huella_categoria) y sigue abierta, no se vuelve a extraer.
+
+    Devuelve (productos de la categoría, driver), porque el driver puede
+    reiniciarse por el camino.
+    """
+    url = categoria['url']
+    navegacion = driver.current_url != url
+    if navegacion:
+        driver.get(url)
+    esperar_rejilla(driver, 'carrefour', referencia=3, navegacion=navegacion)
+    total_paginas = obtener_total_paginas(driver)
+    if primera_pagina is None or navegacion:
+        primera_pagina = extraer_productos_pagina(driver, categoria, modo_extraccion)
+    por_offset = {0: primera_pagina}
+    offsets = [pagina * 24 for pagina in range(1, total_paginas)]  # 24 productos por página
+    print(f"Categoría con {total_paginas} páginas: {len(offsets)} offsets en paralelo ({concurrencia} a la vez)")
+
+    repetir = []
+    if offsets:
+        with trazador.span('descarga_paralela', sitio='carrefour', categoria=categoria['titulo'], paginas=len(offsets)) as span:
+            descargas = asyncio.run(descargar_offsets(url, offsets, cabeceras_sesion(driver, url), concurrencia))
+            fecha = datetime.now().strftime('%Y-%m-%d')
+            for offset in offsets:
+                html, segundos, error = descargas[offset]
+                bloqueado = getattr(error, 'status', None) in (403, 429) or texto_bloqueado(html)
+                tarjetas, pendientes = parsear_estado_html(html) if html and not bloqueado else ([], 0)
+                valida = bool(tarjetas) and not pendientes
+                controlador_ritmo.registrar(segundos, error=error is not None and not bloqueado, bloqueado=bloqueado)
+                trazador.registrar('espera', segundos, 'ok' if valida else 'error', sitio='carrefour', tipo='pagina', offset=offset)
+                if not valida:
+                    motivo = 'bloqueo' if bloqueado else error or f"{len(tarjetas)} tarjetas, {pendientes} sin datos"
+                    print(f"Offset {offset}: {motivo} - se repetirá con el navegador")
+                    repetir.append(offset)
+                    continue
+                with trazador.span('parseo', sitio='carrefour'):
+                    por_offset[offset] = [construir_producto(tarjeta, categoria, fecha) for tarjeta in tarjetas]
+            span['repetidos'] = len(repetir)
+        print(f"Descargados {len(offsets) - len(repetir)} de {len(offsets)} offsets; a repetir: {len(repetir)}")
+
+    for offset in repetir:
+        for intento in range(max_reintentos):
+            try:
+                print(f"\n=== Repitiendo offset {offset} con el navegador (intento {intento + 1}) ===")
+                controlador_ritmo.esperar()
+                driver.get(url_con_offset(url, offset))
+                esperar_rejilla(driver, 'carrefour', referencia=3)
+                por_offset[offset] = extraer_productos_pagina(driver, categoria, modo_extraccion)
+                break
+            except Exception as e:
+                print(f"Error en el offset {offset}: {str(e)}")
+                trazador.evento('reintento', sitio='carrefour', categoria=categoria['titulo'], offset=offset, error=str(e)[:200])
+                if intento < max_reintentos - 1 and not verificar_sesion(driver):
+                    print("Sesión inválida detectada - reiniciando driver")
+                    driver = reiniciar_driver(driver)
+
+    faltan = [offset for offset in offsets if offset not in por_offset]
+    if faltan:
+        print(f"No se pudieron extraer los offsets {faltan} de {categoria['titulo']}")
+    productos = [producto for offset in sorted(por_offset) for producto in por_offset[offset]]
+    print(f"\n=== Resumen de categoría: {categoria['titulo']} ===")
+    print(f"Páginas extraídas: {len(por_offset)} de {total_paginas}")
+    print(f"Total productos recolectados: {len(productos)}")
+    return productos, driver
+
+def tareas_cola(driver):
+    """Tareas iniciales para la cola de trabajo (scraper_cola.py): una por categoría."""
+    return [(categoria['url'], {'categoria': categoria, 'offset': 0}) for categoria in obtener_categorias(driver)]
+
+def ejecutar_tarea_cola(driver, tarea, modo_extraccion='js'):
+    """
+    Procesa una página de la cola de trabajo. Al procesar la primera página de
+    una categoría se encolan las demás, una tarea por offset.
+    Devuelve (productos, tareas nuevas).
+    """
+    driver.get(url_tarea_cola(tarea))
+    return extraer_tarea_cola(driver, tarea, modo_extraccion)
+
+def url_tarea_cola(tarea):
+    return url_con_offset(tarea['categoria']['url'], tarea['offset'])
+
+def extraer_tarea_cola(driver, tarea, modo_extraccion='js'):
+    """Segunda mitad de ejecutar_tarea_cola, con la página de la tarea ya abierta (también en una pestaña, ver scraper_pestanas.py)."""
+    categoria = tarea['categoria']
+    esperar_rejilla(driver, 'carrefour', referencia=3)
+    productos_pagina = extraer_productos_pagina(driver, categoria, modo_extraccion)
+
+    subtareas = []
+    if tarea['offset'] == 0:
+        total_paginas = obtener_total_paginas(driver)
+        offsets = [pagina * 24 for pagina in range(1, total_paginas)]  # 24 productos por página
+        subtareas = [(url_con_offset(categoria['url'], offset), {'categoria': categoria, 'offset': offset}) for offset in offsets]
+    return productos_pagina, subtareas
+
 def aceptar_cookies(driver):
     """Acepta las cookies si aparece el diálogo."""
     try:
@@ -788,30 +922,65 @@ def aceptar_cookies(driver):
         WebDriverWait(driver, 5).until(
             EC.invisibility_of_element_located((By.ID, "onetrust-banner-sdk"))
         )
-        time.sleep(0.5)  # Pequeña espera adicional para asegurar que el diálogo se ha cerrado
+        esperar_dom_estable(driver, 'carrefour', referencia=0.5)
     except Exception as e:
         print("No se encontró el diálogo de cookies o ya fue aceptado")
         # No lanzamos la excepción ya que es normal que no aparezca el diálogo en algunas ocasiones
 
-def signal_handler(sig, frame):
-    print('\nCerrando el navegador gracefully...')
-    try:
-        if 'driver' in globals():
-            driver.quit()
-    except:
-        pass
-    sys.exit(0)
-
 def main():
     # Configurar el parser de argumentos
     parser = argparse.ArgumentParser(description='Scraper de Carrefour con opciones de testing')
     parser.add_argument('--categoria', type=str, help='Nombre de la categoría para empezar (para testing)')
     parser.add_argument('--pagina', type=int, help='Número de página para empezar dentro de la categoría (para testing)')
     parser.add_argument('--offset', type=int, help='Offset específico para empezar (para testing)')
+    parser.add_argument('--frontera', type=str, help='Base de datos SQLite de la frontera: permite reanudar una ejecución interrumpida')
+    parser.add_argument('--paralelo', type=int, default=0,
+                        help='Descargar las páginas de cada categoría a la vez, N peticiones simultáneas con la sesión del navegador (0 = siguiendo la paginación)')
+    parser.add_argument('--extraccion', choices=MODOS_EXTRACCION, default='js',
+                        help='js: un script por página; estado: sin scroll, con los datos embebidos en la página; dom: recorrer cada tarjeta con WebDriver')
+    parser.add_argument('--ligero', action='store_true', help='Navegador sin interfaz, ventana pequeña y sin imágenes, fuentes, vídeo ni analítica')
+    parser.add_argument('--grabar-html', help='Directorio donde guardar el HTML renderizado de cada página como fixture (ver scraper_replay.py)')
+    parser.add_argument('--traza', help='Archivo JSONL donde registrar la duración de cada fase (resumen con scraper_tracing.py)')
+    parser.add_argument('--pool', type=int, default=0, help='Navegadores de reserva ya preparados para sustituir al instante una sesión caída (0 = sin pool)')
+    parser.add_argument('--incremental', type=str, help='Base de datos SQLite de huellas: las categorías sin cambios reutilizan las filas de la última ejecución')
+    parser.add_argument('--log-nivel', choices=NIVELES, default='INFO', help='DEBUG añade el detalle de cada producto y los volcados de HTML')
+    parser.add_argument('--log-formato', choices=['texto', 'json'], default='texto')
+    parser.add_argument('--log-muestreo', type=int, default=1, help='En DEBUG, registrar solo uno de cada N productos')
+    parser.add_argument('--metricas-puerto', type=int, help='Exponer métricas de Prometheus en http://127.0.0.1:<puerto>/metrics')
+    parser.add_argument('--metricas-archivo', help='Archivo .prom con las métricas, reescrito cada --metricas-intervalo segundos')
+    parser.add_argument('--metricas-intervalo', type=int, default=15)
     args = parser.parse_args()
+    configurar_logging(args.log_nivel, args.log_formato, args.log_muestreo)
 
-    signal.signal(signal.SIGINT, signal_handler)
-    driver = iniciar_driver()
+    instalar_cierre(lambda: driver)
+    trazador.activar(args.traza)
+    metricas.activar(args.metricas_puerto, args.metricas_archivo, args.metricas_intervalo, sitio='carrefour')
+    global pool_sesiones, perfil_ligero
+    perfil_ligero = args.ligero
+    controlador_ritmo.configurar(**RITMO)
+    grabador_html.directorio = args.grabar_html
+    if args.pool > 0:
+        pool_sesiones = PoolSesiones(iniciar_driver, preparar_sesion, reservas=args.pool, nombre='carrefour')
+        driver = pool_sesiones.obtener()
+    else:
+        driver = iniciar_driver()
+    frontera = None
+    if args.frontera:
+        frontera = FronteraCrawl(args.frontera)
+        frontera.reanudar()
+        if args.categoria or args.pagina or args.offset:
+            print("Con --frontera se ignoran --categoria, --pagina y --offset: se reanuda lo pendiente")
+    huellas = None
+    if args.incremental:
+        if frontera:
+            print("Con --frontera se ignora --incremental")
+        else:
+            huellas = AlmacenHuellas(args.incremental)
+    if args.paralelo:
+        if frontera:
+            print("Con --frontera se ignora --paralelo")
+        elif args.pagina or args.offset:
+            print("Con --paralelo se ignoran --pagina y --offset: se descargan todas las páginas de cada categoría")
     
     try:
         # Navegar a la página principal de Carrefour
@@ -827,7 +996,7 @@ def main():
         
         # Si se especificó una categoría para testing, encontrarla en la lista
         categoria_inicio = 0
-        if args.categoria:
+        if args.categoria and not frontera:
             for i, cat in enumerate(categorias):
                 if args.categoria.lower() in cat['titulo'].lower():
                     categoria_inicio = i
@@ -843,21 +1012,40 @@ def main():
             print(f"\n=== Procesando categoría {num_categoria}/{len(categorias)}: {categoria['titulo']} ===")
             print(f"URL: {categoria['url']}")
             
+            if frontera:
+                if frontera.exportada(categoria['url']):
+                    print("Categoría ya exportada en una ejecución anterior, se omite")
+                    continue
+                try:
+                    with trazador.span('categoria', sitio='carrefour', categoria=categoria['titulo']) as span:
+                        productos, driver = obtener_datos_productos_frontera(driver, categoria, frontera, args.extraccion)
+                        span['productos'] = len(productos)
+                    todos_productos.extend(productos)
+                    if productos:
+                        frontera.iniciar_exportacion(categoria['url'], 'carrefour.csv')
+                        carrefour_csv(productos, 'carrefour.csv')
+                        print(f"Guardados {len(productos)} productos")
+                    frontera.marcar_exportada(categoria['url'])
+                except Exception as e:
+                    print(f"\n❌ Error procesando categoría {categoria['titulo']}: {e}")
+                    driver = reiniciar_driver(driver)
+                continue
+            
             try:
                 # Si se especificó una página de inicio y estamos en la categoría correcta
                 if args.pagina and num_categoria == categoria_inicio + 1:
                     offset = (args.pagina - 1) * 24  # 24 productos por página
-                    url_con_offset = f"{categoria['url']}?offset={offset}"
+                    url_inicio = url_con_offset(categoria['url'], offset)
                     print(f"Iniciando desde la página {args.pagina} (offset: {offset})")
-                    driver.get(url_con_offset)
+                    driver.get(url_inicio)
                 elif args.offset and num_categoria == categoria_inicio + 1:
-                    url_con_offset = f"{categoria['url']}?offset={args.offset}"
+                    url_inicio = url_con_offset(categoria['url'], args.offset)
                     print(f"Iniciando desde offset específico: {args.offset}")
-                    driver.get(url_con_offset)
+                    driver.get(url_inicio)
                 else:
                     driver.get(categoria['url'])
                 
-                time.sleep(3)
+                esperar_pagina(driver, 'carrefour', referencia=3)
                 
                 try:
                     aceptar_cookies(driver)
@@ -869,14 +1057,34 @@ def main():
                     print("Sesión inválida detectada - reiniciando driver")
                     driver = reiniciar_driver(driver)
                     driver.get(categoria['url'])
-                    time.sleep(3)
+                    esperar_pagina(driver, 'carrefour', referencia=3)
                     try:
                         aceptar_cookies(driver)
                     except:
                         pass
                 
-                print("\nIniciando procesamiento de productos...")
-                productos = obtener_datos_productos(driver, categoria)
+                productos = None
+                huella = None
+                primera_pagina = None
+                if huellas and 'offset=' not in driver.current_url:
+                    huella, primera_pagina = huella_categoria(driver, categoria, args.extraccion)
+                    if huellas.sin_cambios('carrefour', categoria['url'], huella):
+                        productos = huellas.filas_anteriores('carrefour', categoria['url'], 'fecha_extraccion')
+                        print(f"\nCategoría sin cambios desde la última ejecución: {len(productos)} filas arrastradas")
+                
+                if productos is None:
+                    print("\nIniciando procesamiento de productos...")
+                    with trazador.span('categoria', sitio='carrefour', categoria=categoria['titulo']) as span:
+                        if args.paralelo:
+                            productos, driver = obtener_datos_productos_paralelo(driver, categoria, args.paralelo, args.extraccion,
+                                                                                primera_pagina=primera_pagina)
+                        else:
+                            productos = obtener_datos_productos(driver, categoria, args.extraccion, primera_pagina=primera_pagina)
+                        span['productos'] = len(productos)
+                    if huellas:
+                        if huella and productos:
+                            huellas.guardar('carrefour', categoria['url'], huella, productos)
+                        marcar_rastreados(productos)
                 todos_productos.extend(productos)
                 
                 # Guardar datos parcialmente
@@ -895,7 +1103,7 @@ def main():
                 driver = reiniciar_driver(driver)
                 continue
             
-            time.sleep(2)
+            controlador_ritmo.esperar()
         
         print("\n=== RESUMEN FINAL ===")
         print(f"Total categorías procesadas: {len(categorias[categoria_inicio:])}")
@@ -911,6 +1119,21 @@ def main():
             print("Navegador cerrado exitosamente")
         except:
             print("Error al cerrar el navegador")
+        if frontera:
+            print(f"Estado de la frontera: {frontera.resumen()}")
+            frontera.cerrar()
+        if huellas:
+            huellas.resumen()
+            huellas.cerrar()
+        if pool_sesiones:
+            pool_sesiones.cerrar()
+            pool_sesiones.resumen()
+        trazador.cerrar()
+        medidor_trafico.resumen()
+        contador_esperas.resumen()
+        controlador_ritmo.resumen()
+        metricas.resumen()
+        metricas.cerrar()
         print("\n=== PROCESO COMPLETADO ===")
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from mercadona_parser import calcular_precio_unitario
+from scraper_async import MotorAsync, Peticion
+from scraper_common import guardar_csv
+from scraper_ritmo import ControladorRitmo, texto_bloqueado
+
+# Motor de rastreo sin navegador: lee el árbol de categorías y los productos
+# directamente de los endpoints JSON que usa la tienda online.
+URL_API = "https://tienda.mercadona.es/api"
+ALMACEN = "mad1"
+IDIOMA = "es"
+
+def mercadona_csv(datos, nombre_archivo="dia.csv"):
+    """Guarda los datos en un archivo CSV (mismo formato que Supermarket_Scraper)."""
+    guardar_csv(datos, nombre_archivo)
+
+def crear_sesion(tamano_pool=10, reintentos=3):
+    """Crea una sesión HTTP con conexiones keep-alive reutilizables y reintentos."""
+    sesion = requests.Session()
+    reintento = Retry(
+        total=reintentos,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"]
+    )
+    adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool, max_retries=reintento)
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    sesion.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+        'Accept': 'application/json'
+    })
+    return sesion
+
+def obtener_json(sesion, url, params=None, timeout=15, directorio_grabacion=None):
+    """Descarga un JSON. Si se indica un directorio, guarda la respuesta como fixture."""
+    respuesta = sesion.get(url, params=params, timeout=timeout)
+    respuesta.raise_for_status()
+    datos = respuesta.json()
+
+    if directorio_grabacion:
+        ruta = os.path.join(directorio_grabacion, requests.utils.urlparse(url).path.strip('/') + '.json')
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=1)
+    return datos
+
+def obtener_json_con_ritmo(sesion, url, params, ritmo, intentos=5, directorio_grabacion=None):
+    """
+    obtener_json con el ritmo de un ControladorRitmo: espera un hueco entre las
+    sesiones permitidas y la pausa, y cada respuesta (latencia, error o bloqueo)
+    ajusta el ritmo. Los errores se reintentan aquí, no en el adaptador HTTP.
+    """
+    for intento in range(intentos):
+        with ritmo.turno():
+            ritmo.esperar()
+            inicio = time.monotonic()
+            try:
+                datos = obtener_json(sesion, url, params, directorio_grabacion=directorio_grabacion)
+                ritmo.registrar(time.monotonic() - inicio)
+                return datos
+            except requests.HTTPError as e:
+                bloqueado = e.response.status_code == 403 or texto_bloqueado(e.response.text)
+                ritmo.registrar(time.monotonic() - inicio, error=not bloqueado, bloqueado=bloqueado)
+                if intento == intentos - 1:
+                    raise
+            except requests.RequestException:
+                ritmo.registrar(time.monotonic() - inicio, error=True)
+                if intento == intentos - 1:
+                    raise
+
+def formatear_cantidad(cantidad, formato):
+    """Formatea una cantidad como la web: 0.5 l -> '500 ml', 1.5 l -> '1,5 L'."""
+    formato = (formato or '').lower()
+    if formato == 'l' and cantidad < 1:
+        cantidad, unidad = cantidad * 1000, 'ml'
+    elif formato == 'kg' and cantidad < 1:
+        cantidad, unidad = cantidad * 1000, 'g'
+    elif formato == 'l':
+        unidad = 'L'
+    elif formato == 'ud':
+        unidad = 'ud.'
+    else:
+        unidad = formato
+    texto = f"{round(cantidad, 3):g}".replace('.', ',')
+    return f"{texto} {unidad}".strip()
+
+def formato_producto(producto):
+    """
+    Construye el texto de formato que muestra la rejilla de la web
+    ("Garrafa 5 L", "6 botellas x 1,5 L", "Bandeja 450 g aprox.").
+    """
+    instrucciones = producto.get('price_instructions') or {}
+    formato = instrucciones.get('size_format')
+    unit_size = instrucciones.get('unit_size')
+    if unit_size is None:
+        return "Formato no disponible"
+
+    if instrucciones.get('is_pack') and instrucciones.get('total_units') and instrucciones.get('pack_size'):
+        texto = f"{instrucciones['total_units']} {instrucciones.get('unit_name') or 'ud.'} x {formatear_cantidad(instrucciones['pack_size'], formato)}"
+    else:
+        texto = formatear_cantidad(unit_size, formato)
+        if producto.get('packaging'):
+            texto = f"{producto['packaging']} {texto}"
+
+    if instrucciones.get('approx_size'):
+        texto += " aprox."
+    if instrucciones.get('drained_weight'):
+        texto += f" ({formatear_cantidad(instrucciones['drained_weight'], 'kg')} escurrido)"
+    return texto
+
+def productos_de_categoria(detalle, nombre_categoria, fecha):
+    """Convierte el JSON de una categoría en filas con las columnas del scraper."""
+    productos = []
+    secciones = detalle.get('categories') or [detalle]
+    for seccion in secciones:
+        for producto in seccion.get('products', []):
+            instrucciones = producto.get('price_instructions') or {}
+            titulo = producto.get('display_name') or "Título no disponible"
+            formato = formato_producto(producto)
+            try:
+                precio = f"{float(instrucciones['unit_price']):.2f}"
+            except (KeyError, TypeError, ValueError):
+                precio = "Precio no disponible"
+
+            precio_unitario = None
+            if precio != "Precio no disponible" and formato != "Formato no disponible":
+                precio_unitario = calcular_precio_unitario(formato, precio)
+
+            productos.append({
+                'titulo': titulo,
+                'formato': formato,
+                'precio': precio,
+                'precio_unitario': f"{precio_unitario:.2f}" if precio_unitario is not None else "No disponible",
+                'categoria': nombre_categoria,
+                'fecha_extraccion': fecha
+            })
+    return productos
+
+def obtener_tareas(sesion, url_api=URL_API, almacen=ALMACEN, directorio_grabacion=None):
+    """Devuelve la lista de (id de subcategoría, nombre en formato 'Categoría - Subcategoría')."""
+    arbol = obtener_json(sesion, f"{url_api}/categories/", {'lang': IDIOMA, 'wh': almacen}, directorio_grabacion=directorio_grabacion)
+    return tareas_de_arbol(arbol)
+
+def tareas_de_arbol(arbol):
+    """Extrae las subcategorías del JSON del árbol de categorías."""
+    tareas = []
+    for categoria in arbol.get('results', []):
+        nombre_categoria = categoria['name'].replace(",", "")
+        for subcategoria in categoria.get('categories', []):
+            tareas.append((subcategoria['id'], f"{nombre_categoria} - {subcategoria['name']}"))
+    return tareas
+
+def explorar_categorias_api(url_api=URL_API, almacen=ALMACEN, workers=4, pausa=0.0, directorio_grabacion=None, nombre_archivo=None, ritmo=None):
+    """
+    Recorre todas las subcategorías a través de la API. Las peticiones se reparten
+    entre `workers` hilos que comparten el pool de conexiones de la sesión.
+    Con `ritmo` (ControladorRitmo) la pausa y los hilos activos se ajustan solos.
+    """
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    sesion = crear_sesion(tamano_pool=max(workers, 1), reintentos=0 if ritmo else 3)
+    inicio = time.monotonic()
+
+    tareas = obtener_tareas(sesion, url_api, almacen, directorio_grabacion)
+    print(f"Subcategorías encontradas: {len(tareas)}")
+
+    def procesar(tarea):
+        id_categoria, nombre = tarea
+        url = f"{url_api}/categories/{id_categoria}/"
+        if ritmo:
+            detalle = obtener_json_con_ritmo(sesion, url, {'lang': IDIOMA, 'wh': almacen}, ritmo,
+                                             directorio_grabacion=directorio_grabacion)
+            return productos_de_categoria(detalle, nombre, fecha)
+        if pausa:
+            time.sleep(pausa)
+        detalle = obtener_json(sesion, url, {'lang': IDIOMA, 'wh': almacen}, directorio_grabacion=directorio_grabacion)
+        return productos_de_categoria(detalle, nombre, fecha)
+
+    # Conservar el orden del menú en la salida
+    resultados = {}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futuros = {executor.submit(procesar, tarea): n for n, tarea in enumerate(tareas)}
+        for futuro in as_completed(futuros):
+            n = futuros[futuro]
+            try:
+                resultados[n] = futuro.result()
+                print(f"{tareas[n][1]}: {len(resultados[n])} productos")
+            except Exception as e:
+                print(f"Error obteniendo la categoría {tareas[n][1]}: {str(e)}")
+
+    productos = [producto for n in sorted(resultados) for producto in resultados[n]]
+    sesion.close()
+    print(f"Total productos: {len(productos)} en {time.monotonic() - inicio:.1f}s")
+    if ritmo:
+        ritmo.resumen()
+
+    if nombre_archivo:
+        mercadona_csv(productos, nombre_archivo)
+    return productos
+
+async def explorar_categorias_async(url_api=URL_API, almacen=ALMACEN, concurrencia=8, tasa=None, nombre_archivo=None):
+    """Recorre todas las subcategorías con el motor asíncrono común (scraper_async)."""
+    fecha = datetime.now().strftime('%Y-%m-%d')
+    params = {'lang': IDIOMA, 'wh': almacen}
+    inicio = time.monotonic()
+    resultados = {}
+
+    def procesar(detalle, contexto):
+        n, nombre = contexto
+        return [(n, producto) for producto in productos_de_categoria(detalle, nombre, fecha)]
+
+    async with MotorAsync(concurrencia_por_host=concurrencia, tasa_por_host=tasa) as motor:
+        arbol = await motor.obtener(Peticion(f"{url_api}/categories/", params))
+        tareas = tareas_de_arbol(arbol)
+        print(f"Subcategorías encontradas: {len(tareas)}")
+
+        peticiones = [Peticion(f"{url_api}/categories/{id_categoria}/", params, (n, nombre))
+                      for n, (id_categoria, nombre) in enumerate(tareas)]
+        # rastrear devuelve las respuestas según llegan: se agrupan por posición en el menú
+        async for n, producto in motor.rastrear(peticiones, procesar):
+            resultados.setdefault(n, []).append(producto)
+
+    # Conservar el orden del menú en la salida
+    productos = [producto for n in sorted(resultados) for producto in resultados[n]]
+    print(f"Total productos: {len(productos)} en {time.monotonic() - inicio:.1f}s ({motor.estadisticas})")
+    if nombre_archivo:
+        mercadona_csv(productos, nombre_archivo)
+    return productos
+
+def main():
+    parser = argparse.ArgumentParser(description='Rastreo de Mercadona sin navegador (API JSON)')
+    parser.add_argument('--url-api', default=URL_API, help='URL base de la API (p. ej. la del servidor de pruebas mock_server.py)')
+    parser.add_argument('--almacen', default=ALMACEN, help='Almacén (parámetro wh) que determina el surtido y los precios')
+    parser.add_argument('--motor', choices=['hilos', 'async'], default='hilos', help='hilos: requests con un pool de hilos; async: motor asíncrono común')
+    parser.add_argument('--workers', type=int, default=4, help='Peticiones de categoría en paralelo')
+    parser.add_argument('--tasa', type=float, help='Máximo de peticiones por segundo (solo motor async)')
+    parser.add_argument('--pausa', type=float, default=0.0, help='Pausa en segundos antes de cada petición de categoría')
+    parser.add_argument('--adaptativo', action='store_true', help='Ajustar la pausa y los hilos activos según la latencia, los errores y los bloqueos (motor hilos; --pausa es la pausa inicial)')
+    parser.add_argument('--grabar', help='Directorio donde guardar las respuestas JSON como fixtures')
+    parser.add_argument('--salida', help='CSV de salida (por defecto mercadona_<fecha>.csv)')
+    args = parser.parse_args()
+
+    fecha = datetime.now().date()
+    print(f"Iniciando escaneo a fecha: {datetime.now()}")
+    nombre_archivo = args.salida or f"mercadona_{fecha}.csv"
+    if args.motor == 'async':
+        productos = asyncio.run(explorar_categorias_async(args.url_api, args.almacen, args.workers, args.tasa, nombre_archivo))
+    else:
+        ritmo = None
+        if args.adaptativo:
+            ritmo = ControladorRitmo(pausa_inicial=args.pausa or 0.5, pausa_min=0.0, paso=0.02, sesiones_max=args.workers)
+        productos = explorar_categorias_api(
+            args.url_api, args.almacen, args.workers, args.pausa, args.grabar, nombre_archivo, ritmo
+        )
+    if not productos:
+        print("No se encontraron productos.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+from datetime import datetime
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from scraper_cantidades import calcular_precio_unitario
+
+# Selectores precompilados para el parseo en una sola pasada de la rejilla de productos.
+# Las comparaciones de clase replican las de BeautifulSoup en el parseo por celda:
+# una cadena con espacios se compara con el atributo completo, una sola palabra
+# con cualquiera de las clases del elemento.
+XPATH_CELDAS = etree.XPath(
+    '//div[contains(concat(" ", normalize-space(@class), " "), " product-cell ")'
+    ' and @data-testid="product-cell"]'
+)
+XPATH_TITULO = etree.XPath(
+    './/h4[@class="subhead1-r product-cell__description-name" and @data-testid="product-cell-name"]'
+)
+XPATH_FORMATO = etree.XPath('.//div[@class="product-format product-format__size--cell"]')
+XPATH_FORMATO_SPANS = etree.XPath(
+    './/span[contains(concat(" ", normalize-space(@class), " "), " footnote1-r ")]'
+)
+XPATH_PRECIO = etree.XPath(
+    './/p[@class="product-price__unit-price subhead1-b" and @data-testid="product-price"]'
+)
+XPATH_PRECIO_DESCUENTO = etree.XPath(
+    './/p[@class="product-price__unit-price subhead1-b product-price__unit-price--discount"'
+    ' and @data-testid="product-price"]'
+)
+
+# Devuelve el HTML de todas las celdas de producto en una sola llamada a WebDriver
+JS_HTML_REJILLA = """
+return Array.from(
+    document.querySelectorAll('div.product-cell[data-testid="product-cell"]'),
+    el => el.outerHTML
+).join('');
+"""
+
+def construir_producto(titulo, formato, precio, categoria, fecha):
+    """Calcula el precio unitario y devuelve el registro del producto."""
+    precio_unitario = None
+    if precio != "Precio no disponible" and formato != "Formato no disponible":
+        precio_unitario = calcular_precio_unitario(formato, precio)
+
+    return {
+        'titulo': titulo,
+        'formato': formato,
+        'precio': precio,
+        'precio_unitario': f"{precio_unitario:.2f}" if precio_unitario is not None else "No disponible",
+        'categoria': categoria,
+        'fecha_extraccion': fecha
+    }
+
+def limpiar_precio(texto):
+    """Convierte '1.234,56 €' en '1234.56'."""
+    return texto.replace(".", "").replace(",", ".").replace("€", "").strip()
+
+def parsear_celda_bs4(html_content, categoria, fecha=None):
+    """Parsea el innerHTML de una sola celda de producto con BeautifulSoup."""
+    fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Obtener el título
+    h4_element = soup.find('h4', class_="subhead1-r product-cell__description-name", attrs={"data-testid": "product-cell-name"})
+    titulo = h4_element.text if h4_element else "Título no disponible"
+
+    # Obtener la descripción detallada (cantidad/peso)
+    formato_element = soup.find('div', class_="product-format product-format__size--cell")
+    if formato_element:
+        span_elements = formato_element.find_all('span', class_="footnote1-r")
+        formato = " ".join(span.text.strip() for span in span_elements) if span_elements else "Formato no disponible"
+    else:
+        formato = "Formato no disponible"
+
+    # Obtener el precio
+    p_element = soup.find('p', class_="product-price__unit-price subhead1-b", attrs={"data-testid": "product-price"})
+    if p_element is None:
+        p_element = soup.find('p', class_="product-price__unit-price subhead1-b product-price__unit-price--discount", attrs={"data-testid": "product-price"})
+
+    precio = limpiar_precio(p_element.text) if p_element is not None else "Precio no disponible"
+
+    return construir_producto(titulo, formato, precio, categoria, fecha)
+
+def campo_titulo(celda):
+    h4_elements = XPATH_TITULO(celda)
+    return h4_elements[0].text_content() if h4_elements else "Título no disponible"
+
+def campo_formato(celda):
+    formato_elements = XPATH_FORMATO(celda)
+    if not formato_elements:
+        return "Formato no disponible"
+    span_elements = XPATH_FORMATO_SPANS(formato_elements[0])
+    return " ".join(span.text_content().strip() for span in span_elements) if span_elements else "Formato no disponible"
+
+def campo_precio(celda):
+    p_elements = XPATH_PRECIO(celda) or XPATH_PRECIO_DESCUENTO(celda)
+    return limpiar_precio(p_elements[0].text_content()) if p_elements else "Precio no disponible"
+
+# Extractor de cada campo de la celda (el benchmark los mide por separado)
+CAMPOS_CELDA = {
+    'titulo': campo_titulo,
+    'formato': campo_formato,
+    'precio': campo_precio
+}
+
+def nodos_celdas(html):
+    """Celdas de producto del HTML de la rejilla o de la página completa."""
+    if not html:
+        return []
+    return XPATH_CELDAS(lxml.html.fromstring(f"<div>{html}</div>"))
+
+def parsear_productos_html(html, categoria, fecha=None):
+    """
+    Parsea de una sola vez el HTML de la rejilla (o de la página completa)
+    y devuelve los mismos registros que el parseo celda a celda.
+    """
+    fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+    return [
+        construir_producto(campo_titulo(celda), campo_formato(celda), campo_precio(celda), categoria, fecha)
+        for celda in nodos_celdas(html)
+    ]
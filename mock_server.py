@@ -0,0 +1,144 @@
+import os
+import time
+import json
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Servidor HTTP local que sirve respuestas grabadas (fixtures) para probar los
+# motores de rastreo sin tocar las webs reales. La ruta de la petición se traduce
+# a un archivo: /api/categories/112/ -> <directorio>/api/categories/112.json
+# Las rutas que terminan en .html sirven la página grabada tal cual (la query se
+# ignora): /carrefour/leche_y_bebidas_vegetales.html?offset=24 con --directorio fixtures/html
+#
+# Para probar el control de ritmo (scraper_ritmo.py) puede simular una web con
+# problemas: errores 503 aleatorios, sobrecarga por encima de `capacidad`
+# peticiones simultáneas (la latencia crece y las que sobran reciben un 503) y
+# un antibot que bloquea con una página de captcha (403) durante `castigo`
+# segundos cuando se superan `tasa_maxima` peticiones por segundo.
+
+PAGINA_BLOQUEO = "<html><head><title>Access Denied</title></head><body>Pardon our interruption. Please complete the captcha.</body></html>"
+
+class ManejadorFixtures(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Permite conexiones keep-alive
+    directorio = "fixtures"
+    latencia = 0.0  # Segundos de espera antes de cada respuesta
+    errores = 0.0  # Probabilidad de responder 503
+    capacidad = 0  # Peticiones simultáneas sin degradarse (0 = sin límite)
+    tasa_maxima = 0.0  # Peticiones por segundo que disparan el bloqueo (0 = sin antibot)
+    castigo = 5.0  # Segundos que dura un bloqueo
+    estado = None  # Estado compartido por todas las peticiones de un servidor (ver iniciar_servidor)
+
+    def ruta_fixture(self):
+        ruta = urlparse(self.path).path.strip('/')
+        if ruta.endswith('.html'):
+            return os.path.join(self.directorio, ruta)
+        return os.path.join(self.directorio, ruta + '.json')
+
+    def enviar(self, codigo, cuerpo, tipo='application/json'):
+        datos = cuerpo.encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', f'{tipo}; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        estado = self.estado
+        with estado['lock']:
+            ahora = time.monotonic()
+            estado['en_curso'] += 1
+            en_curso = estado['en_curso']
+            recientes = estado['recientes']
+            recientes.append(ahora)
+            while recientes and recientes[0] < ahora - 1:
+                recientes.popleft()
+            if self.tasa_maxima and len(recientes) > self.tasa_maxima and estado['bloqueado_hasta'] < ahora:
+                estado['bloqueado_hasta'] = ahora + self.castigo
+                estado['bloqueos'] += 1
+            bloqueado = estado['bloqueado_hasta'] > ahora
+        try:
+            self.responder(en_curso, bloqueado)
+        finally:
+            with estado['lock']:
+                estado['en_curso'] -= 1
+
+    def responder(self, en_curso, bloqueado):
+        sobrecarga = self.capacidad and en_curso > self.capacidad
+        latencia = self.latencia * (en_curso / self.capacidad if sobrecarga else 1)
+        if latencia:
+            time.sleep(latencia)
+        if bloqueado:
+            self.contar(403)
+            self.enviar(403, PAGINA_BLOQUEO, 'text/html')
+            return
+        if (sobrecarga and en_curso > 2 * self.capacidad) or (self.errores and random.random() < self.errores):
+            self.contar(503)
+            self.enviar(503, json.dumps({'error': 'Servicio no disponible'}))
+            return
+        ruta = self.ruta_fixture()
+        if not os.path.isfile(ruta):
+            self.contar(404)
+            self.enviar(404, json.dumps({'error': f'No existe el fixture {ruta}'}))
+            return
+        with open(ruta, encoding='utf-8') as f:
+            self.contar(200)
+            self.enviar(200, f.read(), 'text/html' if ruta.endswith('.html') else 'application/json')
+
+    def contar(self, codigo):
+        with self.estado['lock']:
+            self.estado['respuestas'][codigo] = self.estado['respuestas'].get(codigo, 0) + 1
+
+    def log_message(self, formato, *args):
+        pass
+
+def nuevo_estado():
+    return {'lock': threading.Lock(), 'en_curso': 0, 'recientes': deque(), 'bloqueado_hasta': 0.0,
+            'bloqueos': 0, 'respuestas': {}}
+
+def estadisticas(servidor):
+    """Respuestas enviadas por código HTTP y número de bloqueos del antibot."""
+    estado = servidor.RequestHandlerClass.estado
+    with estado['lock']:
+        return {'respuestas': dict(estado['respuestas']), 'bloqueos': estado['bloqueos']}
+
+def iniciar_servidor(directorio, puerto=0, manejador=ManejadorFixtures, latencia=0.0, errores=0.0,
+                     capacidad=0, tasa_maxima=0.0, castigo=5.0):
+    """
+    Arranca el servidor en un hilo y devuelve (servidor, url_base).
+    Con puerto 0 el sistema elige un puerto libre.
+    """
+    clase = type('Manejador', (manejador,), {
+        'directorio': directorio, 'latencia': latencia, 'errores': errores, 'capacidad': capacidad,
+        'tasa_maxima': tasa_maxima, 'castigo': castigo, 'estado': nuevo_estado()
+    })
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), clase)
+    servidor.daemon_threads = True
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local de fixtures para los scrapers')
+    parser.add_argument('--directorio', default=os.path.join('fixtures', 'mercadona_api'))
+    parser.add_argument('--puerto', type=int, default=8000)
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help='Latencia añadida a cada respuesta')
+    parser.add_argument('--errores', type=float, default=0.0, help='Probabilidad de responder 503')
+    parser.add_argument('--capacidad', type=int, default=0, help='Peticiones simultáneas antes de degradarse (0 = sin límite)')
+    parser.add_argument('--tasa-maxima', type=float, default=0.0, help='Peticiones por segundo que disparan el bloqueo antibot (0 = sin antibot)')
+    parser.add_argument('--castigo', type=float, default=5.0, help='Segundos que dura cada bloqueo')
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(args.directorio, args.puerto, latencia=args.latencia_ms / 1000, errores=args.errores,
+                                     capacidad=args.capacidad, tasa_maxima=args.tasa_maxima, castigo=args.castigo)
+    print(f"Sirviendo {args.directorio} en {url} (Ctrl+C para parar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+if __name__ == "__main__":
+    main()
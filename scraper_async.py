@@ -0,0 +1,155 @@
+import time
+import random
+import asyncio
+from urllib.parse import urlparse
+import aiohttp
+
+# Núcleo de descarga asíncrono común a los supermercados. Cada supermercado
+# aporta la lista de peticiones y una función que convierte la respuesta en
+# registros; el motor se encarga de la concurrencia por host, del límite de
+# peticiones por segundo, de reutilizar conexiones y de los reintentos.
+
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+class ErrorReintentable(Exception):
+    """Respuesta que merece un nuevo intento (429, 5xx...); `status` es el código HTTP."""
+
+    def __init__(self, mensaje, status=None):
+        super().__init__(mensaje)
+        self.status = status
+
+class Peticion:
+    """Una URL a descargar y el contexto que necesita el parser para interpretarla."""
+
+    def __init__(self, url, params=None, contexto=None):
+        self.url = url
+        self.params = params
+        self.contexto = contexto
+
+    def host(self):
+        return urlparse(self.url).netloc
+
+class TokenBucket:
+    """Limita las peticiones por segundo permitiendo ráfagas de hasta `capacidad`."""
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = tasa
+        self.capacidad = capacidad or max(1, tasa)
+        self.tokens = self.capacidad
+        self.ultimo = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def adquirir(self):
+        async with self.lock:
+            while True:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.tasa)
+
+class MotorAsync:
+    """
+    Cliente HTTP asíncrono con concurrencia limitada por host, token bucket
+    opcional por host y reintentos con backoff exponencial con jitter.
+
+    Uso:
+        async with MotorAsync(concurrencia_por_host=8) as motor:
+            async for registro in motor.rastrear(peticiones, parser):
+                ...
+    """
+
+    def __init__(self, concurrencia_por_host=4, tasa_por_host=None, reintentos=3,
+                 backoff_base=0.5, backoff_max=10.0, timeout=15, cabeceras=None):
+        self.concurrencia_por_host = concurrencia_por_host
+        self.tasa_por_host = tasa_por_host
+        self.reintentos = reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.cabeceras = cabeceras or {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+            'Accept': 'application/json'
+        }
+        self.semaforos = {}
+        self.buckets = {}
+        self.sesion = None
+        self.estadisticas = {'peticiones': 0, 'reintentos': 0, 'errores': 0}
+
+    async def __aenter__(self):
+        # Un único conector: las conexiones keep-alive se reutilizan entre peticiones
+        conector = aiohttp.TCPConnector(limit=0, limit_per_host=self.concurrencia_por_host, keepalive_timeout=30)
+        self.sesion = aiohttp.ClientSession(connector=conector, timeout=self.timeout, headers=self.cabeceras)
+        return self
+
+    async def __aexit__(self, *args):
+        await self.sesion.close()
+
+    def semaforo(self, host):
+        if host not in self.semaforos:
+            self.semaforos[host] = asyncio.Semaphore(self.concurrencia_por_host)
+        return self.semaforos[host]
+
+    def bucket(self, host):
+        if not self.tasa_por_host:
+            return None
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.tasa_por_host)
+        return self.buckets[host]
+
+    def espera_backoff(self, intento):
+        """Backoff exponencial con 'full jitter': uniforme entre 0 y base * 2^intento."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** intento)))
+
+    async def obtener(self, peticion):
+        """Descarga una petición y devuelve el JSON (o el texto si no es JSON)."""
+        host = peticion.host()
+        for intento in range(self.reintentos + 1):
+            bucket = self.bucket(host)
+            if bucket:
+                await bucket.adquirir()
+            try:
+                async with self.semaforo(host):
+                    self.estadisticas['peticiones'] += 1
+                    async with self.sesion.get(peticion.url, params=peticion.params) as respuesta:
+                        if respuesta.status in ESTADOS_REINTENTABLES:
+                            raise ErrorReintentable(f"HTTP {respuesta.status} en {peticion.url}", respuesta.status)
+                        respuesta.raise_for_status()
+                        if 'json' in respuesta.headers.get('Content-Type', ''):
+                            return await respuesta.json()
+                        return await respuesta.text()
+            except (ErrorReintentable, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                if intento == self.reintentos:
+                    self.estadisticas['errores'] += 1
+                    raise
+                self.estadisticas['reintentos'] += 1
+                espera = self.espera_backoff(intento)
+                print(f"Reintentando {peticion.url} en {espera:.2f}s ({e.__class__.__name__}: {e})")
+                await asyncio.sleep(espera)
+
+    async def rastrear(self, peticiones, parser):
+        """
+        Generador asíncrono: descarga todas las peticiones respetando los límites
+        y va devolviendo los registros de cada respuesta según llegan.
+
+        `parser(datos, contexto)` devuelve una lista de registros.
+        """
+        async def procesar(peticion):
+            datos = await self.obtener(peticion)
+            return parser(datos, peticion.contexto)
+
+        tareas = [asyncio.ensure_future(procesar(peticion)) for peticion in peticiones]
+        try:
+            for completada in asyncio.as_completed(tareas):
+                try:
+                    registros = await completada
+                except Exception as e:
+                    print(f"Error en la petición: {e.__class__.__name__}: {e}")
+                    continue
+                for registro in registros:
+                    yield registro
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
@@ -0,0 +1,174 @@
+import re
+import functools
+from typing import NamedTuple, Optional
+
+# Parseo de cantidades y formatos de envase ("2 botellas x 2 L", "Garrafa 5 L",
+# "6x125 g", "Paquete 6 ud. (300 g)", "Tarro 345 g (220 g escurrido)") común a
+# los scrapers y al ETL. Los patrones se compilan una sola vez al importar y el
+# resultado de cada formato se memoriza: en los CSV de Mercadona hay unos pocos
+# miles de formatos distintos para decenas de miles de filas.
+#
+# Las cantidades se devuelven en una unidad base: kg, l, m o ud.
+
+# unidad -> (unidad base, factor)
+UNIDADES = {
+    'kg': ('kg', 1.0), 'kilo': ('kg', 1.0), 'kilos': ('kg', 1.0),
+    'g': ('kg', 0.001), 'gr': ('kg', 0.001), 'grs': ('kg', 0.001), 'gramos': ('kg', 0.001),
+    'mg': ('kg', 0.000001),
+    'l': ('l', 1.0), 'litro': ('l', 1.0), 'litros': ('l', 1.0),
+    'cl': ('l', 0.01), 'ml': ('l', 0.001), 'cc': ('l', 0.001),
+    'm': ('m', 1.0), 'metro': ('m', 1.0), 'metros': ('m', 1.0), 'cm': ('m', 0.01),
+    'ud': ('ud', 1.0), 'uds': ('ud', 1.0), 'u': ('ud', 1.0), 'unidad': ('ud', 1.0), 'unidades': ('ud', 1.0),
+}
+
+# Alternativas de más larga a más corta para que "kg" no se lea como "g" ni "ml" como "m"
+_ALTERNATIVAS = '|'.join(sorted(map(re.escape, UNIDADES), key=len, reverse=True))
+_NUMERO = r'\d+(?:[.,]\d+)?'
+# Cantidad de un formato, también una fracción ("1/2 kg", "½ pieza"); nunca
+# desde la mitad de otro número ("18/70", "5.1")
+FRACCIONES = {'½': 0.5, '¼': 0.25, '¾': 0.75, '⅓': 1 / 3, '⅔': 2 / 3}
+_FRACCION = rf'[1-9]\s*/\s*[2-9](?!\d)|[{"".join(FRACCIONES)}]'
+_CANTIDAD = rf'(?<![\d/.,])(?:{_FRACCION}|{_NUMERO})'
+_MEDIDA = rf'(?P<numero>{_CANTIDAD})\s*(?P<unidad>{_ALTERNATIVAS})\.?(?![^\W\d_])'
+
+# Una medida suelta: "500 g", "1,5 L", "12 ud."
+PATRON_MEDIDA = re.compile(_MEDIDA, re.IGNORECASE)
+# Envase múltiple: "6 botellas x 1,5 L", "6x125 g", "2 mini bricks x 200 ml", "3 ud. x 100 g"
+PATRON_PACK = re.compile(rf'(?<![\d/.,])(?P<pack>\d+)\s*(?:[^\W\d_]+\.?\s+){{0,3}}?[x×]\s*{_MEDIDA}', re.IGNORECASE)
+# Número de piezas con el total entre paréntesis: "Paquete 6 ud. (300 g)", "Caja 20 cápsulas (120 g)"
+PATRON_TOTAL = re.compile(rf'(?<![\d/.,])(?P<pack>\d+)\s*[^\W\d_]+\.?\s*\(\s*{_MEDIDA}\s*\)', re.IGNORECASE)
+# Medidas que no cuentan: peso escurrido
+PATRON_ESCURRIDO = re.compile(r'\s*escurrido', re.IGNORECASE)
+# Sin medida reconocible, un número de piezas: "Paquete 10 rollos", "Caja 20 bolsitas", "1/2 pieza"
+PATRON_PIEZAS = re.compile(rf'(?<![\d/.,])(?P<pack>{_FRACCION}|\d+(?![.,]?\d))\s*[^\W\d_]{{2,}}')
+
+class Cantidad(NamedTuple):
+    """Cantidad de cada pieza en la unidad base y número de piezas del envase."""
+    cantidad: float
+    unidad: str
+    unidades: int = 1
+
+    @property
+    def total(self):
+        return round(self.cantidad * self.unidades, 9)
+
+def _cantidad(texto):
+    """Valor de una coincidencia de _CANTIDAD: '1,5' -> 1.5, '1/2' -> 0.5, '¾' -> 0.75."""
+    if texto in FRACCIONES:
+        return FRACCIONES[texto]
+    if '/' in texto:
+        numerador, denominador = texto.split('/')
+        return int(numerador) / int(denominador)
+    return float(texto.replace(',', '.'))
+
+def _medida(coincidencia):
+    """(cantidad en la unidad base, unidad base) de una coincidencia de _MEDIDA."""
+    unidad, factor = UNIDADES[coincidencia.group('unidad').lower()]
+    return round(_cantidad(coincidencia.group('numero')) * factor, 9), unidad
+
+@functools.lru_cache(maxsize=65536)
+def parsear_formato(formato: str) -> Optional[Cantidad]:
+    """
+    Interpreta un formato de envase. Devuelve None si no contiene ninguna
+    cantidad reconocible.
+
+    >>> parsear_formato("6 botellas x 1,5 L")
+    Cantidad(cantidad=1.5, unidad='l', unidades=6)
+    >>> parsear_formato("Paquete 6 ud. (300 g)").total
+    0.3
+    >>> parsear_formato("1/2 pieza")
+    Cantidad(cantidad=0.5, unidad='ud', unidades=1)
+    """
+    if not formato or not isinstance(formato, str):
+        return None
+
+    pack = PATRON_PACK.search(formato)
+    if pack:
+        cantidad, unidad = _medida(pack)
+        return Cantidad(cantidad, unidad, int(pack.group('pack')) or 1)
+
+    total = PATRON_TOTAL.search(formato)
+    if total:
+        cantidad, unidad = _medida(total)
+        piezas = int(total.group('pack')) or 1
+        if unidad != 'ud':
+            return Cantidad(round(cantidad / piezas, 9), unidad, piezas)
+
+    # Medida principal: la primera que no sea peso escurrido (salvo que no haya otra), y mejor física que en unidades
+    medidas = list(PATRON_MEDIDA.finditer(formato))
+    medidas = [m for m in medidas if not PATRON_ESCURRIDO.match(formato, m.end())] or medidas
+    if not medidas:
+        piezas = PATRON_PIEZAS.search(formato)
+        return Cantidad(round(_cantidad(piezas.group('pack')), 9), 'ud') if piezas else None
+    principal = next((m for m in medidas if UNIDADES[m.group('unidad').lower()][0] != 'ud'), medidas[0])
+    cantidad, unidad = _medida(principal)
+    return Cantidad(cantidad, unidad)
+
+def parsear_formatos(formatos):
+    """Versión por lotes de parsear_formato: acepta una lista, un iterable o una Series de pandas."""
+    if hasattr(formatos, 'map') and hasattr(formatos, 'index'):
+        import pandas as pd
+        resultados = [parsear_formato(valor) if isinstance(valor, str) else None for valor in formatos]
+        return pd.DataFrame({
+            'cantidad': [r.cantidad if r else None for r in resultados],
+            'unidad': [r.unidad if r else None for r in resultados],
+            'unidades': [r.unidades if r else None for r in resultados],
+            'total': [r.total if r else None for r in resultados],
+        }, index=formatos.index)
+    return [parsear_formato(valor) if isinstance(valor, str) else None for valor in formatos]
+
+def limpiar_precio(precio):
+    """'1,95 €' o '1.95' -> 1.95 (None si no es un número)."""
+    if isinstance(precio, (int, float)):
+        return float(precio)
+    try:
+        return float(str(precio).replace('€', '').replace(',', '.').strip())
+    except ValueError:
+        return None
+
+def calcular_precio_unitario(formato, precio):
+    """
+    Precio por litro o por kilogramo a partir del formato del producto
+    (ej: "2 botellas x 2 L", "5 L", "400 g"). None si el formato no tiene
+    volumen ni peso o el precio no es un número.
+    """
+    cantidad = parsear_formato(formato)
+    precio = limpiar_precio(precio)
+    if cantidad is None or precio is None or cantidad.unidad not in ('kg', 'l') or not cantidad.total:
+        return None
+    return precio / cantidad.total
+
+# Precio por unidad tal como lo muestran las webs: "3,55 €/kg", "0,79 € por 100ml", "1,20 € Unidad"
+PATRON_PRECIO_UNIDAD = re.compile(
+    rf'(?P<precio>{_NUMERO})\s*€?\s*(?:/|por)?\s*(?P<cantidad>\d+)?\s*(?P<unidad>{_ALTERNATIVAS}|kilogramo|gramo)\b',
+    re.IGNORECASE
+)
+
+@functools.lru_cache(maxsize=65536)
+def parsear_precio_unidad(texto: str):
+    """
+    '0,79 € por 100ml' -> (7.9, 'l'): precio por unidad base (kg, l, m o ud).
+    Un número sin unidad se devuelve tal cual, con unidad None. None si no se entiende.
+    """
+    if not texto or not isinstance(texto, str):
+        return None
+    texto = texto.replace('.', '').replace(',', '.') if ',' in texto else texto
+    coincidencia = PATRON_PRECIO_UNIDAD.search(texto)
+    if coincidencia is None:
+        precio = limpiar_precio(texto)
+        return (precio, None) if precio is not None else None
+    nombre = coincidencia.group('unidad').lower()
+    nombre = {'kilogramo': 'kg', 'gramo': 'g'}.get(nombre, nombre)
+    unidad, factor = UNIDADES[nombre]
+    cantidad = float(coincidencia.group('cantidad') or 1) * factor
+    return float(coincidencia.group('precio')) / cantidad, unidad
+
+def parsear_precios_unidad(textos):
+    """Versión por lotes de parsear_precio_unidad (lista o Series; con una Series devuelve una Series de precios)."""
+    resultados = [parsear_precio_unidad(valor) if isinstance(valor, str)
+                  else (float(valor), None) if isinstance(valor, (int, float)) and valor == valor else None
+                  for valor in textos]
+    if hasattr(textos, 'map') and hasattr(textos, 'index'):
+        import pandas as pd
+        return pd.Series([r[0] if r else None for r in resultados], index=textos.index, dtype='float64')
+    return resultados
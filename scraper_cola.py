@@ -0,0 +1,549 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import importlib
+import threading
+from datetime import datetime
+from scraper_sinks import SumideroCSV
+from scraper_ritmo import controlador_ritmo
+from scraper_waits import es_error_de_sesion
+from scraper_tracing import trazador
+from scraper_pestanas import PestanasNavegador, ErrorCargaPestana
+from scraper_common import preparar_pestana
+
+# Cola de trabajo duradera en SQLite para repartir un rastreo entre varios
+# procesos (o varias máquinas que compartan el archivo). Cada tarea es una
+# categoría, subcategoría o página; un worker la "arrienda" durante un tiempo,
+# renueva el arriendo con latidos mientras trabaja y al terminar devuelve los
+# productos, que se guardan en la propia cola. Si un worker muere, su arriendo
+# caduca y la tarea vuelve a estar disponible para otro.
+#
+# Procesando una tarea se pueden encolar tareas nuevas (por ejemplo, las páginas
+# de una categoría de Carrefour o las subcategorías de una de Alcampo).
+#
+# Uso:
+#   python scraper_cola.py sembrar carrefour --cola cola.db
+#   python scraper_cola.py trabajar carrefour --cola cola.db      (en cada proceso/máquina)
+#   python scraper_cola.py estado --cola cola.db
+#   python scraper_cola.py exportar carrefour --cola cola.db --salida carrefour.csv
+
+# Módulo de cada supermercado: define iniciar_driver, preparar_sesion,
+# tareas_cola(driver) y ejecutar_tarea_cola(driver, datos) -> (productos, subtareas).
+# Para trabajar con varias pestañas (scraper_pestanas.py) define además
+# url_tarea_cola(datos) y extraer_tarea_cola(driver, datos) -> (productos, subtareas).
+MODULOS = {
+    'mercadona': 'Supermarket_Scraper',
+    'carrefour': 'carrefour_scraper',
+    'alcampo': 'alcampo_scraper'
+}
+
+PENDIENTE = 'pendiente'
+EN_CURSO = 'en_curso'
+HECHA = 'hecha'
+FALLIDA = 'fallida'
+
+def id_worker():
+    """Identificador de este proceso: máquina y PID."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class ColaTrabajo:
+    """
+    Tabla de tareas con arriendos. `en_red=True` usa el journal clásico de
+    SQLite en lugar de WAL, que no funciona sobre sistemas de archivos en red.
+    """
+
+    def __init__(self, ruta='cola.db', en_red=False, timeout=60):
+        self.ruta = ruta
+        self.en_red = en_red
+        self.conexion = sqlite3.connect(ruta, timeout=timeout, isolation_level=None)
+        self.conexion.execute(f"PRAGMA journal_mode={'DELETE' if en_red else 'WAL'}")
+        self.conexion.execute("""
+            CREATE TABLE IF NOT EXISTS tareas (
+                id INTEGER PRIMARY KEY,
+                supermercado TEXT,
+                clave TEXT,
+                datos TEXT,
+                estado TEXT DEFAULT 'pendiente',
+                intentos INTEGER DEFAULT 0,
+                max_intentos INTEGER DEFAULT 3,
+                worker TEXT,
+                arriendo_hasta REAL,
+                error TEXT,
+                productos INTEGER,
+                actualizada TEXT,
+                UNIQUE (supermercado, clave)
+            )
+        """)
+        self.conexion.execute("CREATE INDEX IF NOT EXISTS tareas_estado ON tareas (supermercado, estado, arriendo_hasta)")
+        self.conexion.execute("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                tarea INTEGER PRIMARY KEY,
+                filas TEXT
+            )
+        """)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def transaccion(self):
+        """BEGIN IMMEDIATE: toma el bloqueo de escritura antes de leer, para que dos workers no arrienden la misma tarea."""
+        self.conexion.execute("BEGIN IMMEDIATE")
+
+    def encolar(self, supermercado, tareas, max_intentos=3):
+        """Añade tareas [(clave, datos)]; las claves ya encoladas se ignoran. Devuelve cuántas se añadieron."""
+        ahora = datetime.now().isoformat(timespec='seconds')
+        self.transaccion()
+        try:
+            antes = self.conexion.total_changes
+            self.conexion.executemany(
+                "INSERT OR IGNORE INTO tareas (supermercado, clave, datos, max_intentos, actualizada) VALUES (?, ?, ?, ?, ?)",
+                [(supermercado, clave, json.dumps(datos, ensure_ascii=False), max_intentos, ahora) for clave, datos in tareas]
+            )
+            nuevas = self.conexion.total_changes - antes
+            self.conexion.execute("COMMIT")
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            raise
+        return nuevas
+
+    def arrendar(self, supermercado, worker, segundos=300):
+        """
+        Toma la siguiente tarea pendiente (o con el arriendo caducado) y la
+        marca como en curso para `worker` durante `segundos`. Devuelve
+        {'id', 'clave', 'datos', 'intentos'} o None si no hay ninguna disponible.
+        Las tareas caducadas que ya agotaron sus intentos pasan a 'fallida'.
+        """
+        ahora = time.time()
+        self.transaccion()
+        try:
+            self.conexion.execute("""
+                UPDATE tareas SET estado = 'fallida', error = 'arriendo caducado tras el último intento', worker = NULL
+                WHERE supermercado = ? AND estado = 'en_curso' AND arriendo_hasta < ? AND intentos >= max_intentos
+            """, (supermercado, ahora))
+            fila = self.conexion.execute("""
+                SELECT id, clave, datos, intentos FROM tareas
+                WHERE supermercado = ? AND (estado = 'pendiente' OR (estado = 'en_curso' AND arriendo_hasta < ?))
+                ORDER BY intentos, id LIMIT 1
+            """, (supermercado, ahora)).fetchone()
+            if fila is None:
+                self.conexion.execute("COMMIT")
+                return None
+            self.conexion.execute("""
+                UPDATE tareas SET estado = 'en_curso', worker = ?, arriendo_hasta = ?, intentos = intentos + 1, actualizada = ?
+                WHERE id = ?
+            """, (worker, ahora + segundos, datetime.now().isoformat(timespec='seconds'), fila[0]))
+            self.conexion.execute("COMMIT")
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            raise
+        return {'id': fila[0], 'clave': fila[1], 'datos': json.loads(fila[2]), 'intentos': fila[3] + 1}
+
+    def latido(self, id_tarea, worker, segundos=300):
+        """Renueva el arriendo. Devuelve False si la tarea ya no es de este worker."""
+        cursor = self.conexion.execute(
+            "UPDATE tareas SET arriendo_hasta = ? WHERE id = ? AND worker = ? AND estado = 'en_curso'",
+            (time.time() + segundos, id_tarea, worker)
+        )
+        return cursor.rowcount == 1
+
+    def completar(self, supermercado, id_tarea, worker, productos, subtareas=()):
+        """
+        Guarda los productos de la tarea y encola sus subtareas en una sola
+        transacción. Si el arriendo se perdió (otro worker tomó la tarea), no se
+        guarda nada y devuelve False.
+        """
+        ahora = datetime.now().isoformat(timespec='seconds')
+        self.transaccion()
+        try:
+            cursor = self.conexion.execute("""
+                UPDATE tareas SET estado = 'hecha', worker = NULL, arriendo_hasta = NULL, error = NULL, productos = ?, actualizada = ?
+                WHERE id = ? AND worker = ? AND estado = 'en_curso'
+            """, (len(productos), ahora, id_tarea, worker))
+            if cursor.rowcount != 1:
+                self.conexion.execute("ROLLBACK")
+                return False
+            self.conexion.execute("INSERT OR REPLACE INTO resultados (tarea, filas) VALUES (?, ?)",
+                                  (id_tarea, json.dumps(productos, ensure_ascii=False)))
+            # Las subtareas heredan los intentos máximos de la tarea que las genera
+            self.conexion.executemany(
+                "INSERT OR IGNORE INTO tareas (supermercado, clave, datos, max_intentos, actualizada) "
+                "SELECT ?, ?, ?, max_intentos, ? FROM tareas WHERE id = ?",
+                [(supermercado, clave, json.dumps(datos, ensure_ascii=False), ahora, id_tarea) for clave, datos in subtareas]
+            )
+            self.conexion.execute("COMMIT")
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            raise
+        return True
+
+    def fallar(self, id_tarea, worker, error):
+        """Devuelve la tarea a pendiente, o la marca como fallida si agotó sus intentos."""
+        cursor = self.conexion.execute("""
+            UPDATE tareas SET estado = CASE WHEN intentos >= max_intentos THEN 'fallida' ELSE 'pendiente' END,
+                              worker = NULL, arriendo_hasta = NULL, error = ?, actualizada = ?
+            WHERE id = ? AND worker = ? AND estado = 'en_curso'
+        """, (str(error)[:500], datetime.now().isoformat(timespec='seconds'), id_tarea, worker))
+        return cursor.rowcount == 1
+
+    def reintentar_fallidas(self, supermercado):
+        """Vuelve a poner en cola las tareas fallidas, con los intentos a cero."""
+        cursor = self.conexion.execute(
+            "UPDATE tareas SET estado = 'pendiente', intentos = 0, error = NULL WHERE supermercado = ? AND estado = 'fallida'",
+            (supermercado,)
+        )
+        return cursor.rowcount
+
+    def quedan(self, supermercado):
+        """Número de tareas pendientes o en curso."""
+        return self.conexion.execute(
+            "SELECT COUNT(*) FROM tareas WHERE supermercado = ? AND estado IN ('pendiente', 'en_curso')", (supermercado,)
+        ).fetchone()[0]
+
+    def estado(self):
+        """{supermercado: {estado: número de tareas}} y productos guardados por supermercado."""
+        resumen = {}
+        for supermercado, estado, numero, productos in self.conexion.execute(
+                "SELECT supermercado, estado, COUNT(*), SUM(COALESCE(productos, 0)) FROM tareas GROUP BY supermercado, estado"):
+            datos = resumen.setdefault(supermercado, {'productos': 0})
+            datos[estado] = numero
+            datos['productos'] += productos
+        return resumen
+
+    def filas(self, supermercado, por_lote=200):
+        """Recorre los productos guardados de un supermercado sin cargarlos todos en memoria."""
+        ultimo = 0
+        while True:
+            lote = self.conexion.execute("""
+                SELECT r.tarea, r.filas FROM resultados r JOIN tareas t ON t.id = r.tarea
+                WHERE t.supermercado = ? AND t.estado = 'hecha' AND r.tarea > ? ORDER BY r.tarea LIMIT ?
+            """, (supermercado, ultimo, por_lote)).fetchall()
+            if not lote:
+                return
+            for ultimo, filas in lote:
+                yield from json.loads(filas)
+
+class Latidos:
+    """
+    Hilo que renueva el arriendo de la tarea en curso cada `intervalo` segundos.
+    Usa su propia conexión a SQLite (las conexiones no se comparten entre hilos).
+    """
+
+    def __init__(self, ruta, id_tarea, worker, segundos, intervalo, en_red=False):
+        self.ruta = ruta
+        self.id_tarea = id_tarea
+        self.worker = worker
+        self.segundos = segundos
+        self.intervalo = intervalo
+        self.en_red = en_red
+        self.parar = threading.Event()
+        self.perdido = False
+        self.hilo = threading.Thread(target=self._latir, daemon=True)
+
+    def _latir(self):
+        cola = ColaTrabajo(self.ruta, self.en_red)
+        try:
+            while not self.parar.wait(self.intervalo):
+                if not cola.latido(self.id_tarea, self.worker, self.segundos):
+                    self.perdido = True
+                    return
+        finally:
+            cola.cerrar()
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.parar.set()
+        self.hilo.join()
+
+def cargar_sitio(sitio):
+    return importlib.import_module(MODULOS[sitio])
+
+def sembrar(cola, sitio, max_intentos=3):
+    """Abre un navegador, obtiene las tareas iniciales del supermercado y las encola."""
+    modulo = cargar_sitio(sitio)
+    driver = modulo.iniciar_driver()
+    try:
+        modulo.preparar_sesion(driver)
+        tareas = modulo.tareas_cola(driver)
+    finally:
+        driver.quit()
+    nuevas = cola.encolar(sitio, tareas, max_intentos)
+    print(f"Tareas de {sitio} encoladas: {nuevas} nuevas de {len(tareas)}")
+    return nuevas
+
+def trabajar(cola, sitio, segundos_arriendo=300, intervalo_latido=30, max_tareas=None, espera_vacia=15,
+             pool=None, opciones=None, fallos_para_reiniciar=2, numero=0, pestanas=1):
+    """
+    Bucle de un worker: arrienda tareas hasta que no quede ninguna pendiente ni
+    en curso. Si solo quedan tareas en curso de otros workers, espera por si
+    alguno muere y su arriendo caduca.
+
+    Con `pool` (PoolSesiones) los navegadores salen ya preparados del pool y
+    los reinicios toman una reserva. El navegador se reinicia si el error es de
+    sesión o tras `fallos_para_reiniciar` tareas fallidas seguidas. `opciones`
+    se pasan a ejecutar_tarea_cola (por ejemplo, modo_extraccion).
+
+    Antes de cada tarea se respeta el control de ritmo (scraper_ritmo.py): el
+    worker `numero` espera mientras no esté entre las sesiones permitidas y
+    después la pausa actual.
+
+    Con `pestanas` > 1 el navegador trabaja con varias pestañas a la vez (ver
+    trabajar_pestanas), si el supermercado lo admite.
+    """
+    modulo = cargar_sitio(sitio)
+    if pestanas > 1:
+        if hasattr(modulo, 'url_tarea_cola'):
+            return trabajar_pestanas(cola, sitio, pestanas, segundos_arriendo, intervalo_latido, max_tareas,
+                                     espera_vacia, pool, opciones, fallos_para_reiniciar, numero)
+        print(f"{sitio} no admite varias pestañas (sus tareas no tienen URL propia): se trabaja con una")
+    worker = id_worker()
+    driver = None
+    hechas = 0
+    fallos_seguidos = 0
+
+    def abrir_navegador():
+        if pool:
+            nuevo = pool.obtener()
+            if nuevo is None:
+                raise Exception("el pool no pudo arrancar un navegador")
+            return nuevo
+        nuevo = modulo.iniciar_driver()
+        modulo.preparar_sesion(nuevo)
+        return nuevo
+
+    def cerrar_navegador(actual):
+        try:
+            if pool:
+                pool.liberar(actual)
+            else:
+                actual.quit()
+        except:
+            pass
+
+    try:
+        while max_tareas is None or hechas < max_tareas:
+            while numero >= controlador_ritmo.sesiones_permitidas() and cola.quedan(sitio):
+                time.sleep(espera_vacia)
+            controlador_ritmo.esperar()
+            tarea = cola.arrendar(sitio, worker, segundos_arriendo)
+            if tarea is None:
+                if not cola.quedan(sitio):
+                    break
+                time.sleep(espera_vacia)
+                continue
+
+            print(f"[{worker}] Tarea {tarea['id']} ({tarea['clave']}), intento {tarea['intentos']}")
+            try:
+                if driver is None:
+                    driver = abrir_navegador()
+                with Latidos(cola.ruta, tarea['id'], worker, segundos_arriendo, intervalo_latido, cola.en_red) as latidos:
+                    with trazador.span('tarea', sitio=sitio, clave=tarea['clave'], worker=worker) as span:
+                        productos, subtareas = modulo.ejecutar_tarea_cola(driver, tarea['datos'], **(opciones or {}))
+                        span['productos'] = len(productos)
+                fallos_seguidos = 0
+                if latidos.perdido or not cola.completar(sitio, tarea['id'], worker, productos, subtareas):
+                    print(f"[{worker}] Se perdió el arriendo de la tarea {tarea['id']}, se descarta el resultado")
+                    continue
+                hechas += 1
+                print(f"[{worker}] Tarea {tarea['id']} completada: {len(productos)} productos, {len(subtareas)} tareas nuevas")
+            except Exception as e:
+                print(f"[{worker}] Error en la tarea {tarea['id']}: {str(e)}")
+                trazador.evento('reintento', sitio=sitio, clave=tarea['clave'], worker=worker, error=str(e)[:200])
+                cola.fallar(tarea['id'], worker, e)
+                fallos_seguidos += 1
+                if driver is not None and (es_error_de_sesion(e) or fallos_seguidos >= fallos_para_reiniciar):
+                    print(f"[{worker}] Reiniciando el navegador")
+                    trazador.evento('reinicio', sitio=sitio, worker=worker)
+                    controlador_ritmo.registrar(fallo_sesion=True)
+                    if pool:
+                        driver = pool.reemplazar(driver)
+                    else:
+                        cerrar_navegador(driver)
+                        driver = None
+                    fallos_seguidos = 0
+                else:
+                    controlador_ritmo.registrar(error=True)
+    finally:
+        if driver is not None:
+            cerrar_navegador(driver)
+    print(f"[{worker}] Sin tareas disponibles: {hechas} completadas")
+    return hechas
+
+def trabajar_pestanas(cola, sitio, pestanas, segundos_arriendo=300, intervalo_latido=30, max_tareas=None,
+                      espera_vacia=15, pool=None, opciones=None, fallos_para_reiniciar=2, numero=0):
+    """
+    Como trabajar, con `pestanas` pestañas en un solo navegador: se arrienda una
+    tarea por pestaña libre y se lanza su navegación sin esperar; después se
+    extrae la primera pestaña que termina de cargar mientras las demás siguen
+    cargando. Cada tarea en curso mantiene su propio arriendo con latidos.
+    """
+    modulo = cargar_sitio(sitio)
+    worker = id_worker()
+    driver = None
+    navegador = None
+    latidos = {}  # id de tarea -> Latidos
+    hechas = 0
+    fallos_seguidos = 0
+
+    def abrir_navegador():
+        nuevo = pool.obtener() if pool else None
+        if pool and nuevo is None:
+            raise Exception("el pool no pudo arrancar un navegador")
+        if nuevo is None:
+            nuevo = modulo.iniciar_driver()
+            modulo.preparar_sesion(nuevo)
+        ligero = getattr(modulo, 'perfil_ligero', False)
+        return nuevo, PestanasNavegador(nuevo, pestanas, lambda driver: preparar_pestana(driver, ligero))
+
+    def cerrar_navegador(actual, error):
+        # Las tareas que estaban cargando vuelven a la cola
+        for tarea in navegador.abandonar():
+            latidos.pop(tarea['id']).__exit__(None, None, None)
+            cola.fallar(tarea['id'], worker, error)
+        try:
+            if pool:
+                pool.liberar(actual)
+            else:
+                actual.quit()
+        except:
+            pass
+
+    def fallar(tarea, error):
+        navegador.cargando = {handle: carga for handle, carga in navegador.cargando.items() if carga[0] is not tarea}
+        print(f"[{worker}] Error en la tarea {tarea['id']}: {str(error)}")
+        trazador.evento('reintento', sitio=sitio, clave=tarea['clave'], worker=worker, error=str(error)[:200])
+        cola.fallar(tarea['id'], worker, error)
+
+    try:
+        while max_tareas is None or hechas < max_tareas:
+            actual = None  # Tarea a la que se atribuye un error: la que se está lanzando o extrayendo
+            try:
+                if driver is None:
+                    driver, navegador = abrir_navegador()
+
+                # Una navegación por pestaña libre (sin pasar de max_tareas)
+                for handle in navegador.libres():
+                    if max_tareas is not None and hechas + len(navegador.cargando) >= max_tareas:
+                        break
+                    if numero >= controlador_ritmo.sesiones_permitidas():
+                        break
+                    controlador_ritmo.esperar()
+                    tarea = cola.arrendar(sitio, worker, segundos_arriendo)
+                    if tarea is None:
+                        break
+                    print(f"[{worker}] Tarea {tarea['id']} ({tarea['clave']}), intento {tarea['intentos']}")
+                    actual = tarea
+                    latidos[tarea['id']] = Latidos(cola.ruta, tarea['id'], worker, segundos_arriendo,
+                                                   intervalo_latido, cola.en_red).__enter__()
+                    navegador.navegar(handle, modulo.url_tarea_cola(tarea['datos']), tarea)
+                    actual = None
+
+                cargada = navegador.siguiente()
+                if cargada is None:
+                    if not cola.quedan(sitio):
+                        break
+                    time.sleep(espera_vacia)
+                    continue
+
+                handle, tarea, completa = cargada
+                actual = tarea
+                if not completa:
+                    # Se devuelve a la cola sin extraer una página a medio cargar
+                    raise ErrorCargaPestana("la pestaña no terminó de cargar")
+                with trazador.span('tarea', sitio=sitio, clave=tarea['clave'], worker=worker, pestana=handle) as span:
+                    productos, subtareas = modulo.extraer_tarea_cola(driver, tarea['datos'], **(opciones or {}))
+                    span['productos'] = len(productos)
+                actual = None
+                latido = latidos.pop(tarea['id'])
+                latido.__exit__(None, None, None)
+                fallos_seguidos = 0
+                if latido.perdido or not cola.completar(sitio, tarea['id'], worker, productos, subtareas):
+                    print(f"[{worker}] Se perdió el arriendo de la tarea {tarea['id']}, se descarta el resultado")
+                    continue
+                hechas += 1
+                print(f"[{worker}] Tarea {tarea['id']} completada: {len(productos)} productos, {len(subtareas)} tareas nuevas")
+            except Exception as e:
+                if actual is not None:
+                    latido = latidos.pop(actual['id'], None)
+                    if latido:
+                        latido.__exit__(None, None, None)
+                    fallar(actual, e)
+                elif driver is None:
+                    raise  # No se pudo abrir el navegador
+                else:
+                    print(f"[{worker}] Error en el navegador: {str(e)}")
+                fallos_seguidos += 1
+                if driver is not None and (es_error_de_sesion(e) or fallos_seguidos >= fallos_para_reiniciar):
+                    print(f"[{worker}] Reiniciando el navegador")
+                    trazador.evento('reinicio', sitio=sitio, worker=worker)
+                    controlador_ritmo.registrar(fallo_sesion=True)
+                    navegador.resumen()
+                    cerrar_navegador(driver, e)
+                    driver = None
+                    fallos_seguidos = 0
+                else:
+                    controlador_ritmo.registrar(error=True)
+    finally:
+        if driver is not None:
+            navegador.resumen()
+            cerrar_navegador(driver, Exception("worker terminado"))
+    print(f"[{worker}] Sin tareas disponibles: {hechas} completadas")
+    return hechas
+
+def exportar(cola, sitio, nombre_archivo):
+    """Escribe en un CSV los productos de todas las tareas terminadas."""
+    with SumideroCSV(nombre_archivo) as sumidero:
+        lote = []
+        for fila in cola.filas(sitio):
+            lote.append(fila)
+            if len(lote) >= 1000:
+                sumidero.escribir(lote)
+                lote = []
+        sumidero.escribir(lote)
+        total = sumidero.filas
+    print(f"Productos de {sitio} exportados a {nombre_archivo}: {total}")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description='Cola de trabajo compartida para repartir los scrapers entre procesos y máquinas')
+    parser.add_argument('accion', choices=['sembrar', 'trabajar', 'estado', 'exportar', 'reintentar'])
+    parser.add_argument('sitio', nargs='?', choices=list(MODULOS))
+    parser.add_argument('--cola', default='cola.db', help='Base de datos SQLite de la cola')
+    parser.add_argument('--en-red', action='store_true', help='La cola está en un sistema de archivos compartido en red (sin WAL)')
+    parser.add_argument('--arriendo', type=int, default=300, help='Segundos de cada arriendo')
+    parser.add_argument('--latido', type=int, default=30, help='Segundos entre renovaciones del arriendo')
+    parser.add_argument('--max-intentos', type=int, default=3)
+    parser.add_argument('--max-tareas', type=int, help='Terminar el worker tras este número de tareas')
+    parser.add_argument('--salida', help='CSV de salida para exportar')
+    parser.add_argument('--traza', help='Archivo JSONL donde registrar la duración de cada tarea (resumen con scraper_tracing.py)')
+    args = parser.parse_args()
+
+    if args.accion not in ('estado',) and not args.sitio:
+        parser.error(f"'{args.accion}' necesita el supermercado")
+
+    trazador.activar(args.traza)
+    cola = ColaTrabajo(args.cola, args.en_red)
+    try:
+        if args.accion == 'sembrar':
+            sembrar(cola, args.sitio, args.max_intentos)
+        elif args.accion == 'trabajar':
+            trabajar(cola, args.sitio, args.arriendo, args.latido, args.max_tareas)
+        elif args.accion == 'exportar':
+            exportar(cola, args.sitio, args.salida or f"{args.sitio}_{datetime.now().date()}.csv")
+        elif args.accion == 'reintentar':
+            print(f"Tareas fallidas de {args.sitio} devueltas a la cola: {cola.reintentar_fallidas(args.sitio)}")
+        else:
+            for sitio, datos in cola.estado().items():
+                estados = ', '.join(f"{estado}: {datos.get(estado, 0)}" for estado in (PENDIENTE, EN_CURSO, HECHA, FALLIDA))
+                print(f"{sitio}: {estados} ({datos['productos']} productos)")
+    finally:
+        cola.cerrar()
+        trazador.cerrar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import csv
+import sys
+import signal
+from seleniumbase import Driver
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from scraper_profile import aplicar_perfil, bloquear_recursos
+from scraper_waits import instalar_instrumentacion
+from scraper_tracing import trazador
+from scraper_metricas import metricas
+
+# Utilidades comunes a los tres scrapers (antes repetidas en cada uno).
+AGENTE = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'
+
+def wait_for_elements(driver, by, selector, timeout=10, multiple=False):
+    """Espera a que uno o varios elementos estén presentes en la página."""
+    wait = WebDriverWait(driver, timeout)
+    if multiple:
+        return wait.until(EC.presence_of_all_elements_located((by, selector)))
+    else:
+        return wait.until(EC.presence_of_element_located((by, selector)))
+
+def click_element(driver, by, selector, timeout=10):
+    """Espera y hace clic en un elemento."""
+    try:
+        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((by, selector))).click()
+    except Exception as e:
+        print(f"No se pudo hacer clic en el elemento: {e}")
+
+def guardar_csv(datos, nombre_archivo):
+    """
+    Añade los datos a un archivo CSV (con cabecera si el archivo es nuevo).
+    Si el archivo ya existe se escriben sus columnas: las que faltan en los
+    datos quedan vacías y las que sobran (por ejemplo 'origen' de una ejecución
+    incremental en un CSV empezado sin ella) se descartan, para que todas las
+    filas tengan tantos campos como la cabecera.
+
+    Parámetros:
+    datos -- Lista de diccionarios con los datos a guardar.
+    nombre_archivo -- Nombre del archivo CSV.
+    """
+    if not datos:
+        print("No hay datos para guardar.")
+        return
+
+    columnas = list(datos[0].keys())
+    existe_archivo = os.path.isfile(nombre_archivo) and os.path.getsize(nombre_archivo) > 0
+    if existe_archivo:
+        with open(nombre_archivo, newline='', encoding='utf-8') as f:
+            columnas = next(csv.reader(f), None) or columnas
+
+    with open(nombre_archivo, 'a+' if existe_archivo else 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columnas, restval='', extrasaction='ignore')
+        if not existe_archivo:
+            writer.writeheader()
+        writer.writerows(datos)
+
+def crear_driver(ligero=False, directorio_perfil=None, registro_red=False):
+    """
+    Inicia Chrome (undetected) con la configuración común: perfil ligero si se
+    pide, instrumentación de esperas, trazas de navegación y recuento de
+    llamadas a WebDriver para las métricas. Con `registro_red` se activa el
+    registro de rendimiento (eventos Network.*) que lee scraper_red.py.
+    """
+    driver = Driver(
+        browser="chrome",
+        uc=True,
+        headless2=ligero,
+        block_images=ligero,
+        incognito=False,
+        agent=AGENTE,
+        do_not_track=True,
+        undetectable=True,
+        user_data_dir=directorio_perfil,
+        log_cdp_events=registro_red
+    )
+    aplicar_perfil(driver, ligero)
+    instalar_instrumentacion(driver)
+    trazador.instrumentar_driver(driver)
+    metricas.instrumentar_driver(driver)
+    return driver
+
+def preparar_pestana(driver, ligero=False):
+    """
+    Repite en la pestaña activa la configuración por CDP de crear_driver
+    (bloqueo de recursos del perfil ligero e instrumentación de esperas), que
+    Chrome aplica pestaña a pestaña y no hereda una pestaña nueva.
+    """
+    if ligero:
+        bloquear_recursos(driver)
+    instalar_instrumentacion(driver)
+
+def instalar_cierre(obtener_driver):
+    """Con Ctrl+C cierra el navegador que devuelva `obtener_driver()` y termina."""
+    def manejador(sig, frame):
+        print('\nCerrando el navegador gracefully...')
+        try:
+            driver = obtener_driver()
+            if driver is not None:
+                driver.quit()
+        except:
+            pass
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, manejador)
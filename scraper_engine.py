@@ -0,0 +1,198 @@
+import time
+import random
+import argparse
+import multiprocessing
+from datetime import datetime
+from scraper_cola import FALLIDA, HECHA, MODULOS, ColaTrabajo, cargar_sitio, exportar, sembrar, trabajar
+from scraper_logging import NIVELES, configurar_logging
+from scraper_metricas import config_worker, metricas
+from scraper_pool import PoolSesiones
+from scraper_profile import medidor_trafico
+from scraper_replay import grabador_html
+from scraper_ritmo import RitmoCompartido, controlador_ritmo
+from scraper_tracing import trazador
+from scraper_waits import contador_esperas
+
+# Motor común de los scrapers. Se encarga de lo que no depende del supermercado:
+# reparto del trabajo entre navegadores (cola de tareas de scraper_cola.py),
+# reintentos y reinicios de sesión, pool de navegadores de reserva, ritmo de
+# las peticiones, salida a CSV y métricas (tráfico, esperas, trazas). Cada
+# supermercado solo aporta un adaptador en su módulo:
+#
+#   iniciar_driver(directorio_perfil=None)   navegador con la configuración del sitio
+#   preparar_sesion(driver)                  cookies, portada, etc.
+#   tareas_cola(driver)                      descubrimiento: [(clave, datos)] iniciales
+#   ejecutar_tarea_cola(driver, datos)       extracción: (productos, tareas nuevas)
+#   RITMO                                    parámetros de scraper_ritmo.ControladorRitmo
+#
+# Opcionalmente, para trabajar con varias pestañas por navegador (--pestanas):
+#
+#   url_tarea_cola(datos)                    URL de la tarea
+#   extraer_tarea_cola(driver, datos)        extracción con la página ya cargada
+#
+# El ritmo es uno solo para todos los workers: el proceso principal recibe sus
+# señales (latencias, timeouts, bloqueos, reinicios) y decide la pausa entre
+# tareas y cuántos workers trabajan a la vez.
+#
+# Uso:
+#   python scraper_engine.py carrefour --workers 3 --ligero --pool 1
+#   python scraper_engine.py carrefour --workers 1 --pestanas 4 --ligero
+#
+# Si la cola ya tiene tareas (una ejecución interrumpida), se continúa donde se
+# quedó en lugar de volver a sembrar.
+
+def config_proceso(args):
+    """Configuración que tiene que llegar a cada proceso worker (con 'spawn' no heredan los globales)."""
+    return {
+        'ligero': getattr(args, 'ligero', False),
+        'pestanas': getattr(args, 'pestanas', 1),
+        'extraccion': getattr(args, 'extraccion', None),
+        'grabar_html': getattr(args, 'grabar_html', None),
+        'traza': getattr(args, 'traza', None),
+        'log': {'nivel': getattr(args, 'log_nivel', 'INFO'),
+                'formato': getattr(args, 'log_formato', 'texto'),
+                'muestreo': getattr(args, 'log_muestreo', 1)},
+        'metricas': {'puerto': getattr(args, 'metricas_puerto', None),
+                     'archivo': getattr(args, 'metricas_archivo', None),
+                     'intervalo': getattr(args, 'metricas_intervalo', 15)}
+    }
+
+def configurar_proceso(modulo, config):
+    """Aplica la configuración al módulo del supermercado y a los singletons de este proceso."""
+    config = config or {}
+    modulo.perfil_ligero = config.get('ligero', False)
+    if hasattr(modulo, 'capturar_red'):
+        modulo.capturar_red = config.get('extraccion') == 'xhr'  # Registro de red de Chrome (alcampo --extraccion xhr)
+    grabador_html.directorio = config.get('grabar_html')
+    configurar_logging(**config.get('log', {}))
+    trazador.activar(config.get('traza'))
+
+def proceso_worker(numero, sitio, ruta_cola, config, arriendo, latido, reservas_pool, opciones, canales_ritmo=None):
+    """Un worker: su propio navegador (y reservas si hay pool) trabajando sobre la cola compartida."""
+    modulo = cargar_sitio(sitio)
+    configurar_proceso(modulo, config)
+    if canales_ritmo:
+        controlador_ritmo.conectar(canales_ritmo)
+    ajustes_metricas = (config or {}).get('metricas', {})
+    if multiprocessing.current_process().name != 'MainProcess':
+        # Cada proceso expone sus propias series, con la etiqueta worker y su puerto o archivo
+        ajustes_metricas = config_worker(ajustes_metricas, numero)
+    metricas.activar(**ajustes_metricas, sitio=sitio)
+    cola = ColaTrabajo(ruta_cola)
+    pool = None
+    if reservas_pool:
+        pool = PoolSesiones(modulo.iniciar_driver, modulo.preparar_sesion, reservas=reservas_pool, nombre=f"{sitio}_w{numero}")
+    try:
+        return trabajar(cola, sitio, arriendo, latido, pool=pool, opciones=opciones, espera_vacia=5, numero=numero,
+                        pestanas=(config or {}).get('pestanas', 1))
+    finally:
+        cola.cerrar()
+        if pool:
+            pool.cerrar()
+            pool.resumen()
+        medidor_trafico.resumen()
+        contador_esperas.resumen()
+        metricas.resumen()
+        metricas.cerrar()
+        trazador.cerrar()
+
+def ejecutar(sitio, workers=1, ruta_cola=None, salida=None, config=None, max_intentos=3,
+             arriendo=300, latido=30, reservas_pool=0, opciones=None):
+    """
+    Rastrea un supermercado completo: siembra la cola si está vacía, lanza
+    `workers` procesos (o trabaja en este mismo si es 1), exporta los productos
+    a `salida` y muestra el estado final. Devuelve el número de productos exportados.
+    """
+    fecha = datetime.now().date()
+    ruta_cola = ruta_cola or f"{sitio}_{fecha}.cola.db"
+    salida = salida or f"{sitio}_{fecha}.csv"
+    inicio = time.monotonic()
+
+    cola = ColaTrabajo(ruta_cola)
+    try:
+        if sitio in cola.estado():
+            print(f"La cola {ruta_cola} ya tiene tareas de {sitio}: se continúa la ejecución anterior")
+        else:
+            configurar_proceso(cargar_sitio(sitio), config)
+            sembrar(cola, sitio, max_intentos)
+            trazador.cerrar()
+        if not cola.quedan(sitio):
+            print("No hay tareas pendientes.")
+    finally:
+        cola.cerrar()
+
+    # Se empieza con todos los workers y el ritmo del sitio; los problemas reducen ambos
+    controlador_ritmo.configurar(**{**getattr(cargar_sitio(sitio), 'RITMO', {}),
+                                    'sesiones_max': workers, 'sesiones_iniciales': workers})
+    argumentos = (sitio, ruta_cola, config, arriendo, latido, reservas_pool, opciones)
+    if workers <= 1:
+        proceso_worker(0, *argumentos)
+    else:
+        ritmo = RitmoCompartido(controlador_ritmo)
+        procesos = []
+        for numero in range(workers):
+            proceso = multiprocessing.Process(target=proceso_worker, args=(numero, *argumentos, ritmo.canales))
+            proceso.start()
+            procesos.append(proceso)
+            time.sleep(random.uniform(1, 3))  # Escalonar el arranque de los navegadores
+        for proceso in procesos:
+            proceso.join()
+        ritmo.cerrar()
+
+    cola = ColaTrabajo(ruta_cola)
+    try:
+        total = exportar(cola, sitio, salida)
+        datos = cola.estado().get(sitio, {})
+        fallidas = cola.conexion.execute(
+            "SELECT clave, error FROM tareas WHERE supermercado = ? AND estado = ?", (sitio, FALLIDA)
+        ).fetchall()
+    finally:
+        cola.cerrar()
+
+    print(f"\n=== {sitio}: {workers} worker(s) en {time.monotonic() - inicio:.0f}s ===")
+    print(f"Tareas hechas: {datos.get(HECHA, 0)}, fallidas: {datos.get(FALLIDA, 0)}, productos: {total}")
+    for clave, error in fallidas:
+        print(f"- {clave}: {error}")
+    if fallidas:
+        print(f"Para reintentarlas: python scraper_cola.py reintentar {sitio} --cola {ruta_cola} y volver a lanzar el motor")
+    controlador_ritmo.resumen()
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description='Motor común de los scrapers: reparto entre navegadores, reintentos, salida y métricas')
+    parser.add_argument('sitio', choices=list(MODULOS))
+    parser.add_argument('--workers', type=int, default=1, help='Número de navegadores en paralelo')
+    parser.add_argument('--cola', help='Base de datos SQLite de la cola (por defecto <sitio>_<fecha>.cola.db)')
+    parser.add_argument('--salida', help='CSV de salida (por defecto <sitio>_<fecha>.csv)')
+    parser.add_argument('--pool', type=int, default=0, help='Navegadores de reserva por worker para los reinicios')
+    parser.add_argument('--pestanas', type=int, default=1, help='Pestañas por navegador: una carga mientras otra se extrae (carrefour y alcampo)')
+    parser.add_argument('--max-intentos', type=int, default=3)
+    parser.add_argument('--arriendo', type=int, default=300, help='Segundos de cada arriendo')
+    parser.add_argument('--latido', type=int, default=30, help='Segundos entre renovaciones del arriendo')
+    parser.add_argument('--extraccion', help='Modo de extracción del supermercado (carrefour: js/estado/dom, alcampo: lotes/xhr/tarjetas)')
+    parser.add_argument('--ligero', action='store_true', help='Navegador sin interfaz, ventana pequeña y sin imágenes, fuentes, vídeo ni analítica')
+    parser.add_argument('--grabar-html', help='Directorio donde guardar el HTML renderizado de cada página como fixture (ver scraper_replay.py)')
+    parser.add_argument('--traza', help='Archivo JSONL donde registrar la duración de cada fase (resumen con scraper_tracing.py)')
+    parser.add_argument('--log-nivel', choices=NIVELES, default='INFO', help='DEBUG añade el detalle de cada producto')
+    parser.add_argument('--log-formato', choices=['texto', 'json'], default='texto')
+    parser.add_argument('--log-muestreo', type=int, default=1, help='En DEBUG, registrar solo uno de cada N productos')
+    parser.add_argument('--metricas-puerto', type=int, help='Métricas de Prometheus en http://127.0.0.1:<puerto>/metrics (el worker N usa <puerto>+N+1)')
+    parser.add_argument('--metricas-archivo', help='Archivo .prom con las métricas (el worker N escribe <archivo>_wN.prom)')
+    parser.add_argument('--metricas-intervalo', type=int, default=15)
+    args = parser.parse_args()
+    modos = getattr(cargar_sitio(args.sitio), 'MODOS_EXTRACCION', ())
+    if args.extraccion and args.extraccion not in modos:
+        parser.error(f"--extraccion {args.extraccion} no es un modo de {args.sitio}"
+                     + (f" (modos: {', '.join(modos)})" if modos else " (no tiene modos de extracción)"))
+
+    config = config_proceso(args)
+    configurar_logging(**config['log'])
+    opciones = {'modo_extraccion': args.extraccion} if args.extraccion else None
+    print(f"Iniciando escaneo de {args.sitio} a fecha: {datetime.now()}")
+    total = ejecutar(args.sitio, args.workers, args.cola, args.salida, config, args.max_intentos,
+                     args.arriendo, args.latido, args.pool, opciones)
+    if not total:
+        print("No se encontraron productos.")
+
+if __name__ == "__main__":
+    main()
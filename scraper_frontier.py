@@ -0,0 +1,174 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+PENDIENTE = 'pendiente'
+EN_CURSO = 'en_curso'
+HECHA = 'hecha'
+
+class FronteraCrawl:
+    """
+    Frontera persistente de páginas a rastrear, guardada en SQLite.
+
+    Cada página (URL de categoría, offset) pasa por pendiente -> en_curso -> hecha.
+    Los productos de una página se guardan en la misma transacción que la marca
+    como hecha, así que al reanudar nunca se repite una página terminada ni se
+    duplican sus productos. Al exportar una categoría se anota antes el tamaño
+    del CSV, y una exportación interrumpida se recorta al reanudar en lugar de
+    volver a añadir sus filas.
+    """
+
+    def __init__(self, ruta='frontera.db'):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        with self.conexion:
+            self.conexion.executescript("""
+                CREATE TABLE IF NOT EXISTS categorias (
+                    url_categoria TEXT PRIMARY KEY,
+                    titulo TEXT,
+                    total_paginas INTEGER,
+                    exportada INTEGER DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS paginas (
+                    url_categoria TEXT,
+                    offset INTEGER,
+                    estado TEXT,
+                    intentos INTEGER DEFAULT 0,
+                    actualizada TEXT,
+                    PRIMARY KEY (url_categoria, offset)
+                );
+                CREATE TABLE IF NOT EXISTS productos (
+                    url_categoria TEXT,
+                    offset INTEGER,
+                    posicion INTEGER,
+                    datos TEXT,
+                    PRIMARY KEY (url_categoria, offset, posicion)
+                );
+                CREATE TABLE IF NOT EXISTS exportaciones (
+                    url_categoria TEXT PRIMARY KEY,
+                    archivo TEXT,
+                    tamano INTEGER
+                );
+            """)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def reanudar(self):
+        """Devuelve a pendiente las páginas que quedaron en curso en una ejecución interrumpida."""
+        with self.conexion:
+            cursor = self.conexion.execute(
+                "UPDATE paginas SET estado = ? WHERE estado = ?", (PENDIENTE, EN_CURSO)
+            )
+        if cursor.rowcount:
+            print(f"Frontera: {cursor.rowcount} páginas en curso devueltas a pendiente")
+        return cursor.rowcount
+
+    def registrada(self, url_categoria):
+        fila = self.conexion.execute(
+            "SELECT 1 FROM categorias WHERE url_categoria = ?", (url_categoria,)
+        ).fetchone()
+        return fila is not None
+
+    def registrar_categoria(self, url_categoria, titulo, total_paginas, productos_por_pagina=24):
+        """Registra una categoría y todas sus páginas como pendientes (si no lo estaban ya)."""
+        ahora = datetime.now().isoformat(timespec='seconds')
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT OR IGNORE INTO categorias (url_categoria, titulo, total_paginas) VALUES (?, ?, ?)",
+                (url_categoria, titulo, total_paginas)
+            )
+            self.conexion.executemany(
+                "INSERT OR IGNORE INTO paginas (url_categoria, offset, estado, actualizada) VALUES (?, ?, ?, ?)",
+                [(url_categoria, n * productos_por_pagina, PENDIENTE, ahora) for n in range(total_paginas)]
+            )
+
+    def pendientes(self, url_categoria):
+        """Offsets pendientes de una categoría, en orden."""
+        filas = self.conexion.execute(
+            "SELECT offset FROM paginas WHERE url_categoria = ? AND estado != ? ORDER BY offset",
+            (url_categoria, HECHA)
+        ).fetchall()
+        return [fila[0] for fila in filas]
+
+    def marcar_en_curso(self, url_categoria, offset):
+        with self.conexion:
+            self.conexion.execute(
+                "UPDATE paginas SET estado = ?, intentos = intentos + 1, actualizada = ? WHERE url_categoria = ? AND offset = ?",
+                (EN_CURSO, datetime.now().isoformat(timespec='seconds'), url_categoria, offset)
+            )
+
+    def marcar_pendiente(self, url_categoria, offset):
+        with self.conexion:
+            self.conexion.execute(
+                "UPDATE paginas SET estado = ?, actualizada = ? WHERE url_categoria = ? AND offset = ?",
+                (PENDIENTE, datetime.now().isoformat(timespec='seconds'), url_categoria, offset)
+            )
+
+    def completar(self, url_categoria, offset, productos):
+        """Guarda los productos de una página y la marca como hecha en una sola transacción."""
+        with self.conexion:
+            self.conexion.execute(
+                "DELETE FROM productos WHERE url_categoria = ? AND offset = ?", (url_categoria, offset)
+            )
+            self.conexion.executemany(
+                "INSERT INTO productos (url_categoria, offset, posicion, datos) VALUES (?, ?, ?, ?)",
+                [(url_categoria, offset, n, json.dumps(producto, ensure_ascii=False)) for n, producto in enumerate(productos)]
+            )
+            self.conexion.execute(
+                "UPDATE paginas SET estado = ?, actualizada = ? WHERE url_categoria = ? AND offset = ?",
+                (HECHA, datetime.now().isoformat(timespec='seconds'), url_categoria, offset)
+            )
+
+    def categoria_completa(self, url_categoria):
+        return self.registrada(url_categoria) and not self.pendientes(url_categoria)
+
+    def productos_categoria(self, url_categoria):
+        """Productos de una categoría en el orden de las páginas."""
+        filas = self.conexion.execute(
+            "SELECT datos FROM productos WHERE url_categoria = ? ORDER BY offset, posicion", (url_categoria,)
+        ).fetchall()
+        return [json.loads(fila[0]) for fila in filas]
+
+    def exportada(self, url_categoria):
+        fila = self.conexion.execute(
+            "SELECT exportada FROM categorias WHERE url_categoria = ?", (url_categoria,)
+        ).fetchone()
+        return bool(fila and fila[0])
+
+    def iniciar_exportacion(self, url_categoria, nombre_archivo):
+        """
+        Anota el tamaño del CSV antes de añadirle las filas de una categoría.
+        Si una exportación anterior de la categoría quedó a medias (se añadieron
+        filas pero no llegó a marcarse como exportada), recorta antes el archivo
+        a su tamaño de entonces para no duplicarlas.
+        """
+        anterior = self.conexion.execute(
+            "SELECT archivo, tamano FROM exportaciones WHERE url_categoria = ?", (url_categoria,)
+        ).fetchone()
+        if anterior and os.path.isfile(anterior[0]) and os.path.getsize(anterior[0]) > anterior[1]:
+            with open(anterior[0], 'r+b') as f:
+                f.truncate(anterior[1])
+            print(f"Frontera: descartadas las filas de una exportación interrumpida en {anterior[0]}")
+        tamano = os.path.getsize(nombre_archivo) if os.path.isfile(nombre_archivo) else 0
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO exportaciones (url_categoria, archivo, tamano) VALUES (?, ?, ?)",
+                (url_categoria, nombre_archivo, tamano)
+            )
+
+    def marcar_exportada(self, url_categoria):
+        with self.conexion:
+            self.conexion.execute(
+                "UPDATE categorias SET exportada = 1 WHERE url_categoria = ?", (url_categoria,)
+            )
+            self.conexion.execute(
+                "DELETE FROM exportaciones WHERE url_categoria = ?", (url_categoria,)
+            )
+
+    def resumen(self):
+        """Número de páginas en cada estado."""
+        return dict(self.conexion.execute("SELECT estado, COUNT(*) FROM paginas GROUP BY estado").fetchall())
@@ -0,0 +1,91 @@
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+
+# Huellas de contenido por categoría para el modo incremental: si la huella
+# barata de hoy (número de productos/páginas + hash de la primera página)
+# coincide con la de la última ejecución, se reutilizan las filas de entonces
+# en lugar de recorrer toda la categoría.
+ORIGEN_RASTREADO = 'rastreado'
+ORIGEN_ARRASTRADO = 'arrastrado'
+
+def calcular_huella(total, pares):
+    """
+    Huella de una categoría: `total` (número de productos o de páginas) más un
+    hash de los pares (título, precio) de la primera página, en orden.
+    """
+    resumen = hashlib.sha1()
+    resumen.update(str(total).encode('utf-8'))
+    for titulo, precio in pares:
+        resumen.update(f"\x1f{titulo}\x1e{precio}".encode('utf-8'))
+    return resumen.hexdigest()
+
+class AlmacenHuellas:
+    """Guarda en SQLite la huella y las filas de la última ejecución de cada categoría."""
+
+    def __init__(self, ruta='huellas.db'):
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        with self.conexion:
+            self.conexion.execute("""
+                CREATE TABLE IF NOT EXISTS huellas (
+                    supermercado TEXT,
+                    categoria TEXT,
+                    huella TEXT,
+                    fecha TEXT,
+                    filas TEXT,
+                    PRIMARY KEY (supermercado, categoria)
+                )
+            """)
+        self.estadisticas = {'sin_cambios': 0, 'cambiadas': 0}
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def sin_cambios(self, supermercado, categoria, huella):
+        """Indica si la categoría tiene la misma huella que en la última ejecución."""
+        fila = self.conexion.execute(
+            "SELECT huella FROM huellas WHERE supermercado = ? AND categoria = ?", (supermercado, categoria)
+        ).fetchone()
+        iguales = fila is not None and fila[0] == huella
+        self.estadisticas['sin_cambios' if iguales else 'cambiadas'] += 1
+        return iguales
+
+    def filas_anteriores(self, supermercado, categoria, campo_fecha, fecha=None):
+        """
+        Filas de la última ejecución con la fecha de hoy en `campo_fecha`,
+        marcadas con origen 'arrastrado'.
+        """
+        fila = self.conexion.execute(
+            "SELECT filas FROM huellas WHERE supermercado = ? AND categoria = ?", (supermercado, categoria)
+        ).fetchone()
+        if fila is None:
+            return []
+        fecha = fecha or datetime.now().strftime('%Y-%m-%d')
+        filas = json.loads(fila[0])
+        for producto in filas:
+            producto[campo_fecha] = fecha
+            producto['origen'] = ORIGEN_ARRASTRADO
+        return filas
+
+    def guardar(self, supermercado, categoria, huella, filas):
+        """Guarda la huella y las filas recién rastreadas de una categoría."""
+        filas = [{clave: valor for clave, valor in producto.items() if clave != 'origen'} for producto in filas]
+        with self.conexion:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO huellas (supermercado, categoria, huella, fecha, filas) VALUES (?, ?, ?, ?, ?)",
+                (supermercado, categoria, huella, datetime.now().isoformat(timespec='seconds'),
+                 json.dumps(filas, ensure_ascii=False))
+            )
+
+    def resumen(self):
+        print(f"Huellas: {self.estadisticas['sin_cambios']} categorías sin cambios (filas arrastradas), "
+              f"{self.estadisticas['cambiadas']} rastreadas de nuevo")
+
+def marcar_rastreados(productos):
+    """Marca las filas recién rastreadas con origen 'rastreado'."""
+    for producto in productos:
+        producto['origen'] = ORIGEN_RASTREADO
+    return productos
@@ -0,0 +1,132 @@
+import sys
+import json
+import logging
+import threading
+from datetime import datetime
+
+# Logging estructurado de los scrapers. El progreso (categorías, páginas,
+# totales) va a INFO; el detalle de cada producto y los volcados de HTML van a
+# DEBUG. Los volcados caros, como el outerHTML de un elemento (una llamada más a
+# WebDriver), se pasan como Diferido: si el nivel no deja pasar el mensaje no se
+# piden al navegador ni se formatean.
+NIVELES = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+
+class Diferido:
+    """Valor que solo se calcula cuando se formatea el mensaje."""
+
+    __slots__ = ('funcion',)
+
+    def __init__(self, funcion):
+        self.funcion = funcion
+
+    def __str__(self):
+        try:
+            return str(self.funcion())
+        except Exception as e:
+            return f"<no disponible: {e.__class__.__name__}>"
+
+def atributo(elemento, nombre='outerHTML'):
+    """Atributo de un elemento de WebDriver para un mensaje de DEBUG (solo se lee si se emite)."""
+    return Diferido(lambda: elemento.get_attribute(nombre))
+
+def campos(**valores):
+    """Campos estructurados de un registro: log.info("mensaje", extra=campos(pagina=3))."""
+    return {'campos': valores}
+
+def obtener_logger(sitio):
+    return logging.getLogger(f"scraper.{sitio}")
+
+def muestrear(log, indice):
+    """Logger para los registros de un item: con --log-muestreo N solo se emiten los de uno de cada N items."""
+    return LogMuestreado(log, {'muestra': indice})
+
+def registrar_producto(log, producto, claves):
+    """Registra un producto en DEBUG (sujeto a muestreo) con los campos indicados."""
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("producto", extra={'muestra': 'producto', 'campos': {clave: producto.get(clave) for clave in claves}})
+
+class LogMuestreado(logging.LoggerAdapter):
+    """Marca todos los registros con la misma clave de muestreo (por ejemplo, el número de item)."""
+
+    def process(self, mensaje, kwargs):
+        kwargs['extra'] = {**(kwargs.get('extra') or {}), **self.extra}
+        return mensaje, kwargs
+
+class FiltroMuestreo(logging.Filter):
+    """
+    Deja pasar uno de cada `cada` registros de DEBUG marcados con
+    extra={'muestra': clave}. Si la clave es un número (el índice de un item),
+    pasan todos los registros de los items 1, 1 + cada, 1 + 2 * cada...; si es un
+    texto, uno de cada `cada` registros con esa clave. Los avisos y errores no
+    se muestrean nunca.
+    """
+
+    def __init__(self, cada=1):
+        super().__init__()
+        self.cada = max(1, cada)
+        self.contadores = {}
+        self.descartados = 0
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        clave = getattr(record, 'muestra', None)
+        if clave is None or self.cada == 1 or record.levelno > logging.DEBUG:
+            return True
+        if isinstance(clave, int):
+            if (clave - 1) % self.cada:
+                self.descartados += 1
+                return False
+            return True
+        with self.lock:
+            n = self.contadores.get(clave, 0)
+            self.contadores[clave] = n + 1
+            if n % self.cada:
+                self.descartados += 1
+                return False
+        return True
+
+class FormatoEstructurado(logging.Formatter):
+    """Una línea por registro: hora, nivel, origen, mensaje y campos clave=valor (o un objeto JSON)."""
+
+    def __init__(self, formato='texto'):
+        super().__init__()
+        self.json = formato == 'json'
+
+    def format(self, record):
+        valores = getattr(record, 'campos', None) or {}
+        mensaje = record.getMessage()
+        hora = datetime.fromtimestamp(record.created).strftime('%H:%M:%S.%f')[:-3]
+        if self.json:
+            registro = {'hora': hora, 'nivel': record.levelname, 'origen': record.name, 'mensaje': mensaje, **valores}
+            if record.exc_info:
+                registro['excepcion'] = self.formatException(record.exc_info)
+            return json.dumps(registro, ensure_ascii=False, default=str)
+
+        texto = f"{hora} {record.levelname:<7} {record.name}: {mensaje}"
+        if valores:
+            texto += ' ' + ' '.join(f"{clave}={formatear_valor(valor)}" for clave, valor in valores.items())
+        if record.exc_info:
+            texto += '\n' + self.formatException(record.exc_info)
+        return texto
+
+def formatear_valor(valor):
+    texto = str(valor)
+    if not texto or any(c in texto for c in ' ="\n'):
+        return json.dumps(texto, ensure_ascii=False)
+    return texto
+
+def configurar_logging(nivel='INFO', formato='texto', muestreo=1, flujo=None):
+    """
+    Configura los loggers 'scraper.*': nivel mínimo, formato ('texto' o 'json')
+    y muestreo de los registros por producto. Devuelve el manejador instalado.
+    """
+    raiz = logging.getLogger('scraper')
+    for manejador in list(raiz.handlers):
+        raiz.removeHandler(manejador)
+    manejador = logging.StreamHandler(flujo or sys.stdout)
+    manejador.setFormatter(FormatoEstructurado(formato))
+    manejador.addFilter(FiltroMuestreo(muestreo))
+    raiz.addHandler(manejador)
+    raiz.setLevel(getattr(logging, nivel.upper()))
+    raiz.propagate = False
+    return manejador
@@ -0,0 +1,297 @@
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from scraper_ritmo import controlador_ritmo
+from scraper_tracing import trazador
+
+# Métricas de la ejecución en formato de texto de Prometheus, para ver el ritmo
+# (productos/s, páginas/s, reinicios...) mientras el scraper sigue corriendo:
+#
+#   --metricas-puerto 9101         endpoint HTTP local (http://127.0.0.1:9101/metrics)
+#   --metricas-archivo run.prom    archivo reescrito cada --metricas-intervalo segundos
+#                                  (para el textfile collector de node_exporter)
+#
+# No hay que instrumentar cada scraper: las métricas se calculan a partir de los
+# spans del trazador (categorías, tareas, esperas, reintentos y reinicios) aunque
+# no se haya activado --traza, y las llamadas a WebDriver se cuentan envolviendo
+# driver.execute. Las etiquetas sitio y categoria salen del span de categoría (o
+# de tarea de la cola) en curso en el hilo.
+
+# nombre -> (tipo, ayuda)
+DEFINICIONES = {
+    'scraper_productos_total': ('counter', 'Productos extraídos'),
+    'scraper_paginas_total': ('counter', 'Páginas cargadas (esperas tras una navegación), por resultado'),
+    'scraper_latencia_pagina_segundos': ('histogram', 'Segundos hasta que la página cargada queda lista'),
+    'scraper_llamadas_webdriver_total': ('counter', 'Llamadas a WebDriver'),
+    'scraper_llamadas_webdriver_comando_total': ('counter', 'Llamadas a WebDriver por comando'),
+    'scraper_espera_segundos_total': ('counter', 'Segundos de espera: página (tras navegar), dom (tras clic o scroll) y pausa (ritmo)'),
+    'scraper_esperas_total': ('counter', 'Número de esperas'),
+    'scraper_reintentos_total': ('counter', 'Reintentos de páginas, categorías o tareas'),
+    'scraper_reinicios_total': ('counter', 'Reinicios del navegador'),
+    'scraper_categorias_total': ('counter', 'Categorías terminadas, por resultado'),
+    'scraper_tareas_total': ('counter', 'Tareas de la cola terminadas, por resultado'),
+    'scraper_pausa_ritmo_segundos': ('gauge', 'Pausa actual del control de ritmo'),
+    'scraper_sesiones_ritmo': ('gauge', 'Sesiones paralelas permitidas por el control de ritmo'),
+    'scraper_inicio_segundos': ('gauge', 'Hora de inicio del proceso (epoch)'),
+}
+
+CUBETAS_LATENCIA = (0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+# Spans que fijan las etiquetas de lo que ocurre dentro
+FASES_CONTEXTO = ('tarea', 'categoria')
+
+def escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def formatear_valor(valor):
+    """Valor exacto de una muestra: entero tal cual y float con repr (sin perder dígitos como con :g)."""
+    if isinstance(valor, bool):
+        return str(int(valor))
+    if isinstance(valor, int):
+        return str(valor)
+    valor = float(valor)
+    if valor != valor:
+        return 'NaN'
+    if valor in (float('inf'), float('-inf')):
+        return '+Inf' if valor > 0 else '-Inf'
+    return repr(valor)
+
+def formatear_etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{clave}="{escapar(valor)}"' for clave, valor in etiquetas) + '}'
+
+class Metricas:
+    """Contadores e histogramas en memoria, expuestos por HTTP o en un archivo (se activa con activar())."""
+
+    def __init__(self):
+        self.activo = False
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.contadores = {}
+        self.histogramas = {}
+        self.etiquetas_fijas = ()
+        self.sitio = ''
+        self.servidor = None
+        self.archivo = None
+        self.parar = threading.Event()
+        self.hilo_archivo = None
+        self.inicio = time.time()
+
+    def activar(self, puerto=None, archivo=None, intervalo=15, sitio=None, etiquetas=None):
+        """
+        Empieza a recoger métricas si se indica un puerto o un archivo. `sitio` es
+        la etiqueta por defecto fuera de los spans y `etiquetas` se añaden a todas
+        las series (por ejemplo, el worker, para no repetir series entre procesos).
+        """
+        if not puerto and not archivo:
+            return
+        self.activo = True
+        self.sitio = sitio or ''
+        self.etiquetas_fijas = tuple(sorted((etiquetas or {}).items()))
+        if self not in trazador.observadores:
+            trazador.observadores.append(self)
+        if puerto:
+            manejador = type('ManejadorMetricas', (ManejadorMetricas,), {'metricas': self})
+            self.servidor = ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+            self.servidor.daemon_threads = True
+            threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+            print(f"Métricas en http://127.0.0.1:{self.servidor.server_address[1]}/metrics")
+        if archivo:
+            self.archivo = archivo
+            self.parar.clear()
+            self.hilo_archivo = threading.Thread(target=self._reescribir, args=(intervalo,), daemon=True)
+            self.hilo_archivo.start()
+            print(f"Métricas en {archivo} (cada {intervalo}s)")
+
+    def cerrar(self):
+        """Escribe el archivo por última vez y para el servidor."""
+        if self.hilo_archivo:
+            self.parar.set()
+            self.hilo_archivo.join(timeout=5)
+            self.hilo_archivo = None
+            self.escribir_archivo()
+        if self.servidor:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+            self.servidor = None
+
+    def _reescribir(self, intervalo):
+        while not self.parar.wait(intervalo):
+            self.escribir_archivo()
+
+    def escribir_archivo(self):
+        """Reescribe el archivo de forma atómica, para que el colector nunca lea uno a medias."""
+        if not self.archivo:
+            return
+        temporal = f"{self.archivo}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(self.texto())
+            os.replace(temporal, self.archivo)
+        except OSError as e:
+            print(f"No se pudieron escribir las métricas en {self.archivo}: {e}")
+
+    # --- registro ---
+
+    def contexto(self):
+        """(sitio, categoria) del span de categoría o tarea en curso en este hilo."""
+        pila = getattr(self.local, 'pila', None)
+        if pila:
+            return pila[-1]['sitio'], pila[-1]['categoria']
+        return self.sitio, ''
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self.lock:
+            self.contadores[clave] = self.contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self.lock:
+            datos = self.histogramas.get(clave)
+            if datos is None:
+                datos = self.histogramas[clave] = {'cubetas': [0] * len(CUBETAS_LATENCIA), 'suma': 0.0, 'numero': 0}
+            for i, limite in enumerate(CUBETAS_LATENCIA):
+                if valor <= limite:
+                    datos['cubetas'][i] += 1
+            datos['suma'] += valor
+            datos['numero'] += 1
+
+    def instrumentar_driver(self, driver):
+        """Envuelve driver.execute (por donde pasan todos los comandos, también los de los elementos) para contarlos."""
+        if not self.activo:
+            return driver
+        execute_original = driver.execute
+
+        def execute(comando, params=None):
+            sitio, categoria = self.contexto()
+            self.incrementar('scraper_llamadas_webdriver_total', sitio=sitio, categoria=categoria)
+            self.incrementar('scraper_llamadas_webdriver_comando_total', sitio=sitio, comando=comando)
+            return execute_original(comando, params)
+
+        driver.execute = execute
+        return driver
+
+    # --- observador del trazador ---
+
+    def inicio_span(self, fase, atributos):
+        if fase in FASES_CONTEXTO:
+            if not hasattr(self.local, 'pila'):
+                self.local.pila = []
+            sitio = atributos.get('sitio') or self.sitio
+            categoria = atributos.get('categoria') or atributos.get('clave') or ''
+            self.local.pila.append({'fase': fase, 'sitio': sitio, 'categoria': categoria, 'productos_contados': False})
+
+    def fin_span(self, fase, duracion, atributos):
+        resultado = atributos.get('resultado', 'ok')
+        if fase in FASES_CONTEXTO:
+            pila = self.local.pila
+            marco = pila.pop()
+            sitio, categoria = marco['sitio'], marco['categoria']
+            self.incrementar(f"scraper_{fase}s_total", sitio=sitio, resultado=resultado)
+            # Una tarea de la cola suele contener el span de su categoría: no contar sus productos dos veces
+            if 'productos' in atributos and not marco['productos_contados']:
+                self.incrementar('scraper_productos_total', atributos['productos'], sitio=sitio, categoria=categoria)
+                for exterior in pila:
+                    exterior['productos_contados'] = True
+            return
+
+        sitio, categoria = self.contexto()
+        sitio = atributos.get('sitio') or sitio
+        if fase == 'espera':
+            tipo = atributos.get('tipo', 'pagina')
+            self.incrementar('scraper_espera_segundos_total', duracion, sitio=sitio, tipo=tipo)
+            self.incrementar('scraper_esperas_total', sitio=sitio, tipo=tipo)
+            if tipo == 'pagina':
+                self.incrementar('scraper_paginas_total', sitio=sitio, categoria=categoria, resultado=resultado)
+                self.observar('scraper_latencia_pagina_segundos', duracion, sitio=sitio)
+        elif fase == 'pausa':
+            self.incrementar('scraper_espera_segundos_total', duracion, sitio=sitio, tipo='pausa')
+            self.incrementar('scraper_esperas_total', sitio=sitio, tipo='pausa')
+        elif fase == 'reintento':
+            categoria = atributos.get('categoria') or atributos.get('clave') or categoria
+            self.incrementar('scraper_reintentos_total', sitio=sitio, categoria=categoria)
+        elif fase == 'reinicio':
+            self.incrementar('scraper_reinicios_total', sitio=sitio, resultado=resultado)
+
+    # --- exposición ---
+
+    def texto(self):
+        """Todas las series en el formato de texto de Prometheus."""
+        fijas = self.etiquetas_fijas
+        with self.lock:
+            contadores = dict(self.contadores)
+            histogramas = {clave: {'cubetas': list(datos['cubetas']), 'suma': datos['suma'], 'numero': datos['numero']}
+                           for clave, datos in self.histogramas.items()}
+        medidores = {
+            ('scraper_pausa_ritmo_segundos', ()): controlador_ritmo.pausa_actual(),
+            ('scraper_sesiones_ritmo', ()): controlador_ritmo.sesiones_permitidas(),
+            ('scraper_inicio_segundos', ()): self.inicio,
+        }
+
+        lineas = []
+        for nombre, (tipo, ayuda) in DEFINICIONES.items():
+            series = [(clave[1], valor) for clave, valor in {**contadores, **medidores}.items() if clave[0] == nombre]
+            series += [(clave[1], datos) for clave, datos in histogramas.items() if clave[0] == nombre]
+            if not series:
+                continue
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in sorted(series, key=lambda serie: serie[0]):
+                etiquetas = fijas + etiquetas
+                if tipo != 'histogram':
+                    lineas.append(f"{nombre}{formatear_etiquetas(etiquetas)} {formatear_valor(valor)}")
+                    continue
+                for limite, acumulado in zip(CUBETAS_LATENCIA, valor['cubetas']):
+                    lineas.append(f"{nombre}_bucket{formatear_etiquetas(etiquetas + (('le', f'{limite:g}'),))} {acumulado}")
+                lineas.append(f"{nombre}_bucket{formatear_etiquetas(etiquetas + (('le', '+Inf'),))} {valor['numero']}")
+                lineas.append(f"{nombre}_sum{formatear_etiquetas(etiquetas)} {formatear_valor(valor['suma'])}")
+                lineas.append(f"{nombre}_count{formatear_etiquetas(etiquetas)} {valor['numero']}")
+        return '\n'.join(lineas) + '\n'
+
+    def total(self, nombre, **filtro):
+        """Suma de las series de un contador que cumplen el filtro de etiquetas."""
+        with self.lock:
+            return sum(valor for (serie, etiquetas), valor in self.contadores.items()
+                       if serie == nombre and all(dict(etiquetas).get(k) == v for k, v in filtro.items()))
+
+    def resumen(self):
+        """Imprime el ritmo medio de la ejecución."""
+        if not self.activo:
+            return
+        segundos = max(time.time() - self.inicio, 1e-9)
+        productos = self.total('scraper_productos_total')
+        paginas = self.total('scraper_paginas_total')
+        print("\n=== Métricas ===")
+        print(f"Productos: {productos:.0f} ({productos / segundos:.2f}/s), páginas: {paginas:.0f} ({paginas / segundos:.2f}/s), "
+              f"llamadas a WebDriver: {self.total('scraper_llamadas_webdriver_total'):.0f}, "
+              f"reintentos: {self.total('scraper_reintentos_total'):.0f}, reinicios: {self.total('scraper_reinicios_total'):.0f}")
+
+class ManejadorMetricas(BaseHTTPRequestHandler):
+    metricas = None
+
+    def do_GET(self):
+        datos = self.metricas.texto().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        pass
+
+metricas = Metricas()
+
+def config_worker(config, numero):
+    """Configuración de métricas de un worker del motor: su propio puerto o archivo y la etiqueta worker."""
+    config = dict(config or {})
+    if config.get('puerto'):
+        config['puerto'] += numero + 1
+    if config.get('archivo'):
+        base, extension = os.path.splitext(config['archivo'])
+        config['archivo'] = f"{base}_w{numero}{extension or '.prom'}"
+    config['etiquetas'] = {'worker': f"w{numero}"}
+    return config
@@ -0,0 +1,184 @@
+import os
+import time
+from scraper_tracing import trazador
+from scraper_waits import es_error_de_sesion
+
+# Varias pestañas dentro de un mismo navegador en lugar de un navegador por
+# worker. WebDriver solo atiende una pestaña a la vez, pero la carga de una
+# página no necesita al cliente: mientras una pestaña se parsea, las demás
+# siguen cargando. El planificador lanza las navegaciones sin esperar a que
+# terminen (location.assign en lugar de driver.get) y va atendiendo las
+# pestañas en el orden en que quedan cargadas.
+#
+# Solo sirve para tareas con URL propia (páginas de Carrefour, categorías de
+# Alcampo): el adaptador del supermercado define url_tarea_cola(datos) y
+# extraer_tarea_cola(driver, datos) además de ejecutar_tarea_cola.
+
+# La marca queda en el documento anterior: mientras siga ahí, la navegación no ha empezado
+JS_NAVEGAR = "window.__pestanaAnterior = true; window.location.assign(arguments[0]);"
+JS_CARGADA = "return !window.__pestanaAnterior && document.readyState === 'complete';"
+
+INTERVALO_SONDEO = 0.05
+
+class ErrorCargaPestana(Exception):
+    """La pestaña superó el timeout sin terminar de cargar: la tarea no se extrae."""
+
+class PestanasNavegador:
+    """
+    `numero` pestañas en el navegador de `driver` (la actual y las que se abren).
+    Cada pestaña está libre o cargando una tarea. `preparar(driver)` se llama
+    en cada pestaña nueva, ya activa, para repetir la configuración por CDP
+    del navegador (ver scraper_common.preparar_pestana).
+    """
+
+    def __init__(self, driver, numero, preparar=None):
+        self.driver = driver
+        self.handles = [driver.current_window_handle]
+        for _ in range(numero - 1):
+            driver.switch_to.new_window('tab')
+            if preparar:
+                preparar(driver)
+            self.handles.append(driver.current_window_handle)
+        self.actual = self.handles[-1]
+        self.cargando = {}  # handle -> (tarea, url, inicio)
+        self.estadisticas = {'navegaciones': 0, 'timeouts': 0, 'segundos_carga': 0.0, 'segundos_sin_cargadas': 0.0}
+
+    def activar(self, handle):
+        if handle != self.actual:
+            self.driver.switch_to.window(handle)
+            self.actual = handle
+
+    def libres(self):
+        return [handle for handle in self.handles if handle not in self.cargando]
+
+    def navegar(self, handle, url, tarea):
+        """Empieza a cargar `url` en la pestaña y vuelve sin esperar a que termine."""
+        self.activar(handle)
+        self.driver.execute_script(JS_NAVEGAR, url)
+        self.cargando[handle] = (tarea, url, time.monotonic())
+        self.estadisticas['navegaciones'] += 1
+
+    def siguiente(self, timeout=30):
+        """
+        Espera a que alguna pestaña termine de cargar, la deja activa y devuelve
+        (handle, tarea, cargada). Una pestaña que supera `timeout` se devuelve
+        con cargada=False. None si no hay ninguna cargando.
+        """
+        inicio = time.monotonic()
+        while self.cargando:
+            # Se empieza por la que lleva más tiempo cargando
+            for handle, (tarea, url, desde) in sorted(self.cargando.items(), key=lambda item: item[1][2]):
+                self.activar(handle)
+                try:
+                    cargada = self.driver.execute_script(JS_CARGADA)
+                except Exception as e:
+                    if es_error_de_sesion(e):
+                        raise
+                    cargada = False  # El documento se está sustituyendo
+                segundos = time.monotonic() - desde
+                if cargada or segundos >= timeout:
+                    del self.cargando[handle]
+                    self.estadisticas['segundos_carga'] += segundos
+                    self.estadisticas['timeouts'] += not cargada
+                    trazador.registrar('carga_pestana', segundos, 'ok' if cargada else 'timeout', url=url)
+                    self.estadisticas['segundos_sin_cargadas'] += time.monotonic() - inicio
+                    return handle, tarea, cargada
+            time.sleep(INTERVALO_SONDEO)
+        return None
+
+    def abandonar(self):
+        """Devuelve las tareas de las pestañas que estaban cargando (el navegador se va a cerrar)."""
+        tareas = [tarea for tarea, _, _ in self.cargando.values()]
+        self.cargando.clear()
+        return tareas
+
+    def resumen(self):
+        datos = self.estadisticas
+        navegaciones = datos['navegaciones'] or 1
+        print(f"\n=== Pestañas ({len(self.handles)} en un navegador) ===")
+        print(f"Navegaciones: {datos['navegaciones']} (timeouts: {datos['timeouts']}), "
+              f"carga media {datos['segundos_carga'] / navegaciones:.2f}s, "
+              f"{datos['segundos_sin_cargadas']:.1f}s esperando sin ninguna pestaña cargada")
+
+def recorrer(pestanas, tareas, url, extraer, timeout=30):
+    """
+    Generador para recorrer una lista de tareas sin cola: mantiene todas las
+    pestañas cargando y devuelve (tarea, resultado) según terminan. `url(tarea)`
+    da la URL y `extraer(driver, tarea)` el resultado; un error de extracción o
+    una pestaña que no termina de cargar en `timeout` se devuelve como resultado
+    (salvo los errores de sesión, que se propagan).
+    """
+    tareas = iter(tareas)
+    while True:
+        for handle in pestanas.libres():
+            tarea = next(tareas, None)
+            if tarea is None:
+                break
+            pestanas.navegar(handle, url(tarea), tarea)
+        cargada = pestanas.siguiente(timeout)
+        if cargada is None:
+            return
+        handle, tarea, completa = cargada
+        if not completa:
+            yield tarea, ErrorCargaPestana(f"la pestaña no terminó de cargar en {timeout}s")
+            continue
+        try:
+            resultado = extraer(pestanas.driver, tarea)
+        except Exception as e:
+            if es_error_de_sesion(e):
+                raise
+            resultado = e
+        yield tarea, resultado
+
+def procesos_navegador(driver):
+    """PIDs de chromedriver, del navegador y de todos sus procesos hijos (Linux, /proc)."""
+    raices = {pid for pid in (getattr(getattr(getattr(driver, 'service', None), 'process', None), 'pid', None),
+                              getattr(driver, 'browser_pid', None)) if pid}
+    hijos = {}
+    for entrada in os.listdir('/proc'):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entrada}/stat') as f:
+                # El nombre del proceso va entre paréntesis y puede contener espacios
+                padre = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        hijos.setdefault(padre, []).append(int(entrada))
+    procesos = set()
+    pendientes = list(raices)
+    while pendientes:
+        pid = pendientes.pop()
+        if pid not in procesos:
+            procesos.add(pid)
+            pendientes.extend(hijos.get(pid, []))
+    return procesos
+
+def memoria_procesos(pids):
+    """
+    Memoria de un conjunto de procesos en bytes: {'rss', 'pss', 'procesos'}.
+    La suma de RSS cuenta varias veces las páginas compartidas entre los
+    procesos de Chrome; PSS las reparte y se acerca más a la memoria real.
+    """
+    rss = pss = 0
+    vivos = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                for linea in f:
+                    if linea.startswith('VmRSS:'):
+                        rss += int(linea.split()[1]) * 1024
+                        break
+            vivos += 1
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for linea in f:
+                    if linea.startswith('Pss:'):
+                        pss += int(linea.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return {'rss': rss, 'pss': pss, 'procesos': vivos}
+
+def memoria_navegador(driver):
+    """Memoria de un navegador con todos sus procesos (ver memoria_procesos)."""
+    return memoria_procesos(procesos_navegador(driver))
@@ -0,0 +1,142 @@
+import os
+import time
+import queue
+import threading
+
+class PoolSesiones:
+    """
+    Mantiene navegadores de reserva ya arrancados y preparados (cookies aceptadas,
+    página inicial cargada) para sustituir al instante una sesión que falla.
+
+    Cada navegador usa su propio directorio de perfil persistente, así que las
+    cookies de consentimiento sobreviven entre reinicios y entre ejecuciones.
+    Los arranques y los cierres se hacen en un hilo en segundo plano.
+
+    `crear(directorio_perfil)` arranca un navegador y lo devuelve;
+    `preparar(driver)` lo deja listo para trabajar (devuelve False si falla).
+    """
+
+    def __init__(self, crear, preparar=None, reservas=1, directorio_perfiles='perfiles', nombre='sesion'):
+        self.crear = crear
+        self.preparar = preparar
+        self.reservas = reservas
+        self.listos = queue.Queue()
+        self.perfiles_libres = queue.Queue()
+        self.perfil_de = {}
+        self.lock = threading.Lock()
+        self.cerrado = False
+        self.estadisticas = {'arranques': 0, 'segundos_arranque': 0.0, 'fallos_arranque': 0,
+                             'reemplazos': 0, 'segundos_reemplazo': 0.0}
+
+        # Un perfil para la sesión activa y otro por cada reserva
+        for n in range(reservas + 1):
+            ruta = os.path.abspath(os.path.join(directorio_perfiles, f"{nombre}_{n}"))
+            os.makedirs(ruta, exist_ok=True)
+            self.perfiles_libres.put(ruta)
+
+        self.tareas = queue.Queue()
+        self.hilo = threading.Thread(target=self._trabajar, daemon=True)
+        self.hilo.start()
+        for _ in range(reservas):
+            self.tareas.put(('arrancar', None))
+
+    def _trabajar(self):
+        """Hilo de fondo: arranca reservas y cierra navegadores descartados."""
+        while True:
+            accion, driver = self.tareas.get()
+            if accion == 'parar':
+                return
+            if accion == 'cerrar':
+                self._cerrar_driver(driver)
+            elif accion == 'arrancar' and not self.cerrado:
+                nuevo = self._arrancar()
+                if nuevo is not None:
+                    self.listos.put(nuevo)
+
+    def _arrancar(self):
+        """Arranca y prepara un navegador en un perfil libre. Devuelve None si falla."""
+        perfil = self.perfiles_libres.get()
+        inicio = time.monotonic()
+        driver = None
+        try:
+            driver = self.crear(perfil)
+            if self.preparar and self.preparar(driver) is False:
+                raise Exception("no se pudo preparar la sesión")
+            with self.lock:
+                self.perfil_de[id(driver)] = perfil
+                self.estadisticas['arranques'] += 1
+                self.estadisticas['segundos_arranque'] += time.monotonic() - inicio
+            return driver
+        except Exception as e:
+            print(f"Pool: error arrancando un navegador de reserva: {str(e)}")
+            self.estadisticas['fallos_arranque'] += 1
+            if driver is not None:
+                try:
+                    driver.quit()
+                except:
+                    pass
+            self.perfiles_libres.put(perfil)
+            return None
+
+    def _cerrar_driver(self, driver):
+        try:
+            driver.quit()
+        except:
+            pass
+        with self.lock:
+            perfil = self.perfil_de.pop(id(driver), None)
+        if perfil:
+            self.perfiles_libres.put(perfil)
+
+    def obtener(self, timeout=120):
+        """Devuelve un navegador preparado: de la reserva si hay, si no uno nuevo."""
+        try:
+            driver = self.listos.get_nowait()
+        except queue.Empty:
+            driver = None
+            if self.reservas:
+                # Hay una reserva en camino: esperarla suele ser más rápido que arrancar otra
+                try:
+                    driver = self.listos.get(timeout=timeout)
+                except queue.Empty:
+                    pass
+            if driver is None:
+                driver = self._arrancar()
+        if driver is not None and self.reservas:
+            self.tareas.put(('arrancar', None))
+        return driver
+
+    def reemplazar(self, driver_actual=None):
+        """Descarta el navegador actual (se cierra en segundo plano) y devuelve uno preparado."""
+        inicio = time.monotonic()
+        if driver_actual is not None:
+            self.tareas.put(('cerrar', driver_actual))
+        nuevo = self.obtener()
+        self.estadisticas['reemplazos'] += 1
+        self.estadisticas['segundos_reemplazo'] += time.monotonic() - inicio
+        return nuevo
+
+    def liberar(self, driver):
+        """Cierra un navegador obtenido del pool y libera su perfil."""
+        self._cerrar_driver(driver)
+
+    def cerrar(self):
+        """Cierra las reservas que queden y para el hilo de fondo."""
+        self.cerrado = True
+        self.tareas.put(('parar', None))
+        self.hilo.join(timeout=60)
+        while True:
+            try:
+                self._cerrar_driver(self.listos.get_nowait())
+            except queue.Empty:
+                break
+
+    def resumen(self):
+        """Imprime cuánto se ha ahorrado respecto a arrancar en frío en cada reinicio."""
+        datos = self.estadisticas
+        arranque_medio = datos['segundos_arranque'] / datos['arranques'] if datos['arranques'] else 0.0
+        ahorro = datos['reemplazos'] * arranque_medio - datos['segundos_reemplazo']
+        print("\n=== Pool de sesiones ===")
+        print(f"Arranques: {datos['arranques']} ({arranque_medio:.1f}s de media, {datos['fallos_arranque']} fallidos)")
+        print(f"Reemplazos: {datos['reemplazos']} ({datos['segundos_reemplazo']:.2f}s esperando en total)")
+        print(f"Ahorro estimado frente a arranques en frío: {ahorro:.1f}s")
@@ -0,0 +1,95 @@
+from scraper_waits import es_error_de_sesion
+
+# Perfil "ligero" del navegador: sin interfaz, ventana pequeña fija y sin
+# descargar imágenes, vídeo, fuentes ni scripts de analítica/publicidad, que
+# no hacen falta para leer los precios.
+TAMANO_VENTANA = (1280, 900)
+
+PATRONES_BLOQUEADOS = [
+    # Imágenes
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    # Fuentes
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # Vídeo y audio
+    '*.mp4', '*.webm', '*.m3u8', '*.mp3',
+    # Analítica, publicidad y tags de terceros
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*googleadservices.com*', '*facebook.net*',
+    '*facebook.com/tr*', '*connect.facebook*', '*hotjar.com*', '*criteo.*',
+    '*tiktok.com*', '*bat.bing.com*', '*clarity.ms*', '*newrelic.com*',
+    '*nr-data.net*', '*adsrvr.org*', '*taboola.com*', '*outbrain.com*',
+    '*contentsquare.net*', '*qualtrics.com*', '*pinterest.com*', '*twitter.com*'
+]
+
+# Bytes transferidos desde la última medición en el documento actual. Los
+# recursos de otros dominios sin Timing-Allow-Origin cuentan como 0 bytes,
+# así que la cifra es una cota inferior, pero comparable entre perfiles.
+JS_MEDIR_TRAFICO = """
+const recursos = performance.getEntriesByType('resource');
+const navegacion = performance.getEntriesByType('navigation')[0];
+const contado = window.__traficoContado || {recursos: 0, navegacion: false};
+let bytes = 0;
+for (let i = contado.recursos; i < recursos.length; i++) bytes += recursos[i].transferSize || 0;
+let cargaMs = null;
+if (navegacion && !contado.navegacion) {
+    bytes += navegacion.transferSize || 0;
+    if (navegacion.loadEventEnd > 0) cargaMs = navegacion.loadEventEnd - navegacion.startTime;
+}
+const nuevos = recursos.length - contado.recursos;
+window.__traficoContado = {recursos: recursos.length, navegacion: !!navegacion};
+return {bytes: bytes, recursos: nuevos, cargaMs: cargaMs};
+"""
+
+def aplicar_perfil(driver, ligero=False):
+    """Ajusta la ventana y, en el perfil ligero, bloquea los recursos innecesarios por CDP."""
+    if not ligero:
+        driver.maximize_window()
+        return
+    driver.set_window_size(*TAMANO_VENTANA)
+    bloquear_recursos(driver)
+
+def bloquear_recursos(driver):
+    """Bloqueo por CDP de PATRONES_BLOQUEADOS. Solo afecta a la pestaña activa."""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': PATRONES_BLOQUEADOS})
+    except Exception as e:
+        print(f"No se pudo activar el bloqueo de recursos: {e}")
+
+class MedidorTrafico:
+    """Acumula bytes transferidos, recursos y tiempo de carga por categoría."""
+
+    def __init__(self):
+        self.categorias = {}
+
+    def medir(self, driver, categoria):
+        """Suma a la categoría lo transferido por la página actual desde la última medición."""
+        try:
+            datos = driver.execute_script(JS_MEDIR_TRAFICO)
+        except Exception as e:
+            if es_error_de_sesion(e):
+                raise
+            return None
+        total = self.categorias.setdefault(categoria, {'bytes': 0, 'recursos': 0, 'cargas': 0, 'carga_ms': 0.0})
+        total['bytes'] += datos['bytes']
+        total['recursos'] += datos['recursos']
+        if datos['cargaMs'] is not None:
+            total['cargas'] += 1
+            total['carga_ms'] += datos['cargaMs']
+        return datos
+
+    def resumen(self):
+        """Imprime el tráfico y el tiempo de carga medio de cada categoría y el total."""
+        if not self.categorias:
+            return
+        print("\n=== Tráfico por categoría ===")
+        for categoria, datos in self.categorias.items():
+            carga = f"{datos['carga_ms'] / datos['cargas']:.0f} ms" if datos['cargas'] else "-"
+            print(f"{categoria}: {datos['bytes'] / 1024:.0f} KB en {datos['recursos']} recursos, carga media {carga}")
+        total_bytes = sum(datos['bytes'] for datos in self.categorias.values())
+        cargas = sum(datos['cargas'] for datos in self.categorias.values())
+        carga_ms = sum(datos['carga_ms'] for datos in self.categorias.values())
+        carga_media = f"{carga_ms / cargas:.0f} ms" if cargas else "-"
+        print(f"Total: {total_bytes / 1024 / 1024:.1f} MB, carga media {carga_media}")
+
+medidor_trafico = MedidorTrafico()
@@ -0,0 +1,78 @@
+import re
+import json
+import base64
+from scraper_tracing import trazador
+
+# Respuestas de red de la página leídas por el protocolo DevTools en lugar de
+# volver a sacar los datos del DOM renderizado. Chrome tiene que arrancar con el
+# registro de rendimiento activado (crear_driver(..., registro_red=True), que
+# fija goog:loggingPrefs performance): cada get_log('performance') devuelve los
+# eventos Network.* desde la lectura anterior y el cuerpo de una respuesta
+# terminada se pide con Network.getResponseBody.
+#
+# El registro se vacía al leerlo: una CapturaRed por navegador y leyendo a menudo
+# para que chromedriver no acumule eventos.
+
+TIPOS_XHR = ('XHR', 'Fetch')
+
+class CapturaRed:
+    """Cuerpos JSON de las peticiones XHR/fetch cuya URL cumple `patron`."""
+
+    def __init__(self, driver, patron):
+        self.driver = driver
+        self.patron = re.compile(patron) if isinstance(patron, str) else patron
+        self.en_curso = {}  # requestId -> (url, timestamp) de respuestas recibidas y aún sin terminar
+        self.estadisticas = {'eventos': 0, 'respuestas': 0, 'bytes': 0, 'errores': 0}
+
+    def respuestas(self, desde=None):
+        """
+        Respuestas terminadas desde la última llamada: [(url, datos JSON)] en el
+        orden en que terminaron. Con `desde` (milisegundos epoch, por ejemplo
+        performance.timeOrigin de la página) se descartan las anteriores.
+        Lanza WebDriverException si el navegador no tiene el registro activado.
+        """
+        terminadas = []
+        for entrada in self.driver.get_log('performance'):
+            self.estadisticas['eventos'] += 1
+            mensaje = json.loads(entrada['message'])['message']
+            metodo = mensaje.get('method')
+            parametros = mensaje.get('params', {})
+            if metodo == 'Network.responseReceived':
+                respuesta = parametros.get('response', {})
+                if (parametros.get('type') in TIPOS_XHR and 'json' in respuesta.get('mimeType', '')
+                        and self.patron.search(respuesta.get('url', ''))):
+                    self.en_curso[parametros['requestId']] = (respuesta['url'], entrada.get('timestamp', 0))
+            elif metodo == 'Network.loadingFinished' and parametros.get('requestId') in self.en_curso:
+                url, instante = self.en_curso.pop(parametros['requestId'])
+                if desde is None or instante >= desde:
+                    terminadas.append((parametros['requestId'], url))
+            elif metodo == 'Network.loadingFailed':
+                self.en_curso.pop(parametros.get('requestId'), None)
+
+        resultado = []
+        for id_peticion, url in terminadas:
+            try:
+                with trazador.span('cuerpo_respuesta', url=url):
+                    cuerpo = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': id_peticion})
+                texto = cuerpo.get('body', '')
+                if cuerpo.get('base64Encoded'):
+                    texto = base64.b64decode(texto).decode('utf-8')
+                resultado.append((url, json.loads(texto)))
+            except Exception as e:
+                # El cuerpo ya no está disponible (otra navegación) o no es JSON
+                self.estadisticas['errores'] += 1
+                print(f"No se pudo leer la respuesta de {url}: {e}")
+                continue
+            self.estadisticas['respuestas'] += 1
+            self.estadisticas['bytes'] += len(texto)
+        return resultado
+
+    def descartar(self):
+        """Vacía el registro sin leer los cuerpos (por ejemplo, antes de una navegación)."""
+        self.driver.get_log('performance')
+        self.en_curso.clear()
+
+    def resumen(self):
+        datos = self.estadisticas
+        print(f"Red: {datos['respuestas']} respuestas JSON ({datos['bytes'] / 1024:.0f} KB) de {datos['eventos']} eventos, "
+              f"{datos['errores']} sin cuerpo")
@@ -0,0 +1,322 @@
+import os
+import re
+import csv
+import json
+import time
+import argparse
+import lxml.html
+from urllib.parse import urljoin
+from datetime import datetime
+from selenium.common.exceptions import NoSuchElementException
+from scraper_waits import JS_ESTADO, JS_INSTRUMENTAR
+from scraper_profile import JS_MEDIR_TRAFICO
+from scraper_common import crear_driver
+from mock_server import iniciar_servidor
+from mercadona_parser import JS_HTML_REJILLA, parsear_productos_html
+from carrefour_parser import JS_EXTRAER_ESTADO, JS_EXTRAER_TARJETAS, parsear_estado_html, parsear_tarjetas_html, construir_producto as construir_producto_carrefour
+from alcampo_parser import JS_CAMPOS_BARATOS, JS_EXTRAER_LOTE, campo_disponibilidad, campo_precio, campo_url, parsear_lote_html, procesar_lote
+
+# Grabación de páginas renderizadas como fixtures y reproducción sin red ni
+# navegador: cada supermercado tiene un parser que recibe el HTML guardado y
+# devuelve los mismos registros que el scraper en vivo.
+#
+# Límite: la reproducción no ejecuta los scripts de extracción. DriverReplay
+# responde a JS_EXTRAER_TARJETAS, JS_EXTRAER_ESTADO y JS_EXTRAER_LOTE con sus
+# equivalentes de lxml, que comparten los selectores (SELECTORES de cada
+# parser) pero no el código: un error en el JavaScript, o diferencias como
+# innerText frente a text_content(), no se ven aquí. Con --navegador cada
+# página grabada se abre en Chrome sin interfaz (servida por mock_server.py),
+# se ejecutan los scripts reales y se comparan con los de lxml.
+SITIOS = ['mercadona', 'carrefour', 'alcampo']
+
+# Supermercados cuyos scripts de extracción tienen un equivalente en lxml
+SITIOS_NAVEGADOR = ['carrefour', 'alcampo']
+
+JS_HTML_PAGINA = "return document.documentElement.outerHTML;"
+
+def nombre_fixture(categoria):
+    """Nombre de archivo a partir de la categoría ('Aceite, especias y salsas > Aceite' -> 'aceite_especias_y_salsas_aceite')."""
+    return re.sub(r'[^0-9a-záéíóúüñ]+', '_', categoria.lower()).strip('_') or 'pagina'
+
+class GrabadorHTML:
+    """Guarda el HTML renderizado de las páginas de categoría (se activa con --grabar-html)."""
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio
+
+    def grabar(self, driver, sitio, categoria):
+        """Guarda la página actual en <directorio>/<sitio>/ y la añade al índice."""
+        if not self.directorio:
+            return None
+        try:
+            html = driver.execute_script(JS_HTML_PAGINA)
+            url = driver.current_url
+        except Exception as e:
+            print(f"No se pudo grabar la página de {categoria}: {e}")
+            return None
+
+        carpeta = os.path.join(self.directorio, sitio)
+        os.makedirs(carpeta, exist_ok=True)
+        base = nombre_fixture(categoria)
+        archivo = f"{base}.html"
+        n = 1
+        while os.path.exists(os.path.join(carpeta, archivo)):
+            n += 1
+            archivo = f"{base}_{n}.html"
+        with open(os.path.join(carpeta, archivo), 'w', encoding='utf-8') as f:
+            f.write(html)
+
+        indice = cargar_indice(self.directorio, sitio)
+        indice.append({'archivo': archivo, 'categoria': categoria, 'url': url,
+                       'fecha': datetime.now().strftime('%Y-%m-%d')})
+        with open(os.path.join(carpeta, 'indice.json'), 'w', encoding='utf-8') as f:
+            json.dump(indice, f, ensure_ascii=False, indent=1)
+        return archivo
+
+grabador_html = GrabadorHTML()
+
+def cargar_indice(directorio, sitio):
+    ruta = os.path.join(directorio, sitio, 'indice.json')
+    if not os.path.isfile(ruta):
+        return []
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+def cargar_fixtures(directorio, sitio):
+    """Devuelve [(entrada del índice, html)] de las páginas grabadas de un supermercado."""
+    fixtures = []
+    for entrada in cargar_indice(directorio, sitio):
+        with open(os.path.join(directorio, sitio, entrada['archivo']), encoding='utf-8') as f:
+            fixtures.append((entrada, f.read()))
+    return fixtures
+
+def reproducir_mercadona(html, entrada):
+    return parsear_productos_html(html, entrada['categoria'], entrada['fecha'])
+
+def reproducir_carrefour(html, entrada):
+    categoria = {'titulo': entrada['categoria'], 'url': entrada['url']}
+    return [construir_producto_carrefour(tarjeta, categoria, entrada['fecha']) for tarjeta in parsear_tarjetas_html(html)]
+
+def reproducir_carrefour_estado(html, entrada):
+    """Como reproducir_carrefour, con el modo de extracción 'estado' (sin scroll)."""
+    categoria = {'titulo': entrada['categoria'], 'url': entrada['url']}
+    tarjetas, _ = parsear_estado_html(html)
+    return [construir_producto_carrefour(tarjeta, categoria, entrada['fecha']) for tarjeta in tarjetas]
+
+def reproducir_alcampo(html, entrada):
+    return procesar_lote(parsear_lote_html(html, entrada['url']), entrada['categoria'], set(), entrada['fecha'])
+
+def texto_normalizado(nodo):
+    return re.sub(r'\s+', ' ', nodo.text_content()).strip()
+
+class ElementoReplay:
+    """Elemento de DriverReplay: responde a las consultas de WebDriver sobre un nodo de lxml."""
+
+    def __init__(self, driver, nodo):
+        self.driver = driver
+        self.nodo = nodo
+
+    def find_elements(self, by, selector):
+        self.driver.llamada()
+        return [ElementoReplay(self.driver, nodo) for nodo in self.nodo.cssselect(selector)]
+
+    def find_element(self, by, selector):
+        elementos = self.find_elements(by, selector)
+        if not elementos:
+            raise NoSuchElementException(f"No existe {selector}")
+        return elementos[0]
+
+    def get_attribute(self, nombre):
+        self.driver.llamada()
+        if nombre == 'outerHTML':
+            return lxml.html.tostring(self.nodo, encoding='unicode')
+        if nombre == 'innerHTML':
+            return ''.join(lxml.html.tostring(hijo, encoding='unicode') for hijo in self.nodo)
+        if nombre in ('textContent', 'innerText'):
+            return self.nodo.text_content()
+        if nombre == 'href' and self.nodo.get('href') is not None:
+            # Como la propiedad del navegador: URL absoluta
+            return urljoin(self.driver.current_url, self.nodo.get('href'))
+        return self.nodo.get(nombre, '' if nombre in ('class', 'style') else None)
+
+    @property
+    def text(self):
+        self.driver.llamada()
+        return texto_normalizado(self.nodo)
+
+class DriverReplay:
+    """
+    Driver falso sobre una página grabada, para ejecutar las funciones de
+    extracción de los scrapers sin navegador. Entiende los scripts que usan los
+    scrapers (esperas, rejilla, tarjetas, lotes, comprobaciones de tarjeta) y
+    cuenta las llamadas a WebDriver; con `latencia` cada llamada espera esos
+    segundos, como el viaje de ida y vuelta al navegador real.
+    """
+
+    def __init__(self, html, url='', latencia=0.0):
+        self.html = html
+        self.documento = lxml.html.fromstring(html)
+        self.current_url = url
+        self.latencia = latencia
+        self.llamadas = 0
+        self.switch_to = self
+
+    def default_content(self):
+        pass
+
+    def llamada(self):
+        self.llamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+
+    def get(self, url):
+        self.llamada()
+        self.current_url = url
+
+    def find_elements(self, by, selector):
+        self.llamada()
+        return [ElementoReplay(self, nodo) for nodo in self.documento.cssselect(selector)]
+
+    def find_element(self, by, selector):
+        elementos = self.find_elements(by, selector)
+        if not elementos:
+            raise NoSuchElementException(f"No existe {selector}")
+        return elementos[0]
+
+    def execute_script(self, script, *args):
+        self.llamada()
+        if script == JS_ESTADO:
+            selector = args[0] if args else None
+            return {'instalado': True, 'readyState': 'complete', 'enCurso': 0, 'msSilencio': 60000,
+                    'elementos': len(self.documento.cssselect(selector)) if selector else -1}
+        if script == JS_EXTRAER_ESTADO:
+            tarjetas, pendientes = parsear_estado_html(self.html)
+            return json.dumps({'tarjetas': tarjetas, 'pendientes': pendientes})
+        if script == JS_HTML_REJILLA:
+            return ''.join(lxml.html.tostring(nodo, encoding='unicode')
+                           for nodo in self.documento.cssselect('div.product-cell[data-testid="product-cell"]'))
+        if script == JS_HTML_PAGINA:
+            return self.html
+        if script == JS_EXTRAER_LOTE:
+            return parsear_lote_html(self.html, self.current_url)
+        if script == JS_CAMPOS_BARATOS:
+            precio = campo_precio(args[0].nodo, self.current_url)
+            return {'url': campo_url(args[0].nodo, self.current_url),
+                    'precio': precio.replace('€', '').strip() if precio is not None else None,
+                    'disponibilidad': campo_disponibilidad(args[0].nodo, self.current_url)}
+        if 'scrollHeight' in script:
+            return len(self.html)
+        if script == JS_MEDIR_TRAFICO:
+            return {'bytes': 0, 'recursos': 0, 'cargaMs': None}
+        if script == JS_INSTRUMENTAR or 'scrollIntoView' in script or 'scrollBy' in script:
+            return None
+        if 'getBoundingClientRect' in script:
+            return True
+        if 'textContent' in script:
+            return texto_normalizado(args[0].nodo)
+        selectores = re.findall(r"querySelector\('([^']+)'\)", script)
+        if selectores and args:
+            existe = bool(args[0].nodo.cssselect(selectores[0]))
+            # Comprobación de tarjeta válida: "es banner || ... || !querySelector(...)"
+            if 'trade-banner' in script:
+                return 'trade-banner' in (args[0].nodo.get('class') or '') or not existe
+            return existe
+        return None
+
+    def execute_async_script(self, script, *args):
+        self.llamada()
+        if script == JS_EXTRAER_TARJETAS:
+            return json.dumps(parsear_tarjetas_html(self.html))
+        return None
+
+    def set_script_timeout(self, segundos):
+        pass
+
+    def execute_cdp_cmd(self, comando, parametros):
+        self.llamada()
+        return {}
+
+# Parser de cada supermercado: (html, entrada del índice) -> registros
+REPRODUCTORES = {
+    'mercadona': reproducir_mercadona,
+    'carrefour': reproducir_carrefour,
+    'alcampo': reproducir_alcampo
+}
+
+def reproducir(directorio, sitio):
+    """Pasa todas las páginas grabadas de un supermercado por su parser."""
+    productos = []
+    for entrada, html in cargar_fixtures(directorio, sitio):
+        registros = REPRODUCTORES[sitio](html, entrada)
+        print(f"{sitio} - {entrada['categoria']} ({entrada['archivo']}): {len(registros)} productos")
+        productos.extend(registros)
+    return productos
+
+def extraer_navegador(driver, sitio):
+    """Resultado de los scripts de extracción reales sobre la página abierta en el navegador."""
+    if sitio == 'carrefour':
+        driver.set_script_timeout(30)
+        return {'tarjetas': json.loads(driver.execute_async_script(JS_EXTRAER_TARJETAS, 2000)),
+                'estado': json.loads(driver.execute_script(JS_EXTRAER_ESTADO))}
+    return {'lote': driver.execute_script(JS_EXTRAER_LOTE)}
+
+def extraer_lxml(html, sitio, url):
+    """Lo mismo con los equivalentes de lxml que usa DriverReplay."""
+    if sitio == 'carrefour':
+        tarjetas, pendientes = parsear_estado_html(html)
+        return {'tarjetas': parsear_tarjetas_html(html), 'estado': {'tarjetas': tarjetas, 'pendientes': pendientes}}
+    return {'lote': parsear_lote_html(html, url)}
+
+def comparar_con_navegador(directorio, sitios):
+    """
+    Abre cada página grabada en Chrome sin interfaz y compara los scripts de
+    extracción con sus equivalentes de lxml. Devuelve el número de diferencias.
+    """
+    servidor, url_base = iniciar_servidor(directorio)
+    driver = crear_driver(ligero=True)
+    diferencias = 0
+    try:
+        for sitio in sitios:
+            for entrada, html in cargar_fixtures(directorio, sitio):
+                driver.get(f"{url_base}/{sitio}/{entrada['archivo']}")
+                navegador = extraer_navegador(driver, sitio)
+                replica = extraer_lxml(html, sitio, driver.current_url)
+                for script, resultado in navegador.items():
+                    if resultado == replica[script]:
+                        print(f"{sitio} - {entrada['archivo']} ({script}): iguales")
+                        continue
+                    diferencias += 1
+                    print(f"{sitio} - {entrada['archivo']} ({script}): DIFERENTES")
+                    print(f"  navegador: {json.dumps(resultado, ensure_ascii=False)[:2000]}")
+                    print(f"  lxml:      {json.dumps(replica[script], ensure_ascii=False)[:2000]}")
+    finally:
+        driver.quit()
+        servidor.shutdown()
+    return diferencias
+
+def main():
+    parser = argparse.ArgumentParser(description='Reproduce las páginas grabadas con los parsers de cada supermercado, sin red ni navegador')
+    parser.add_argument('--directorio', default=os.path.join('fixtures', 'html'))
+    parser.add_argument('--sitio', choices=SITIOS, action='append', help='Supermercado a reproducir (por defecto todos)')
+    parser.add_argument('--salida', help='Guardar los registros de cada supermercado en <salida>_<sitio>.csv')
+    parser.add_argument('--navegador', action='store_true',
+                        help='Ejecutar los scripts de extracción reales en Chrome sin interfaz y compararlos con los parsers de lxml')
+    args = parser.parse_args()
+
+    if args.navegador:
+        sitios = [sitio for sitio in args.sitio or SITIOS if sitio in SITIOS_NAVEGADOR]
+        diferencias = comparar_con_navegador(args.directorio, sitios)
+        print(f"\n{diferencias} resultado(s) distintos entre el navegador y lxml")
+        return
+
+    for sitio in args.sitio or SITIOS:
+        productos = reproducir(args.directorio, sitio)
+        print(f"Total {sitio}: {len(productos)} productos\n")
+        if args.salida and productos:
+            with open(f"{args.salida}_{sitio}.csv", 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=productos[0].keys())
+                writer.writeheader()
+                writer.writerows(productos)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import re
+import time
+import queue
+import random
+import threading
+import contextlib
+import multiprocessing
+from collections import deque
+from scraper_tracing import trazador
+
+# Control adaptativo del ritmo de las peticiones (AIMD, como el control de
+# congestión de TCP). Cada página cargada aporta su latencia y si terminó en
+# error, en una página de bloqueo o en una sesión caída:
+#
+#   - mientras todo va bien, la pausa entre peticiones baja un `paso` fijo por
+#     página (aumento aditivo del ritmo) y, tras `ventana` páginas seguidas sin
+#     problemas, se permite una sesión paralela más;
+#   - ante un bloqueo, una sesión caída, una tasa de errores por encima de
+#     `umbral_errores` en la ventana o una latencia `factor_latencia` veces por
+#     encima de la mejor observada, la pausa se multiplica por `factor` y las
+#     sesiones se reducen a la mitad (disminución multiplicativa).
+#
+# Tras una reducción se ignoran las señales de congestión hasta que llegan
+# tantas respuestas como sesiones había: son de peticiones que ya estaban en
+# vuelo y no deben volver a reducir.
+
+# Textos de las páginas de bloqueo de los antibots habituales
+MARCAS_BLOQUEO = re.compile(
+    r'access denied|acceso denegado|captcha|are you a robot|verify you are human|pardon our interruption'
+    r'|request unsuccessful|incapsula|too many requests|demasiadas peticiones|has sido bloqueado|403 forbidden',
+    re.IGNORECASE
+)
+
+JS_TEXTO_PAGINA = "return [document.title, document.body ? document.body.innerText.slice(0, 3000) : ''];"
+
+def pagina_bloqueada(driver):
+    """Indica si la página actual es una página de bloqueo o captcha (una llamada a WebDriver)."""
+    try:
+        titulo, texto = driver.execute_script(JS_TEXTO_PAGINA)
+    except Exception:
+        return False
+    return bool(MARCAS_BLOQUEO.search(f"{titulo}\n{texto}"))
+
+def texto_bloqueado(texto):
+    """Lo mismo para el cuerpo de una respuesta HTTP."""
+    return bool(texto) and bool(MARCAS_BLOQUEO.search(texto[:3000]))
+
+class ControladorRitmo:
+    """Pausa entre peticiones y número de sesiones paralelas ajustados con AIMD."""
+
+    def __init__(self, **parametros):
+        self.lock = threading.Lock()
+        self.condicion = threading.Condition(self.lock)
+        self.en_vuelo = 0
+        self.remoto = None
+        self.configurar(**parametros)
+
+    def configurar(self, pausa_inicial=3.0, pausa_min=0.5, pausa_max=60.0, paso=0.1, factor=2.0,
+                   sesiones_max=1, sesiones_iniciales=1, ventana=20, umbral_errores=0.2, factor_latencia=3.0,
+                   adaptativo=True):
+        """Fija los parámetros y reinicia el estado. Con adaptativo=False solo se cuentan las señales (ritmo fijo)."""
+        with self.lock:
+            self.adaptativo = adaptativo
+            self.pausa_min = pausa_min
+            self.pausa_max = pausa_max
+            self.paso = paso
+            self.factor = factor
+            self.sesiones_max = max(1, sesiones_max)
+            self.tamano_ventana = ventana
+            self.umbral_errores = umbral_errores
+            self.factor_latencia = factor_latencia
+
+            self.pausa = min(max(pausa_inicial, pausa_min), pausa_max)
+            self.sesiones = min(max(1, sesiones_iniciales), self.sesiones_max)
+            self.ventana = deque(maxlen=ventana)
+            self.latencia_media = None
+            self.latencia_base = None
+            self.muestras_latencia = 0
+            self.exitos_seguidos = 0
+            self.desde_reduccion = 0
+            self.en_vuelo_al_reducir = 0
+            self.estadisticas = {'paginas': 0, 'errores': 0, 'bloqueos': 0, 'fallos_sesion': 0,
+                                 'reducciones': 0, 'aumentos_sesiones': 0, 'segundos_pausa': 0.0,
+                                 'pausa_minima': self.pausa, 'pausa_maxima': self.pausa, 'sesiones_maximas': self.sesiones}
+            self.motivos = {}
+
+    def conectar(self, canales):
+        """En un proceso worker del motor: enviar las señales al controlador del proceso principal."""
+        self.remoto = canales
+
+    def registrar(self, latencia=None, error=False, bloqueado=False, fallo_sesion=False):
+        """Registra el resultado de una página y ajusta el ritmo."""
+        if self.remoto:
+            try:
+                self.remoto[0].put_nowait((latencia, error, bloqueado, fallo_sesion))
+            except queue.Full:
+                pass
+            return
+
+        with self.lock:
+            datos = self.estadisticas
+            datos['paginas'] += 1
+            datos['errores'] += bool(error)
+            datos['bloqueos'] += bool(bloqueado)
+            datos['fallos_sesion'] += bool(fallo_sesion)
+            self.desde_reduccion += 1
+            fallo = error or bloqueado or fallo_sesion
+            self.ventana.append(fallo)
+
+            if latencia is not None and not fallo:
+                self.latencia_media = latencia if self.latencia_media is None else 0.8 * self.latencia_media + 0.2 * latencia
+                self.muestras_latencia += 1
+                if self.muestras_latencia >= 5:
+                    self.latencia_base = min(self.latencia_base or self.latencia_media, self.latencia_media)
+
+            if not self.adaptativo or self.desde_reduccion <= self.en_vuelo_al_reducir:
+                return  # Respuestas de peticiones lanzadas antes de la última reducción
+
+            motivo = 'bloqueo' if bloqueado else 'sesión caída' if fallo_sesion else self._congestion()
+            if motivo:
+                self._reducir(motivo)
+            elif not fallo:
+                self._aumentar()
+
+    def _congestion(self):
+        if len(self.ventana) >= 5 and sum(self.ventana) / len(self.ventana) >= self.umbral_errores:
+            return 'errores'
+        if self.latencia_base and self.muestras_latencia >= 5 and self.latencia_media > self.factor_latencia * self.latencia_base:
+            return 'latencia'
+        return None
+
+    def _reducir(self, motivo):
+        self.pausa = min(self.pausa_max, max(self.pausa, self.paso) * self.factor)
+        self.en_vuelo_al_reducir = self.sesiones
+        self.sesiones = max(1, self.sesiones // 2)
+        self.ventana.clear()
+        self.exitos_seguidos = 0
+        self.desde_reduccion = 0
+        self.muestras_latencia = 0
+        self.latencia_media = None
+        self.estadisticas['reducciones'] += 1
+        self.estadisticas['pausa_maxima'] = max(self.estadisticas['pausa_maxima'], self.pausa)
+        self.motivos[motivo] = self.motivos.get(motivo, 0) + 1
+        self.condicion.notify_all()
+        print(f"Ritmo: {motivo}, pausa {self.pausa:.2f}s y {self.sesiones} sesión(es)")
+
+    def _aumentar(self):
+        self.pausa = max(self.pausa_min, self.pausa - self.paso)
+        self.estadisticas['pausa_minima'] = min(self.estadisticas['pausa_minima'], self.pausa)
+        self.exitos_seguidos += 1
+        if self.exitos_seguidos >= self.tamano_ventana and self.sesiones < self.sesiones_max:
+            self.sesiones += 1
+            self.exitos_seguidos = 0
+            self.condicion.notify_all()
+            self.estadisticas['aumentos_sesiones'] += 1
+            self.estadisticas['sesiones_maximas'] = max(self.estadisticas['sesiones_maximas'], self.sesiones)
+
+    def pausa_actual(self):
+        return self.remoto[1].value if self.remoto else self.pausa
+
+    def sesiones_permitidas(self):
+        return self.remoto[2].value if self.remoto else self.sesiones
+
+    def esperar(self):
+        """Pausa antes de la siguiente petición (la pausa actual con un ±25% de jitter)."""
+        pausa = self.pausa_actual() * random.uniform(0.75, 1.25)
+        if pausa > 0:
+            time.sleep(pausa)
+            trazador.registrar('pausa', pausa)
+        with self.lock:
+            self.estadisticas['segundos_pausa'] += pausa
+        return pausa
+
+    @contextlib.contextmanager
+    def turno(self):
+        """
+        Para hilos que comparten el controlador: espera a que haya menos peticiones
+        en vuelo que sesiones permitidas y ocupa un hueco mientras dura el bloque.
+        """
+        with self.condicion:
+            while self.en_vuelo >= self.sesiones_permitidas():
+                self.condicion.wait(0.5)
+            self.en_vuelo += 1
+        try:
+            yield
+        finally:
+            with self.condicion:
+                self.en_vuelo -= 1
+                self.condicion.notify()
+
+    def resumen(self):
+        """Imprime las señales recibidas y cómo ha variado el ritmo."""
+        if self.remoto:
+            return
+        datos = self.estadisticas
+        print("\n=== Ritmo adaptativo ===")
+        print(f"Páginas: {datos['paginas']} (errores: {datos['errores']}, bloqueos: {datos['bloqueos']}, "
+              f"sesiones caídas: {datos['fallos_sesion']})")
+        motivos = ', '.join(f"{motivo}: {numero}" for motivo, numero in self.motivos.items()) or 'ninguna'
+        print(f"Reducciones: {datos['reducciones']} ({motivos}); sesiones añadidas: {datos['aumentos_sesiones']}")
+        print(f"Pausa actual {self.pausa:.2f}s (entre {datos['pausa_minima']:.2f}s y {datos['pausa_maxima']:.2f}s), "
+              f"{datos['segundos_pausa']:.1f}s en pausas; sesiones: {self.sesiones} (máximo {datos['sesiones_maximas']})")
+        if self.latencia_base:
+            print(f"Latencia de referencia: {self.latencia_base:.2f}s")
+
+controlador_ritmo = ControladorRitmo()
+
+class RitmoCompartido:
+    """
+    Comparte un controlador entre procesos: los workers le envían sus señales por
+    una cola y leen la pausa y las sesiones permitidas de dos valores compartidos.
+    `canales` se pasa a cada proceso, que llama a controlador_ritmo.conectar(canales).
+    """
+
+    def __init__(self, controlador):
+        self.controlador = controlador
+        self.eventos = multiprocessing.Queue(10000)
+        self.pausa = multiprocessing.Value('d', controlador.pausa)
+        self.sesiones = multiprocessing.Value('i', controlador.sesiones)
+        self.canales = (self.eventos, self.pausa, self.sesiones)
+        self.hilo = threading.Thread(target=self._atender, daemon=True)
+        self.hilo.start()
+
+    def _atender(self):
+        while True:
+            evento = self.eventos.get()
+            if evento is None:
+                return
+            self.controlador.registrar(*evento)
+            self.pausa.value = self.controlador.pausa
+            self.sesiones.value = self.controlador.sesiones
+
+    def cerrar(self):
+        self.eventos.put(None)
+        self.hilo.join(timeout=10)
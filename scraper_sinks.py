@@ -0,0 +1,82 @@
+import os
+import csv
+import time
+import shutil
+from datetime import datetime
+
+class SumideroCSV:
+    """
+    Escribe filas en un CSV a medida que se obtienen, sin acumularlas en memoria.
+
+    Las filas van a `<archivo>.parcial` con un buffer de escritura; cada
+    `filas_por_sync` filas o `segundos_por_sync` segundos se hace flush y fsync,
+    así que un fallo solo pierde lo escrito desde la última sincronización.
+    Al cerrar, el archivo parcial sustituye al definitivo con os.replace
+    (atómico). Si el definitivo ya existía, sus filas se conservan y las nuevas
+    se añaden detrás, como hacía mercadona_csv.
+    """
+
+    def __init__(self, nombre_archivo, filas_por_sync=500, segundos_por_sync=30, buffer=1 << 16):
+        self.nombre_archivo = nombre_archivo
+        self.ruta_parcial = f"{nombre_archivo}.parcial"
+        self.filas_por_sync = filas_por_sync
+        self.segundos_por_sync = segundos_por_sync
+        self.filas = 0
+        self.filas_sin_sync = 0
+        self.ultimo_sync = time.monotonic()
+        self.writer = None
+
+        if os.path.isfile(self.ruta_parcial):
+            # Restos de una ejecución que no llegó a cerrar: se apartan, no se pierden
+            apartado = f"{self.ruta_parcial}.{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            os.replace(self.ruta_parcial, apartado)
+            print(f"Se encontró un CSV parcial de una ejecución anterior, guardado como {apartado}")
+
+        self.columnas = None
+        if os.path.isfile(nombre_archivo):
+            shutil.copyfile(nombre_archivo, self.ruta_parcial)
+            with open(nombre_archivo, newline='', encoding='utf-8') as f:
+                self.columnas = next(csv.reader(f), None)
+        self.archivo = open(self.ruta_parcial, 'a', newline='', encoding='utf-8', buffering=buffer)
+
+    def escribir(self, datos):
+        """Añade filas (diccionarios) al CSV parcial."""
+        if not datos:
+            return
+        if self.writer is None:
+            cabecera_pendiente = self.columnas is None
+            self.columnas = self.columnas or list(datos[0].keys())
+            self.writer = csv.DictWriter(self.archivo, fieldnames=self.columnas)
+            if cabecera_pendiente:
+                self.writer.writeheader()
+        self.writer.writerows(datos)
+        self.filas += len(datos)
+        self.filas_sin_sync += len(datos)
+        if self.filas_sin_sync >= self.filas_por_sync or time.monotonic() - self.ultimo_sync >= self.segundos_por_sync:
+            self.sincronizar()
+
+    def sincronizar(self):
+        """Vacía el buffer y fuerza la escritura a disco."""
+        self.archivo.flush()
+        os.fsync(self.archivo.fileno())
+        self.filas_sin_sync = 0
+        self.ultimo_sync = time.monotonic()
+
+    def cerrar(self):
+        """Sincroniza y mueve el CSV parcial a su nombre definitivo."""
+        if self.archivo.closed:
+            return
+        self.sincronizar()
+        self.archivo.close()
+        if self.filas or not os.path.isfile(self.nombre_archivo):
+            if os.path.getsize(self.ruta_parcial):
+                os.replace(self.ruta_parcial, self.nombre_archivo)
+                print(f"Guardadas {self.filas} filas en {self.nombre_archivo}")
+                return
+        os.remove(self.ruta_parcial)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import argparse
+import functools
+import threading
+from contextlib import contextmanager
+
+# Trazas ligeras de una ejecución: cada fase (categoría, página, lote, navegación,
+# espera, lectura del DOM, parseo, reinicio...) se guarda como un "span" con su
+# duración y resultado en un archivo JSONL, una línea por span. Sin --traza no
+# se escribe nada y cada span cuesta poco más que una llamada a time.perf_counter.
+#
+# Los observadores (por ejemplo, las métricas de scraper_metricas.py) reciben
+# el inicio y el fin de cada span aunque no haya archivo.
+
+class Trazador:
+    """Escribe spans anidados en un archivo JSONL (se activa con activar())."""
+
+    def __init__(self):
+        self.archivo = None
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.siguiente_id = 0
+        self.observadores = []
+
+    def activar(self, ruta):
+        """Empieza a escribir los spans en `ruta` (se añaden al final si ya existe)."""
+        if not ruta:
+            return
+        self.archivo = open(ruta, 'a', encoding='utf-8', buffering=1)
+
+    def cerrar(self):
+        if self.archivo:
+            self.archivo.close()
+            self.archivo = None
+
+    def pila(self):
+        if not hasattr(self.local, 'pila'):
+            self.local.pila = []
+        return self.local.pila
+
+    def nuevo_id(self):
+        with self.lock:
+            self.siguiente_id += 1
+            return f"{os.getpid()}-{self.siguiente_id}"
+
+    def escribir(self, registro):
+        with self.lock:
+            if self.archivo:
+                self.archivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+
+    @contextmanager
+    def span(self, fase, **atributos):
+        """
+        Mide el bloque como un span de la fase indicada. Si el bloque lanza una
+        excepción, el span se guarda con resultado 'error' y la excepción sigue su curso.
+        Dentro del bloque se puede cambiar el resultado con span['resultado'] = ...
+        """
+        if not self.archivo and not self.observadores:
+            yield atributos
+            return
+        for observador in self.observadores:
+            observador.inicio_span(fase, atributos)
+        pila = self.pila()
+        id_span = self.nuevo_id()
+        padre = pila[-1] if pila else None
+        pila.append(id_span)
+        inicio = time.time()
+        t0 = time.perf_counter()
+        try:
+            yield atributos
+        except BaseException as e:
+            atributos['resultado'] = 'error'
+            atributos['error'] = f"{e.__class__.__name__}: {str(e)[:200]}"
+            raise
+        finally:
+            pila.pop()
+            atributos.setdefault('resultado', 'ok')
+            duracion = time.perf_counter() - t0
+            self.escribir({'id': id_span, 'padre': padre, 'fase': fase, 'inicio': round(inicio, 3),
+                           'duracion': round(duracion, 4), **atributos})
+            for observador in self.observadores:
+                observador.fin_span(fase, duracion, atributos)
+
+    def registrar(self, fase, duracion, resultado='ok', **atributos):
+        """Guarda un span ya medido (por ejemplo, una espera que calcula su propia duración)."""
+        if not self.archivo and not self.observadores:
+            return
+        pila = self.pila()
+        self.escribir({'id': self.nuevo_id(), 'padre': pila[-1] if pila else None, 'fase': fase,
+                       'inicio': round(time.time() - duracion, 3), 'duracion': round(duracion, 4),
+                       'resultado': resultado, **atributos})
+        for observador in self.observadores:
+            observador.fin_span(fase, duracion, {'resultado': resultado, **atributos})
+
+    def evento(self, fase, **atributos):
+        """Span de duración cero (reintentos, cambios de sesión...)."""
+        self.registrar(fase, 0.0, atributos.pop('resultado', 'ok'), **atributos)
+
+    def trazar(self, fase, **atributos):
+        """Decorador: registra cada llamada a la función como un span de la fase indicada."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                with self.span(fase, **atributos):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def instrumentar_driver(self, driver):
+        """Envuelve driver.get para que cada navegación quede registrada como un span."""
+        get_original = driver.get
+
+        def get(url):
+            with self.span('navegacion', url=url):
+                return get_original(url)
+
+        driver.get = get
+        return driver
+
+trazador = Trazador()
+
+def leer_traza(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+def resumir(spans, top=10):
+    """Imprime el tiempo por fase (total y propio, sin los spans hijos) y las categorías más lentas."""
+    hijos = {}
+    for span in spans:
+        if span.get('padre'):
+            hijos[span['padre']] = hijos.get(span['padre'], 0.0) + span['duracion']
+
+    fases = {}
+    for span in spans:
+        datos = fases.setdefault(span['fase'], {'numero': 0, 'total': 0.0, 'propio': 0.0, 'errores': 0, 'resultados': {}})
+        datos['numero'] += 1
+        datos['total'] += span['duracion']
+        datos['propio'] += max(span['duracion'] - hijos.get(span['id'], 0.0), 0.0)
+        if span['resultado'] == 'error':
+            datos['errores'] += 1
+        datos['resultados'][span['resultado']] = datos['resultados'].get(span['resultado'], 0) + 1
+
+    raices = sum(span['duracion'] for span in spans if not span.get('padre'))
+    print(f"\n=== Tiempo por fase ({len(spans)} spans, {raices:.1f}s en spans raíz) ===")
+    print(f"{'Fase':<14}{'Número':>8}{'Total (s)':>12}{'Propio (s)':>12}{'% propio':>10}{'Media (ms)':>12}{'Errores':>9}")
+    propio_total = sum(datos['propio'] for datos in fases.values()) or 1.0
+    for fase, datos in sorted(fases.items(), key=lambda item: -item[1]['propio']):
+        print(f"{fase:<14}{datos['numero']:>8}{datos['total']:>12.1f}{datos['propio']:>12.1f}"
+              f"{datos['propio'] / propio_total:>10.1%}{datos['total'] / datos['numero'] * 1000:>12.0f}{datos['errores']:>9}")
+
+    otros = {fase: datos['resultados'] for fase, datos in fases.items() if set(datos['resultados']) - {'ok'}}
+    if otros:
+        print("\nResultados distintos de 'ok':")
+        for fase, resultados in otros.items():
+            print(f"- {fase}: {', '.join(f'{r}={n}' for r, n in resultados.items() if r != 'ok')}")
+
+    categorias = sorted((span for span in spans if span['fase'] == 'categoria'), key=lambda span: -span['duracion'])
+    if categorias:
+        print(f"\n=== {min(top, len(categorias))} categorías más lentas ===")
+        for span in categorias[:top]:
+            print(f"{span['duracion']:>9.1f}s  {span.get('sitio', '')}: {span.get('categoria', '')} "
+                  f"({span.get('productos', '?')} productos, {span['resultado']})")
+    return fases
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumen de una traza JSONL de los scrapers')
+    parser.add_argument('traza', nargs='+', help='Archivo(s) JSONL generados con --traza')
+    parser.add_argument('--top', type=int, default=10, help='Número de categorías lentas a mostrar')
+    args = parser.parse_args()
+
+    spans = [span for ruta in args.traza for span in leer_traza(ruta)]
+    resumir(spans, args.top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import sqlite3
+import hashlib
+from datetime import datetime
+
+# Índice de productos ya vistos, persistente entre ejecuciones y compartido por
+# todas las subcategorías. La clave es un entero de 64 bits sacado del hash de la
+# URL del producto (la tabla no guarda las URLs), así que el índice ocupa poco y
+# no crece en memoria: cada consulta va a SQLite. Por cada producto se guarda la
+# última fila extraída; si los campos baratos de la tarjeta (precio y
+# disponibilidad) no han cambiado, la fila se reutiliza sin leer el resto.
+CAMPOS_FILA = ['titulo', 'formato', 'precio', 'precio_unidad', 'disponibilidad']
+
+def clave_url(url):
+    """Entero de 64 bits con signo a partir de la URL (la probabilidad de colisión es despreciable)."""
+    return int.from_bytes(hashlib.sha1(url.encode('utf-8')).digest()[:8], 'big', signed=True)
+
+class IndiceVistos:
+    """Guarda en SQLite la última fila de cada producto visto, indexada por el hash de su URL."""
+
+    def __init__(self, ruta='vistos.db', filas_por_commit=500):
+        self.ruta = ruta
+        self.filas_por_commit = filas_por_commit
+        self.pendientes = 0
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        with self.conexion:
+            self.conexion.execute("""
+                CREATE TABLE IF NOT EXISTS vistos (
+                    clave INTEGER PRIMARY KEY,
+                    titulo TEXT,
+                    formato TEXT,
+                    precio TEXT,
+                    precio_unidad TEXT,
+                    disponibilidad TEXT,
+                    visto TEXT
+                )
+            """)
+        self.estadisticas = {'reutilizados': 0, 'cambiados': 0, 'nuevos': 0, 'registrados': 0}
+
+    def consultar(self, url):
+        """Última fila guardada del producto (o None si no se ha visto nunca)."""
+        fila = self.conexion.execute(
+            f"SELECT {', '.join(CAMPOS_FILA)} FROM vistos WHERE clave = ?", (clave_url(url),)
+        ).fetchone()
+        return dict(zip(CAMPOS_FILA, fila)) if fila else None
+
+    def reutilizar(self, url, precio, disponibilidad):
+        """
+        Devuelve una copia de la fila guardada si el precio y la disponibilidad
+        coinciden con los de la tarjeta; None si hay que extraer el producto.
+        """
+        anterior = self.consultar(url)
+        if anterior is None:
+            self.estadisticas['nuevos'] += 1
+            return None
+        if anterior['precio'] != precio or anterior['disponibilidad'] != disponibilidad:
+            self.estadisticas['cambiados'] += 1
+            return None
+        self.estadisticas['reutilizados'] += 1
+        self.marcar_visto(url)
+        return anterior
+
+    def marcar_visto(self, url):
+        self.conexion.execute("UPDATE vistos SET visto = ? WHERE clave = ?",
+                              (datetime.now().strftime('%Y-%m-%d'), clave_url(url)))
+        self._contar(1)
+
+    def registrar(self, url, producto):
+        """Guarda (o actualiza) la fila extraída de un producto."""
+        self.registrar_lote([(url, producto)])
+
+    def registrar_lote(self, productos):
+        """Guarda varias filas [(url, producto)] en una sola sentencia."""
+        hoy = datetime.now().strftime('%Y-%m-%d')
+        self.conexion.executemany(
+            f"INSERT OR REPLACE INTO vistos (clave, {', '.join(CAMPOS_FILA)}, visto) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(clave_url(url), *(producto.get(campo) for campo in CAMPOS_FILA), hoy) for url, producto in productos]
+        )
+        self.estadisticas['registrados'] += len(productos)
+        self._contar(len(productos))
+
+    def _contar(self, filas):
+        self.pendientes += filas
+        if self.pendientes >= self.filas_por_commit:
+            self.sincronizar()
+
+    def sincronizar(self):
+        self.conexion.commit()
+        self.pendientes = 0
+
+    def cerrar(self):
+        self.sincronizar()
+        self.conexion.close()
+
+    def resumen(self):
+        """Imprime cuántos productos se han reutilizado del índice y su tamaño."""
+        datos = self.estadisticas
+        total = self.conexion.execute("SELECT COUNT(*) FROM vistos").fetchone()[0]
+        consultados = datos['reutilizados'] + datos['cambiados'] + datos['nuevos']
+        print("\n=== Índice de productos vistos ===")
+        print(f"Productos en el índice: {total}")
+        if consultados:
+            print(f"Reutilizados sin extraer: {datos['reutilizados']} de {consultados} "
+                  f"({datos['reutilizados'] / consultados:.0%}); con cambios: {datos['cambiados']}, nuevos: {datos['nuevos']}")
+        print(f"Filas registradas en esta ejecución: {datos['registrados']}")
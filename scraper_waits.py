@@ -0,0 +1,204 @@
+import time
+from selenium.common.exceptions import WebDriverException
+from scraper_tracing import trazador
+from scraper_ritmo import controlador_ritmo, pagina_bloqueada
+
+# Configuración de espera por supermercado: tiempo máximo, milisegundos sin cambios
+# en el DOM que se consideran "página quieta" y selector de la rejilla de productos.
+CONFIG_SITIOS = {
+    'mercadona': {
+        'timeout': 15,
+        'silencio_ms': 300,
+        'selector': 'div.product-cell[data-testid="product-cell"]'
+    },
+    'alcampo': {
+        'timeout': 20,
+        'silencio_ms': 500,
+        'selector': "div[data-retailer-anchor='product-list'] div.sc-kdIgRK"
+    },
+    'carrefour': {
+        'timeout': 15,
+        'silencio_ms': 300,
+        'selector': 'li.product-card-list__item'
+    }
+}
+
+INTERVALO_SONDEO = 0.1
+
+# Las peticiones que llevan más de este tiempo abiertas (long-polling, websockets
+# de analítica...) no cuentan como "en curso".
+MAX_MS_PETICION = 5000
+
+# Las esperas sin navegación (tras un clic o un scroll) sustituyen sleeps de 1-2s:
+# como mucho duran este múltiplo de su `referencia` (y al menos 1s), no el
+# timeout del sitio, para no bloquearse en páginas que nunca quedan quietas.
+MULTIPLO_REFERENCIA = 3
+
+# Se instala en cada documento: cuenta las peticiones fetch/XHR en curso y guarda
+# el momento de la última mutación del DOM. Solo cuentan nodos y texto: los
+# cambios de atributos de carruseles, contadores o spinners no paran nunca.
+JS_INSTRUMENTAR = """
+(function () {
+    if (window.__esperaScraper) return;
+    const estado = {peticiones: new Map(), siguiente: 0, ultimaMutacion: Date.now()};
+    window.__esperaScraper = estado;
+    // Que la medición de tráfico vea todos los recursos (el buffer por defecto es de 250)
+    if (performance.setResourceTimingBufferSize) performance.setResourceTimingBufferSize(5000);
+
+    const empezar = () => { const id = estado.siguiente++; estado.peticiones.set(id, Date.now()); return id; };
+    const terminar = id => { estado.peticiones.delete(id); };
+
+    if (window.fetch) {
+        const fetchOriginal = window.fetch;
+        window.fetch = function () {
+            const id = empezar();
+            return fetchOriginal.apply(this, arguments).finally(() => terminar(id));
+        };
+    }
+    const sendOriginal = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        const id = empezar();
+        this.addEventListener('loadend', () => terminar(id));
+        return sendOriginal.apply(this, arguments);
+    };
+
+    new MutationObserver(() => { estado.ultimaMutacion = Date.now(); })
+        .observe(document, {childList: true, subtree: true, characterData: true});
+})();
+"""
+
+JS_ESTADO = """
+const selector = arguments[0];
+const maxMsPeticion = arguments[1];
+const estado = window.__esperaScraper;
+const ahora = Date.now();
+let enCurso = 0;
+if (estado) {
+    for (const inicio of estado.peticiones.values()) {
+        if (ahora - inicio < maxMsPeticion) enCurso++;
+    }
+}
+return {
+    instalado: !!estado,
+    readyState: document.readyState,
+    enCurso: enCurso,
+    msSilencio: estado ? ahora - estado.ultimaMutacion : 0,
+    elementos: selector ? document.querySelectorAll(selector).length : -1
+};
+"""
+
+class ContadorEsperas:
+    """Acumula el tiempo pasado esperando, por supermercado."""
+
+    def __init__(self):
+        self.esperas = {}
+
+    def registrar(self, sitio, segundos, referencia=None, listo=True):
+        datos = self.esperas.setdefault(sitio, {'numero': 0, 'segundos': 0.0, 'referencia': 0.0, 'timeouts': 0})
+        datos['numero'] += 1
+        datos['segundos'] += segundos
+        if referencia is not None:
+            datos['referencia'] += referencia
+        if not listo:
+            datos['timeouts'] += 1
+
+    def total(self):
+        return sum(datos['segundos'] for datos in self.esperas.values())
+
+    def resumen(self):
+        """Imprime el tiempo total de espera y lo que habrían costado los sleeps fijos."""
+        print("\n=== Tiempo de espera ===")
+        for sitio, datos in self.esperas.items():
+            ahorro = datos['referencia'] - datos['segundos']
+            print(f"{sitio}: {datos['numero']} esperas, {datos['segundos']:.1f}s esperando "
+                  f"(sleeps fijos: {datos['referencia']:.1f}s, ahorro: {ahorro:.1f}s, timeouts: {datos['timeouts']})")
+        print(f"Total: {self.total():.1f}s")
+
+contador_esperas = ContadorEsperas()
+
+def instalar_instrumentacion(driver):
+    """Registra el script de instrumentación para que se ejecute en cada documento nuevo."""
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': JS_INSTRUMENTAR})
+    except Exception as e:
+        # Sin CDP se instala bajo demanda en la primera espera de cada página
+        print(f"No se pudo registrar la instrumentación de esperas: {e}")
+
+def es_error_de_sesion(error):
+    """Indica si el error significa que el navegador ya no está disponible."""
+    mensaje = str(error).lower()
+    return "invalid session id" in mensaje or "no such session" in mensaje or "no such window" in mensaje
+
+def esperar_pagina(driver, sitio, selector=None, timeout=None, silencio_ms=None, referencia=None, navegacion=True):
+    """
+    Espera hasta que la página esté lista: documento cargado, sin peticiones en
+    curso, sin mutaciones del DOM durante `silencio_ms` y, si se indica un
+    selector, con un número de elementos mayor que cero y estable entre sondeos.
+
+    `referencia` es el sleep fijo al que sustituye, para calcular el ahorro;
+    sin navegación también limita el timeout (MULTIPLO_REFERENCIA).
+    Si la espera sigue a una navegación, se comprueba siempre si es una página
+    de bloqueo y la duración y el resultado se pasan al control de ritmo
+    (scraper_ritmo.py).
+    Devuelve True si la página quedó lista y False si se agotó el tiempo.
+    """
+    config = CONFIG_SITIOS.get(sitio, {})
+    if not timeout:
+        timeout = config.get('timeout', 15)
+        if not navegacion and referencia:
+            timeout = min(timeout, max(1.0, MULTIPLO_REFERENCIA * referencia))
+    silencio_ms = silencio_ms or config.get('silencio_ms', 300)
+
+    inicio = time.monotonic()
+    elementos_previos = None
+    listo = False
+    while True:
+        try:
+            estado = driver.execute_script(JS_ESTADO, selector, MAX_MS_PETICION)
+            if not estado['instalado']:
+                driver.execute_script(JS_INSTRUMENTAR)
+            else:
+                selector_estable = selector is None or (estado['elementos'] > 0 and estado['elementos'] == elementos_previos)
+                elementos_previos = estado['elementos']
+                if (estado['readyState'] == 'complete' and estado['enCurso'] == 0
+                        and estado['msSilencio'] >= silencio_ms and selector_estable):
+                    listo = True
+                    break
+        except WebDriverException as e:
+            # Durante una navegación el contexto de JavaScript puede no estar disponible
+            if es_error_de_sesion(e):
+                contador_esperas.registrar(sitio, time.monotonic() - inicio, referencia, False)
+                trazador.registrar('espera', time.monotonic() - inicio, 'error', sitio=sitio, selector=selector,
+                                   tipo='pagina' if navegacion else 'dom')
+                raise
+
+        if time.monotonic() - inicio >= timeout:
+            break
+        time.sleep(INTERVALO_SONDEO)
+
+    contador_esperas.registrar(sitio, time.monotonic() - inicio, referencia, listo)
+    trazador.registrar('espera', time.monotonic() - inicio, 'ok' if listo else 'timeout', sitio=sitio, selector=selector,
+                       tipo='pagina' if navegacion else 'dom')
+    if navegacion:
+        # También con la página lista: una página de bloqueo o captcha puede
+        # cargar sin problemas y, sin selector, dar la espera por buena
+        bloqueado = pagina_bloqueada(driver)
+        if bloqueado:
+            print(f"Página de bloqueo detectada en {sitio}")
+        controlador_ritmo.registrar(time.monotonic() - inicio, error=not listo, bloqueado=bloqueado)
+    if not listo:
+        print(f"Tiempo de espera agotado ({timeout}s) esperando a que la página de {sitio} esté lista")
+    return listo
+
+def esperar_rejilla(driver, sitio, timeout=None, referencia=None, navegacion=True):
+    """
+    Espera a que la rejilla de productos del supermercado esté cargada y estable.
+    Con navegacion=False (tras un scroll, o cuando esperar_pagina ya registró la
+    carga) no cuenta como página nueva para el control de ritmo ni las métricas.
+    """
+    return esperar_pagina(driver, sitio, CONFIG_SITIOS[sitio]['selector'], timeout=timeout, referencia=referencia,
+                          navegacion=navegacion)
+
+def esperar_dom_estable(driver, sitio, timeout=None, referencia=None):
+    """Espera a que terminen las peticiones y el DOM deje de cambiar (tras un clic o scroll)."""
+    return esperar_pagina(driver, sitio, timeout=timeout, referencia=referencia, navegacion=False)